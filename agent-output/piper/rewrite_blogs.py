@@ -1,19 +1,60 @@
 #!/usr/bin/env python3
 """
 Rewrite Piper blog posts to match the SEO Style Guide.
-Handles: bullet-to-paragraph, table-to-paragraph, internal links, 
+Handles: bullet-to-paragraph, table-to-paragraph, internal links,
 Kande VendTech mentions, Las Vegas refs, em dashes, AI buzzwords.
+
+This used to be three scripts (this one, rewrite_pass2.py, rewrite_pass3.py),
+each re-reading every post and running a chain of whole-document regex
+rewrites. Now each post is tokenized once into tags and text and the tokens
+stream through every rule in one pass:
+
+  - <ul>/<table> blocks are folded into paragraphs as they go past
+  - em dashes, buzzwords and bold keyword starts are fixed per text token
+    (plus content/alt/title attributes), never inside URLs, CSS or JS
+  - positions the VendTech rules need are recorded on the way (article
+    paragraphs, h2s, link candidates, footer, </head>), so mentions, links
+    and "At Kande VendTech, we" are inserted at those positions afterwards
+    and the document is joined once
+
+The cross-link and the blog link paragraph point at the most related VendTech
+posts from the corpus index (scripts/blog_index.py) rather than one fixed
+slug.
+
+Posts whose content hash and RULES_VERSION match .rewrite-cache.json are
+skipped without being parsed, posts that come out unchanged are not written,
+and both corpora are processed together across a process pool.
+
+Usage: python3 rewrite_blogs.py [--force] [--dry-run] [--jobs N]
 """
 
 import os
 import re
+import sys
 import glob
-import html as html_module
+import json
+import hashlib
+from html import escape
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, "/Users/kurtishon/clawd/scripts")
+from blog_index import BlogIndex
 
 # ─── Configuration ───
 
 VENDTECH_DIR = "/Users/kurtishon/clawd/agent-output/piper/blogs/vendtech"
 JUMPGATE_DIR = "/Users/kurtishon/clawd/agent-output/piper/blogs/jumpgate"
+CACHE_FILE = "/Users/kurtishon/clawd/agent-output/piper/.rewrite-cache.json"
+
+# Bump when the engine's behaviour changes; rule-table edits are picked up
+# automatically through RULES_VERSION.
+ENGINE_VERSION = 3
+
+# Below this many posts to (re)process, a process pool costs more than it saves
+PARALLEL_MIN_FILES = 8
+
+# Related posts looked up per VendTech post; the first not already linked is used
+RELATED_CANDIDATES = 3
 
 # Internal link targets for VendTech posts
 INTERNAL_LINKS = {
@@ -42,7 +83,7 @@ AI_BUZZWORDS = [
 
 AI_REPLACEMENTS = {
     "game-changer": "significant advantage",
-    "game changer": "significant advantage", 
+    "game changer": "significant advantage",
     "cutting-edge": "advanced",
     "cutting edge": "advanced",
     "revolutionary": "effective",
@@ -59,19 +100,134 @@ AI_REPLACEMENTS = {
     "streamlining": "simplifying",
 }
 
+# Phrases deleted outright
+AI_DELETIONS = [
+    "In today's world, ", "In an era of ", "In the ever-evolving ",
+    "Here's the thing: ", "Here's the thing, ",
+    "Let's be honest, ", "Let's be honest: ",
+    "Let's dive in. ", "Let's dive in! ",
+]
+
+# VendTech article text → internal link: (pattern to find, link href, link text replacement)
+LINK_MAP = [
+    (r'(?<!["\'/])free placement(?! program</a>)', '/services/', 'free placement'),
+    (r'(?<!["\'/])vending service(?:s)?(?!</a>)(?! program)', '/services/', None),
+    (r'(?<!["\'/])apartment (?:building|community|complex)(?:ies|s)?(?!</a>)', '/apartment-building-vending-machines/', None),
+    (r'(?<!["\'/])combo (?:vending )?machine(?:s)?(?!</a>)', '/combo-vending-machines/', None),
+    (r'(?<!["\'/])healthy (?:option|snack|vending|choice)(?:s)?(?!</a>)', '/healthy-vending-machines/', None),
+    (r'(?<!["\'/])hotel(?:s)? (?:vending|and resort)(?!</a>)', '/hotel-vending-machines/', None),
+    (r'(?<!["\'/])office (?:vending|building)(?:s)?(?!</a>)', '/office-vending-machines/', None),
+    (r'(?<!["\'/])meal (?:vending|option)(?:s)?(?!</a>)', '/meal-vending-machines/', None),
+    (r'(?<!["\'/])coffee (?:vending|machine)(?:s)?(?!</a>)', '/coffee-vending-machines/', None),
+    (r'(?<!["\'/])contact us(?!</a>)', '/contact/', None),
+    (r'(?<!["\'/])our services(?!</a>)', '/services/', None),
+]
+
+# Most related blog post, cross-linked when an article still lacks links
+CROSS_LINK = '\n    <p>For more on how our free vending program works at other types of properties, read <a href="/blog/{slug}/">{title}</a> on our blog.</p>\n\n    '
+NO_COST_LINK = ' through our <a href="/services/">free placement program</a>'
+CONTACT_LINK = ' You can <a href="/contact/">schedule a free site visit</a> to get started.'
+
+# Whole link paragraphs for articles the inline links could not bring to 5,
+# each added only when no href starting with the prefix exists yet
+LINK_SENTENCES = [
+    ('/services/', '<p>To learn more about how our <a href="/services/">free vending placement program</a> works, including installation, stocking, and ongoing maintenance at no cost to you, visit our services page.</p>'),
+    ('/contact/', '<p>If you are ready to explore vending options for your property, <a href="/contact/">contact Kande VendTech</a> or call us at (725) 228-8822 for a free site evaluation.</p>'),
+    ('/apartment', '<p>We also work with <a href="/apartment-building-vending-machines/">apartment communities across Las Vegas</a>, providing the same full-service vending program with no cost and no hassle for property managers.</p>'),
+    ('/combo', '<p>Many of our locations benefit from <a href="/combo-vending-machines/">combo vending machines</a> that offer both snacks and cold beverages in a single unit, saving floor space while maximizing product variety.</p>'),
+    ('/healthy', '<p>For properties that want to promote wellness, we offer <a href="/healthy-vending-machines/">healthy vending options</a> stocked with better-for-you snacks, low-sugar drinks, and protein-rich choices.</p>'),
+    ('/about/', '<p>Kande VendTech is a <a href="/about/">family-owned Las Vegas vending company</a> focused on smart, full-service vending for commercial and residential properties across the valley.</p>'),
+    ('/blog/', '<p>Check out our <a href="/blog/">vending blog</a> for more insights on vending machine placement, product selection, and what to look for in a vending partner.</p>'),
+]
+# Stands in for the '/blog/' sentence when a related post is known
+RELATED_SENTENCE = '<p>Related reading on our blog: <a href="/blog/{slug}/">{title}</a>, with more on vending machine placement and what to look for in a vending partner.</p>'
+
+# "At Kande VendTech, we ..." — swapped into a paragraph opening with one of
+# these, else a sentence or paragraph is added
+WE_OPENERS = [
+    "We have been ", "We've been ", "We work ", "We install ", "We supply ",
+    "We place ", "We service ", "We stock ", "We offer ", "We handle ",
+    "We manage ", "We provide ", "We maintain ", "We adjust ", "We configure ",
+    "We can ", "We are ", "We're ", "We do ", "We don't ", "We run ",
+    "We built ", "We designed ", "We tailor ",
+]
+AT_KANDE_SENTENCE = 'At Kande VendTech, we take pride in delivering reliable vending solutions tailored to each location. '
+AT_KANDE_PARAGRAPH = '\n\n    <p>At Kande VendTech, we believe every property deserves reliable, modern vending service backed by a local team that responds quickly and keeps machines fully stocked.</p>'
+KANDE_PARAGRAPH = '\n    <p>At Kande VendTech, we believe every property deserves reliable, modern vending service backed by a local team that responds quickly and keeps machines fully stocked. As a family-owned Las Vegas vending company, we take pride in understanding each location and tailoring our machines to the specific needs of the people who use them every day.</p>\n'
+
+# "our team" → "the Kande VendTech team" when an article has too few mentions
+MENTION_SWAPS = [
+    ('our team', re.compile(r'(?i)\bour team\b'), 'the Kande VendTech team'),
+    ('our company', re.compile(r'(?i)\bour company\b'), 'Kande VendTech'),
+]
+
+# Non-article layouts: link/mention block goes before the last of these
+FOOTER_MARKERS = ['<!-- Footer', '<!-- CTA', '<footer', '<div class="bg-blue-600', '<div class="bg-indigo-600']
+
+RULES_VERSION = f"{ENGINE_VERSION}-" + hashlib.sha1(repr((
+    AI_REPLACEMENTS, AI_DELETIONS, LINK_MAP, CROSS_LINK, NO_COST_LINK,
+    CONTACT_LINK, LINK_SENTENCES, RELATED_SENTENCE, WE_OPENERS, AT_KANDE_SENTENCE, AT_KANDE_PARAGRAPH,
+    KANDE_PARAGRAPH, [(p, r) for p, _, r in MENTION_SWAPS], FOOTER_MARKERS,
+)).encode()).hexdigest()[:12]
+
+CHANGE_LABELS = {
+    "lists": "converted bullet lists to paragraphs",
+    "tables": "converted tables to paragraphs",
+    "dashes": "fixed em dashes",
+    "buzzwords": "replaced AI buzzwords",
+    "bold": "fixed bold keyword patterns",
+    "at_kande": "added 'At Kande VendTech, we...'",
+    "mentions": "boosted Kande VendTech mentions",
+    "links": "added internal links",
+    "meta": "added meta description",
+}
+
+# ─── Patterns ───
+
+TOKEN_RE = re.compile(
+    r'<!--.*?-->'                              # comment
+    r'|<(script|style)\b[^>]*>.*?</\1\s*>'     # raw-text element, kept whole
+    r'|<[A-Za-z/!?][^>]*>'                     # tag
+    r'|[^<]+|<', re.DOTALL | re.IGNORECASE)
+TAG_NAME_RE = re.compile(r'</?([A-Za-z][A-Za-z0-9]*)')
+TEXT_ATTR_RE = re.compile(r'(\s(?:content|alt|title|aria-label)=")([^"]*)(")', re.IGNORECASE)
+HREF_RE = re.compile(r'href="([^"]*)"')
+LINK_COUNT_RE = re.compile(r'href="/(services|apartment|combo|healthy|meal|coffee|hotel|office|contact|about|blog)')
+
+EM_PAIR_RE = re.compile(r'\s*—\s*([^—]+?)\s*—\s*')
+EM_RE = re.compile(r'\s*—\s*')
+EN_RE = re.compile(r'\s*–\s*')
+# Longest first, so "streamlined" becomes "simplified" rather than "simplify" + "d"
+BUZZWORD_RE = re.compile('|'.join(re.escape(w) for w in sorted(AI_REPLACEMENTS, key=len, reverse=True)), re.IGNORECASE)
+DELETION_RE = re.compile('|'.join(re.escape(p) for p in AI_DELETIONS))
+
+LINK_MAP_RES = [(re.compile(p, re.IGNORECASE), href, text) for p, href, text in LINK_MAP]
+NO_COST_RE = re.compile(r'no cost to (?:you|the facility|the property)', re.IGNORECASE)
+CTA_RE = re.compile(r'call|visit|reach|touch', re.IGNORECASE)
+WE_RE = re.compile(r'\bwe\b', re.IGNORECASE)
+WE_LATER_RE = re.compile(r'[^<]{20,100}\bwe\b')
+
+
+def is_tag(tok):
+    return len(tok) > 1 and tok[0] == '<'
+
+
+def tokenize(content):
+    return [m.group(0) for m in TOKEN_RE.finditer(content)]
+
 
 def convert_ul_to_paragraphs(content):
     """Convert <ul>/<li> blocks to flowing paragraphs."""
     # Find all <ul>...</ul> blocks
     ul_pattern = re.compile(r'<ul[^>]*>(.*?)</ul>', re.DOTALL)
-    
+
     def replace_ul(match):
         ul_content = match.group(1)
         # Extract list items
         items = re.findall(r'<li[^>]*>(.*?)</li>', ul_content, re.DOTALL)
         if not items:
             return match.group(0)
-        
+
         # Clean each item
         cleaned_items = []
         for item in items:
@@ -90,36 +246,36 @@ def convert_ul_to_paragraphs(content):
                 if not item.endswith(('.', '!', '?')):
                     item = item + '.'
                 cleaned_items.append(item)
-        
+
         if not cleaned_items:
             return match.group(0)
-        
+
         # Join into a flowing paragraph
         paragraph = ' '.join(cleaned_items)
         return f'<p>{paragraph}</p>'
-    
+
     return ul_pattern.sub(replace_ul, content)
 
 
 def convert_tables_to_paragraphs(content):
     """Convert <table> blocks to flowing paragraphs."""
     table_pattern = re.compile(r'<table[^>]*>(.*?)</table>', re.DOTALL)
-    
+
     def replace_table(match):
         table_content = match.group(1)
         # Extract rows
         rows = re.findall(r'<tr[^>]*>(.*?)</tr>', table_content, re.DOTALL)
         if not rows:
             return match.group(0)
-        
+
         paragraphs = []
         headers = []
-        
+
         for row in rows:
             # Check for header cells
             ths = re.findall(r'<th[^>]*>(.*?)</th>', row, re.DOTALL)
             tds = re.findall(r'<td[^>]*>(.*?)</td>', row, re.DOTALL)
-            
+
             if ths:
                 headers = [re.sub(r'<[^>]+>', '', th).strip() for th in ths]
             elif tds and headers:
@@ -136,395 +292,609 @@ def convert_tables_to_paragraphs(content):
                 text = ', '.join(c for c in cells if c)
                 if text:
                     paragraphs.append(text + '.')
-        
+
         if paragraphs:
             return '<p>' + ' '.join(paragraphs) + '</p>'
         return match.group(0)
-    
+
     return table_pattern.sub(replace_table, content)
 
 
-def fix_em_dashes(content):
-    """Replace em dashes with commas or periods."""
-    # Em dash used as parenthetical: " — text — " -> ", text,"
-    content = re.sub(r'\s*—\s*([^—]+?)\s*—\s*', r', \1, ', content)
-    # Single em dash: " — " -> ", " or ". "
-    content = re.sub(r'\s*—\s*', ', ', content)
-    # En dashes used as em dashes
-    content = re.sub(r'\s*–\s*', ', ', content)
-    return content
-
-
-def fix_ai_buzzwords(content):
-    """Replace AI buzzwords with natural alternatives."""
-    for word, replacement in AI_REPLACEMENTS.items():
-        # Case insensitive replacement preserving case
-        pattern = re.compile(re.escape(word), re.IGNORECASE)
-        content = pattern.sub(replacement, content)
-    
-    # Remove phrases that should be deleted entirely
-    for phrase in ["In today's world, ", "In an era of ", "In the ever-evolving ",
-                   "Here's the thing: ", "Here's the thing, ",
-                   "Let's be honest, ", "Let's be honest: ",
-                   "Let's dive in. ", "Let's dive in! "]:
-        content = content.replace(phrase, "")
-    
-    return content
-
-
-def count_kande_mentions(content):
-    """Count 'Kande VendTech' mentions in article body."""
-    # Only count within <article> or main content area
-    article_match = re.search(r'<article[^>]*>(.*?)</article>', content, re.DOTALL)
-    if article_match:
-        return len(re.findall(r'Kande VendTech', article_match.group(1)))
-    return len(re.findall(r'Kande VendTech', content))
-
-
-def add_at_kande_vendtech(content):
-    """Add 'At Kande VendTech, we...' if not present."""
-    if 'At Kande VendTech, we' in content:
-        return content
-    
-    # Find a good paragraph to modify - look for paragraphs mentioning "we" or "our"
-    # Prefer paragraphs in the middle of the article
-    article_match = re.search(r'(<article[^>]*>)(.*?)(</article>)', content, re.DOTALL)
-    if not article_match:
-        return content
-    
-    article_body = article_match.group(2)
-    paragraphs = list(re.finditer(r'<p>(.*?)</p>', article_body, re.DOTALL))
-    
-    if len(paragraphs) < 3:
-        return content
-    
-    # Find a paragraph with "we" that we can prepend to
-    target_idx = None
-    for i in range(len(paragraphs) // 3, len(paragraphs)):
-        p_text = paragraphs[i].group(1)
-        if re.search(r'\bwe\b', p_text, re.IGNORECASE) and 'At Kande VendTech' not in p_text:
-            target_idx = i
-            break
-    
-    if target_idx is None:
-        # Pick a mid-article paragraph
-        target_idx = len(paragraphs) // 2
-    
-    p = paragraphs[target_idx]
-    p_text = p.group(1)
-    
-    # Check if paragraph starts with "We" - replace with "At Kande VendTech, we"
-    if p_text.strip().startswith('We '):
-        new_p_text = p_text.replace('We ', 'At Kande VendTech, we ', 1)
-    elif p_text.strip().startswith('We\''):
-        new_p_text = p_text.replace('We\'', 'At Kande VendTech, we\'', 1)
-    else:
-        # Prepend a sentence
-        new_p_text = f'At Kande VendTech, we take pride in delivering reliable vending solutions tailored to each location. {p_text}'
-    
-    new_article_body = article_body[:p.start(1)] + new_p_text + article_body[p.end(1):]
-    content = content[:article_match.start(2)] + new_article_body + content[article_match.end(2):]
-    
-    return content
-
-
-def boost_kande_mentions(content, target_min=3):
-    """Boost 'Kande VendTech' mentions if below minimum."""
-    current = count_kande_mentions(content)
-    if current >= target_min:
-        return content
-    
-    needed = target_min - current
-    
-    article_match = re.search(r'(<article[^>]*>)(.*?)(</article>)', content, re.DOTALL)
-    if not article_match:
-        return content
-    
-    article_body = article_match.group(2)
-    paragraphs = list(re.finditer(r'<p>(.*?)</p>', article_body, re.DOTALL))
-    
-    replacements_made = 0
-    
-    for i, p in enumerate(paragraphs):
-        if replacements_made >= needed:
-            break
-        p_text = p.group(1)
-        
-        # Skip if already has Kande VendTech
-        if 'Kande VendTech' in p_text:
-            continue
-        
-        # Replace generic "we" references with "Kande VendTech"
-        # "We install" -> "Kande VendTech installs"  (too complex, just add a mention)
-        # Better: replace "our team" with "the Kande VendTech team"
-        if 'our team' in p_text.lower():
-            new_text = re.sub(r'(?i)\bour team\b', 'the Kande VendTech team', p_text, count=1)
-            article_body = article_body[:p.start(1)] + new_text + article_body[p.end(1):]
-            replacements_made += 1
-            # Re-find paragraphs since offsets changed
-            paragraphs = list(re.finditer(r'<p>(.*?)</p>', article_body, re.DOTALL))
-            continue
-        
-        if 'our company' in p_text.lower():
-            new_text = re.sub(r'(?i)\bour company\b', 'Kande VendTech', p_text, count=1)
-            article_body = article_body[:p.start(1)] + new_text + article_body[p.end(1):]
-            replacements_made += 1
-            paragraphs = list(re.finditer(r'<p>(.*?)</p>', article_body, re.DOTALL))
-            continue
-    
-    content = content[:article_match.start(2)] + article_body + content[article_match.end(2):]
-    return content
-
-
-def count_internal_links(content):
-    """Count internal links in article body."""
-    article_match = re.search(r'<article[^>]*>(.*?)</article>', content, re.DOTALL)
-    text = article_match.group(1) if article_match else content
-    return len(re.findall(r'href="/(services|apartment|combo|healthy|meal|coffee|hotel|office|contact|about|blog)', text))
-
-
-def add_internal_links(content, is_vendtech=True):
-    """Add internal links to VendTech posts that are missing them."""
-    if not is_vendtech:
-        return content
-    
-    current_count = count_internal_links(content)
-    if current_count >= 5:
-        return content
-    
-    needed = 5 - current_count
-    
-    article_match = re.search(r'(<article[^>]*>)(.*?)(</article>)', content, re.DOTALL)
-    if not article_match:
-        return content
-    
-    article_body = article_match.group(2)
-    links_added = 0
-    
-    # Map of text patterns to link
-    link_map = [
-        # (pattern to find, link href, link text replacement)
-        (r'(?<!["\'/])free placement(?! program</a>)', '/services/', 'free placement'),
-        (r'(?<!["\'/])vending service(?:s)?(?!</a>)(?! program)', '/services/', None),
-        (r'(?<!["\'/])apartment (?:building|community|complex)(?:ies|s)?(?!</a>)', '/apartment-building-vending-machines/', None),
-        (r'(?<!["\'/])combo (?:vending )?machine(?:s)?(?!</a>)', '/combo-vending-machines/', None),
-        (r'(?<!["\'/])healthy (?:option|snack|vending|choice)(?:s)?(?!</a>)', '/healthy-vending-machines/', None),
-        (r'(?<!["\'/])hotel(?:s)? (?:vending|and resort)(?!</a>)', '/hotel-vending-machines/', None),
-        (r'(?<!["\'/])office (?:vending|building)(?:s)?(?!</a>)', '/office-vending-machines/', None),
-        (r'(?<!["\'/])meal (?:vending|option)(?:s)?(?!</a>)', '/meal-vending-machines/', None),
-        (r'(?<!["\'/])coffee (?:vending|machine)(?:s)?(?!</a>)', '/coffee-vending-machines/', None),
-        (r'(?<!["\'/])contact us(?!</a>)', '/contact/', None),
-        (r'(?<!["\'/])our services(?!</a>)', '/services/', None),
-    ]
-    
-    for pattern, href, replacement_text in link_map:
-        if links_added >= needed:
-            break
-        
-        # Check if this link already exists
-        if f'href="{href}"' in article_body:
-            continue
-        
-        match = re.search(pattern, article_body, re.IGNORECASE)
-        if match:
-            matched_text = match.group(0)
-            if replacement_text:
-                link_html = f'<a href="{href}">{replacement_text}</a>'
+# ─── Engine ───
+
+class Post:
+    """One post run through the engine.
+
+    Tokens land in self.out after the structural and inline rules; the
+    VendTech finishing rules only ever edit tokens in place or queue text in
+    self.before[i] (emitted just ahead of out[i]), so every recorded index
+    stays valid until the single join in html().
+    """
+
+    def __init__(self, content, is_vendtech, related=()):
+        self.is_vendtech = is_vendtech
+        self.related = related                  # (slug, title) of the closest other posts, best first
+        self.fixed = set()
+        self.out = []
+        self.before = {}
+        self._text_tail = False
+
+        # Positions recorded while streaming
+        self.art_start = self.art_end = None    # first <article>: first inner token, closing tag
+        self.article_ends = []                  # every </article>
+        self.paras = []                         # (<p>, </p>) pairs inside the article
+        self.p_opens, self.p_closes = [], []    # every <p> / </p> inside the article
+        self.art_h2, self.h2 = [], []           # <h2> inside the article / anywhere
+        self.art_text = []                      # article text tokens outside <a>
+        self.link_hits = {}                     # LINK_MAP index → first art_text position matching
+        self.no_cost = None                     # art_text position of the first "no cost to you"
+        self.cta = []                           # self.paras indexes of plain call/visit paragraphs
+        self.markers = {}                       # footer marker → last token index
+        self.head_end = self.body_end = None
+        self.title = None
+        self.has_meta = False
+
+        # Counters kept current by every later edit
+        self.has_at_kande = False
+        self.art_mentions = 0
+        self.art_links = self.doc_links = 0
+        self.art_hrefs, self.doc_hrefs = set(), set()
+
+        self._in_article = self._in_a = False
+        self._p_open = None
+        self._title_parts = None
+
+        for tok in self._bold(self._inline(self._blocks(tokenize(content)))):
+            self._emit(tok)
+
+    # ── streaming stages ──
+
+    def _blocks(self, tokens):
+        """Fold each <ul>…</ul> / <table>…</table> into a paragraph."""
+        i, n = 0, len(tokens)
+        while i < n:
+            tok = tokens[i]
+            kind = 'ul' if tok.startswith('<ul') else 'table' if tok.startswith('<table') else None
+            if kind:
+                close = f'</{kind}>'
+                j = next((k for k in range(i + 1, n) if tokens[k] == close), None)
+                if j is not None:
+                    block = ''.join(tokens[i:j + 1])
+                    new = convert_ul_to_paragraphs(block)
+                    if new != block:
+                        self.fixed.add('lists')
+                    if kind == 'table':
+                        folded = convert_tables_to_paragraphs(new)
+                        if folded != new:
+                            self.fixed.add('tables')
+                        new = folded
+                    if new != block:
+                        yield from tokenize(new)
+                        i = j + 1
+                        continue
+            yield tok
+            i += 1
+
+    def _inline(self, tokens):
+        """Dash and buzzword rules on text, readable attributes and JSON-LD."""
+        for tok in tokens:
+            if not is_tag(tok):
+                tok = self._fix_text(tok)
+            elif tok.startswith('<script') and 'ld+json' in tok[:tok.find('>')]:
+                start, end = tok.find('>') + 1, tok.rfind('</')
+                tok = tok[:start] + self._fix_text(tok[start:end]) + tok[end:]
+            elif not tok.startswith(('<!--', '<script', '<style')) and '="' in tok:
+                tok = TEXT_ATTR_RE.sub(self._fix_attr, tok)
+            yield tok
+
+    def _fix_attr(self, m):
+        value = m.group(2)
+        if value.startswith(('http', '/', '#')):
+            return m.group(0)
+        return m.group(1) + self._fix_text(value) + m.group(3)
+
+    def _fix_text(self, s):
+        if '—' in s or '–' in s:
+            new = EN_RE.sub(', ', EM_RE.sub(', ', EM_PAIR_RE.sub(r', \1, ', s)))
+            if new != s:
+                self.fixed.add('dashes')
+                s = new
+        new = DELETION_RE.sub('', BUZZWORD_RE.sub(lambda m: AI_REPLACEMENTS[m.group(0).lower()], s))
+        if new != s:
+            self.fixed.add('buzzwords')
+        return new
+
+    def _bold(self, tokens):
+        """<strong>Keyword</strong>: text → Keyword: text"""
+        window = []
+        for tok in tokens:
+            window.append(tok)
+            while window:
+                if window[0] == '<strong>':
+                    if len(window) < 4:
+                        break
+                    inner, close, after = window[1:4]
+                    if (close == '</strong>' and '<' not in inner and not is_tag(after)
+                            and after.startswith(':')):
+                        self.fixed.add('bold')
+                        window[:4] = [inner + ': ' + after[1:].lstrip()]
+                yield window.pop(0)
+        yield from window
+
+    def _emit(self, tok):
+        out = self.out
+        if not is_tag(tok):
+            if self._text_tail:
+                out[-1] += tok
             else:
-                link_html = f'<a href="{href}">{matched_text}</a>'
-            article_body = article_body[:match.start()] + link_html + article_body[match.end():]
-            links_added += 1
-    
-    # If still need more links, add contextual links at natural insertion points
-    if links_added < needed:
-        # Add a services link if missing
-        if 'href="/services/"' not in article_body:
-            # Find "no cost" or "free" mentions
-            m = re.search(r'(no cost to (?:you|the facility|the property))', article_body, re.IGNORECASE)
+                out.append(tok)
+            self._text_tail = True
+            self._record_text(len(out) - 1, tok)
+            return
+        self._text_tail = False
+        i = len(out)
+        out.append(tok)
+        self._record_tag(i, tok)
+
+    def _record_text(self, i, tok):
+        if 'At Kande VendTech, we' in tok:
+            self.has_at_kande = True
+        if self._title_parts is not None:
+            self._title_parts.append(tok)
+        if not self._in_article:
+            return
+        self.art_mentions += tok.count('Kande VendTech')
+        if self._in_a or not self.is_vendtech:
+            return
+        if not self.art_text or self.art_text[-1] != i:
+            self.art_text.append(i)
+        pos = len(self.art_text) - 1
+        for k, (pattern, _, _) in enumerate(LINK_MAP_RES):
+            if k not in self.link_hits and pattern.search(tok):
+                self.link_hits[k] = pos
+        if self.no_cost is None and NO_COST_RE.search(tok):
+            self.no_cost = pos
+
+    def _record_tag(self, i, tok):
+        if 'At Kande VendTech, we' in tok:
+            self.has_at_kande = True
+        if 'href="' in tok:
+            hrefs = HREF_RE.findall(tok)
+            links = len(LINK_COUNT_RE.findall(tok))
+            self.doc_hrefs.update(hrefs)
+            self.doc_links += links
+            if self._in_article:
+                self.art_hrefs.update(hrefs)
+                self.art_links += links
+        if self._in_article:
+            self.art_mentions += tok.count('Kande VendTech')
+
+        if tok.startswith('<!--'):
+            for marker in FOOTER_MARKERS[:2]:
+                if tok.startswith(marker):
+                    self.markers[marker] = i
+            return
+        m = TAG_NAME_RE.match(tok)
+        if not m:
+            return
+        name, closing = m.group(1).lower(), tok[1] == '/'
+        for marker in FOOTER_MARKERS[2:]:
+            if tok.startswith(marker):
+                self.markers[marker] = i
+
+        if name == 'article':
+            if closing:
+                self.article_ends.append(i)
+                if self._in_article:
+                    self.art_end = i
+                    self._in_article = False
+            elif self.art_start is None:
+                self.art_start = i + 1
+                self._in_article = True
+        elif name == 'a':
+            self._in_a = not closing
+        elif tok == '<h2>':
+            self.h2.append(i)
+            if self._in_article:
+                self.art_h2.append(i)
+        elif tok == '<p>' and self._in_article:
+            self.p_opens.append(i)
+            if self._p_open is None:
+                self._p_open = i
+        elif tok == '</p>' and self._in_article:
+            self.p_closes.append(i)
+            o = self._p_open
+            if o is not None:
+                self.paras.append((o, i))
+                if i == o + 2 and not is_tag(self.out[o + 1]) and CTA_RE.search(self.out[o + 1]):
+                    self.cta.append(len(self.paras) - 1)
+                self._p_open = None
+        elif name == 'title':
+            if closing:
+                if self._title_parts is not None and self.title is None:
+                    title = ''.join(self._title_parts)
+                    self.title = title if '\n' not in title else None
+                self._title_parts = None
+            elif tok == '<title>' and self.title is None:
+                self._title_parts = []
+        elif name == 'meta':
+            if tok.startswith('<meta name="description"'):
+                self.has_meta = True
+        elif tok == '</head>':
+            if self.head_end is None:
+                self.head_end = i
+        elif tok == '</body>':
+            self.body_end = i
+
+    # ── finishing rules, applied at the recorded positions ──
+
+    def _insert_before(self, i, text):
+        self.before.setdefault(i, []).append(text)
+
+    def _para_text(self, o, c):
+        return ''.join(self.out[o:c])[len('<p>'):]
+
+    def _linked(self, href, in_article=True):
+        self.doc_hrefs.add(href)
+        self.doc_links += 1
+        if in_article:
+            self.art_hrefs.add(href)
+            self.art_links += 1
+
+    def _find(self, pattern, start):
+        """First match at or after art_text position start, as (token index, match)."""
+        if start is None:
+            return None
+        for pos in range(start, len(self.art_text)):
+            i = self.art_text[pos]
+            m = pattern.search(self.out[i])
             if m:
-                article_body = article_body[:m.end()] + ' through our <a href="/services/">free placement program</a>' + article_body[m.end():]
-                links_added += 1
-        
-        # Add contact link if missing  
-        if links_added < needed and 'href="/contact/"' not in article_body:
-            # Find CTA-like paragraphs near end
-            last_p = list(re.finditer(r'<p>[^<]*(?:call|visit|reach|touch)[^<]*</p>', article_body, re.IGNORECASE))
-            if last_p:
-                p = last_p[-1]
-                p_text = p.group(0)
-                if 'href=' not in p_text:
-                    new_text = p_text.replace('</p>', ' You can <a href="/contact/">schedule a free site visit</a> to get started.</p>')
-                    article_body = article_body[:p.start()] + new_text + article_body[p.end():]
-                    links_added += 1
-    
-    # Add blog cross-links if still needed
-    if links_added < needed and 'href="/blog/' not in article_body:
-        # Get the slug of this post to avoid self-linking
-        slugs_available = [
-            "apartment-vending-machine-benefits",
-            "free-vending-machine-service-whats-the-catch", 
-            "how-to-choose-vending-machine-company-las-vegas",
-            "why-las-vegas-apartments-switching-smart-vending",
-            "break-room-vending-las-vegas-warehouses-distribution-centers",
-        ]
-        # Add a cross-link mention near end
-        for slug in slugs_available[:1]:
-            if links_added >= needed:
+                return i, m
+        return None
+
+    def add_at_kande(self):
+        """Work "At Kande VendTech, we" into a paragraph a third of the way in."""
+        paras = self.paras
+        if self.has_at_kande or self.art_end is None or len(paras) < 3:
+            return False
+        target = len(paras) // 2
+        for k in range(len(paras) // 3, len(paras)):
+            text = self._para_text(*paras[k])
+            if WE_RE.search(text) and 'At Kande VendTech' not in text:
+                target = k
+                break
+        o, c = paras[target]
+        text = self._para_text(o, c).strip()
+        if text.startswith(('We ', "We'")):
+            self.out[o + 1] = self.out[o + 1].replace(text[:3], 'At Kande VendTech, we' + text[2], 1)
+        else:
+            self.out[o] += AT_KANDE_SENTENCE
+        self.has_at_kande = True
+        self.art_mentions += 1
+        return True
+
+    def boost_mentions(self, target_min=3):
+        """Turn "our team" / "our company" into Kande VendTech until the article has enough mentions."""
+        if self.art_end is None or self.art_mentions >= target_min:
+            return False
+        needed = target_min - self.art_mentions
+        made, changed = 0, False
+        for o, c in self.paras:
+            if made >= needed:
+                break
+            text = self._para_text(o, c)
+            if 'Kande VendTech' in text:
+                continue
+            lowered = text.lower()
+            for phrase, pattern, replacement in MENTION_SWAPS:
+                if phrase in lowered:
+                    for i in range(o + 1, c):
+                        if not is_tag(self.out[i]):
+                            new = pattern.sub(replacement, self.out[i], count=1)
+                            if new != self.out[i]:
+                                self.out[i] = new
+                                self.art_mentions += 1
+                                changed = True
+                                break
+                    made += 1
+                    break
+        return changed
+
+    def add_internal_links(self):
+        """Link article phrases, then the no-cost line, CTA paragraph and a blog post, up to 5 links."""
+        if self.art_end is None or self.art_links >= 5:
+            return False
+        needed = 5 - self.art_links
+        added = 0
+        for k, (pattern, href, text) in enumerate(LINK_MAP_RES):
+            if added >= needed:
+                break
+            if href in self.art_hrefs:
+                continue
+            hit = self._find(pattern, self.link_hits.get(k))
+            if hit:
+                i, m = hit
+                s = self.out[i]
+                self.out[i] = s[:m.start()] + f'<a href="{href}">{text or m.group(0)}</a>' + s[m.end():]
+                self._linked(href)
+                added += 1
+
+        if added < needed and '/services/' not in self.art_hrefs:
+            hit = self._find(NO_COST_RE, self.no_cost)
+            if hit:
+                i, m = hit
+                s = self.out[i]
+                self.out[i] = s[:m.end()] + NO_COST_LINK + s[m.end():]
+                self._linked('/services/')
+                added += 1
+
+        if added < needed and '/contact/' not in self.art_hrefs:
+            for k in reversed(self.cta):
+                o, c = self.paras[k]
+                if self.out[o] == '<p>' and c not in self.before and '<' not in self.out[o + 1]:
+                    self._insert_before(c, CONTACT_LINK)
+                    self._linked('/contact/')
+                    added += 1
+                    break
+
+        related = self._related()
+        if (added < needed and related and not any(h.startswith('/blog/') for h in self.art_hrefs)
+                and len(self.art_h2) >= 2
+                and related[0] not in ''.join(self.out[self.art_start:self.art_end])):
+            slug, title = related
+            self._insert_before(self.art_h2[-1], CROSS_LINK.format(slug=slug, title=escape(title)))
+            self._linked(f'/blog/{slug}/')
+            added += 1
+        return added > 0
+
+    def _related(self):
+        """First related post this document does not link to yet, as (slug, title)."""
+        return next(((slug, title) for slug, title in self.related
+                     if f'/blog/{slug}/' not in self.doc_hrefs), None)
+
+    def _link_sentences(self):
+        """LINK_SENTENCES, with the generic blog link swapped for the most related post."""
+        related = self._related()
+        for prefix, sentence in LINK_SENTENCES:
+            if prefix == '/blog/' and related:
+                sentence = RELATED_SENTENCE.format(slug=related[0], title=escape(related[1]))
+            yield prefix, sentence
+
+    def add_link_paragraphs(self):
+        """Still under 5 links: add whole link paragraphs before the article's last section."""
+        if not self.article_ends:
+            return False
+        links = self.art_links if self.art_end is not None else self.doc_links
+        if links >= 5:
+            return False
+        inserts = []
+        for prefix, sentence in self._link_sentences():
+            if len(inserts) >= 5 - links:
+                break
+            if not any(h.startswith(prefix) for h in self.doc_hrefs):
+                inserts.append((prefix, sentence))
+        if not inserts:
+            return False
+        end = self.article_ends[-1]
+        h2s = [i for i in self.h2 if i < end]
+        at = h2s[-1] if h2s else end
+        in_article = self.art_start is not None and self.art_start <= at <= (self.art_end or end)
+        self._insert_before(at, '\n\n    ' + '\n\n    '.join(s for _, s in inserts) + '\n\n    ')
+        for prefix, sentence in inserts:
+            self._linked(HREF_RE.search(sentence).group(1), in_article)
+        return True
+
+    def add_at_kande_paragraph(self):
+        """No paragraph took "At Kande VendTech, we": reword a "We ..." opener or add a paragraph."""
+        if self.has_at_kande or self.art_end is None:
+            return False
+        # Every <p> in the article in document order, including paragraphs
+        # queued by the link rules: (token index, offset in the queued text or None, text after <p>)
+        starts, opens = [], set(self.p_opens)
+        queued = {i for i in self.before if self.art_start <= i <= self.art_end}
+        for i in sorted(opens | queued):
+            pending = ''.join(self.before.get(i, ()))
+            for m in re.finditer('<p>', pending):
+                starts.append((i, m.end(), pending[m.end():]))
+            if i in opens:
+                nxt = self.out[i + 1] if i + 1 < len(self.out) else ''
+                starts.append((i, None, '' if self.out[i] != '<p>' or is_tag(nxt) else nxt))
+
+        for opener in WE_OPENERS:
+            for i, offset, text in starts:
+                if text.startswith(opener):
+                    if offset is None:
+                        self.out[i + 1] = 'At Kande VendTech, we' + text[2:]
+                    else:
+                        pending = ''.join(self.before[i])
+                        self.before[i] = [pending[:offset] + 'At Kande VendTech, we' + pending[offset + 2:]]
+                    self.has_at_kande = True
+                    return True
+        if not any(WE_LATER_RE.match(text) for _, _, text in starts):
+            return False
+        if len(starts) >= 4:
+            i, offset, _ = starts[2]
+            pending = ''.join(self.before.get(i, ()))
+            close = pending.find('</p>', offset) if offset is not None else -1
+            if close >= 0:
+                close += len('</p>')
+                self.before[i] = [pending[:close] + AT_KANDE_PARAGRAPH + pending[close:]]
+            else:
+                close = next((c for c in self.p_closes if c > i), None)
+                if close is None:
+                    return False
+                self.out[close] += AT_KANDE_PARAGRAPH
+        else:
+            self._insert_before(self.art_end, AT_KANDE_PARAGRAPH + '\n')
+        self.has_at_kande = True
+        return True
+
+    def add_footer_block(self):
+        """Last resort for any layout: mention + link paragraphs before the footer."""
+        links, has_k = self.doc_links, self.has_at_kande
+        if links >= 5 and has_k:
+            return False
+        at = next((self.markers[m] for m in FOOTER_MARKERS if self.markers.get(m, 0) > 0), None)
+        if at is None and self.body_end:
+            at = self.body_end
+        if at is None:
+            return False
+        inserts = '' if has_k else KANDE_PARAGRAPH
+        for prefix, sentence in self._link_sentences():
+            if links >= 5:
                 break
-            if slug not in article_body:
-                # Find a good spot before the last H2
-                h2s = list(re.finditer(r'<h2>', article_body))
-                if len(h2s) >= 2:
-                    insert_point = h2s[-1].start()
-                    cross_link = f'\n    <p>For more on how our <a href="/blog/{slug}/">free vending program</a> works at different types of properties, take a look at our other guides on the blog.</p>\n\n    '
-                    article_body = article_body[:insert_point] + cross_link + article_body[insert_point:]
-                    links_added += 1
-    
-    content = content[:article_match.start(2)] + article_body + content[article_match.end(2):]
-    return content
-
-
-def fix_bold_list_pattern(content):
-    """Remove **Keyword:** bold starts on list items."""
-    content = re.sub(r'<strong>([^<]+)</strong>:\s*', r'\1: ', content)
-    return content
-
-
-def ensure_meta_description(content):
-    """Ensure meta description exists and is proper length."""
-    if '<meta name="description"' in content:
-        return content
-    
-    # Extract title
-    title_match = re.search(r'<title>(.*?)</title>', content)
-    if title_match:
-        title = title_match.group(1)
-        desc = title[:155]
-        meta_tag = f'  <meta name="description" content="{desc}" />\n'
-        content = content.replace('</head>', meta_tag + '</head>')
-    
-    return content
-
-
-def fix_arrow_lists(content):
-    """Convert styled arrow list items (→) to paragraphs for Jumpgate posts."""
-    # Pattern: divs with arrow items
-    pattern = re.compile(
-        r'<div[^>]*>\s*<h3[^>]*>([^<]+)</h3>\s*'
-        r'(<ul[^>]*>.*?</ul>)\s*</div>',
-        re.DOTALL
-    )
-    # Already handled by convert_ul_to_paragraphs
-    return content
-
-
-def process_file(filepath, is_vendtech=True):
-    """Process a single blog post file."""
-    with open(filepath, 'r', encoding='utf-8') as f:
+            if not any(h.startswith(prefix) for h in self.doc_hrefs):
+                inserts += '\n    ' + sentence
+                links += 1
+        if not inserts:
+            return False
+        self._insert_before(at, '\n' + inserts + '\n\n  ')
+        self.has_at_kande = True
+        self.doc_links = links
+        return True
+
+    def ensure_meta_description(self):
+        if self.has_meta or self.title is None or self.head_end is None:
+            return False
+        self._insert_before(self.head_end, f'  <meta name="description" content="{self.title[:155]}" />\n')
+        self.has_meta = True
+        return True
+
+    def finish(self):
+        """Run the finishing rules; returns the change labels."""
+        if self.is_vendtech:
+            if self.add_at_kande():
+                self.fixed.add('at_kande')
+            if self.boost_mentions(target_min=3):
+                self.fixed.add('mentions')
+            if self.add_internal_links():
+                self.fixed.add('links')
+            if self.add_link_paragraphs():
+                self.fixed.add('links')
+            if self.add_at_kande_paragraph():
+                self.fixed.add('at_kande')
+            if self.add_footer_block():
+                self.fixed.update(('links', 'at_kande'))
+        if self.ensure_meta_description():
+            self.fixed.add('meta')
+        return [label for key, label in CHANGE_LABELS.items() if key in self.fixed]
+
+    def html(self):
+        if not self.before:
+            return ''.join(self.out)
+        before = self.before
+        return ''.join(''.join(before[i]) + tok if i in before else tok for i, tok in enumerate(self.out))
+
+    def audit(self):
+        return {"links": self.doc_links, "at_kande": self.has_at_kande}
+
+
+def rewrite(content, is_vendtech=True, related=()):
+    """Apply every rule to one post. Returns (new content, change labels, audit)."""
+    post = Post(content, is_vendtech, related)
+    changes = post.finish()
+    return post.html(), changes, post.audit()
+
+
+def process_file(job):
+    """Worker: rewrite one post, writing it only if it changed."""
+    filepath, is_vendtech, dry_run, related = job
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
         content = f.read()
-    
-    original = content
-    changes = []
-    
-    # 1. Convert bullet lists to paragraphs
-    if '<ul' in content:
-        content = convert_ul_to_paragraphs(content)
-        if content != original:
-            changes.append("converted bullet lists to paragraphs")
-    
-    # 2. Convert tables to paragraphs
-    if '<table' in content:
-        prev = content
-        content = convert_tables_to_paragraphs(content)
-        if content != prev:
-            changes.append("converted tables to paragraphs")
-    
-    # 3. Fix em dashes
-    if '—' in content or '–' in content:
-        prev = content
-        content = fix_em_dashes(content)
-        if content != prev:
-            changes.append("fixed em dashes")
-    
-    # 4. Fix AI buzzwords
-    prev = content
-    content = fix_ai_buzzwords(content)
-    if content != prev:
-        changes.append("replaced AI buzzwords")
-    
-    # 5. Fix bold list patterns
-    prev = content
-    content = fix_bold_list_pattern(content)
-    if content != prev:
-        changes.append("fixed bold keyword patterns")
-    
-    # 6. Add "At Kande VendTech, we..." (VendTech only)
-    if is_vendtech:
-        prev = content
-        content = add_at_kande_vendtech(content)
-        if content != prev:
-            changes.append("added 'At Kande VendTech, we...'")
-    
-    # 7. Boost Kande VendTech mentions if needed (VendTech only)
-    if is_vendtech:
-        prev = content
-        content = boost_kande_mentions(content, target_min=3)
-        if content != prev:
-            changes.append("boosted Kande VendTech mentions")
-    
-    # 8. Add internal links (VendTech only)
-    if is_vendtech:
-        prev = content
-        content = add_internal_links(content, is_vendtech=True)
-        if content != prev:
-            changes.append("added internal links")
-    
-    # 9. Ensure meta description
-    prev = content
-    content = ensure_meta_description(content)
-    if content != prev:
-        changes.append("added meta description")
-    
-    # Write back
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
-    
-    return changes
+    new, changes, audit = rewrite(content, is_vendtech, related)
+    if new == content:
+        changes = []
+    elif not dry_run:
+        tmp = filepath + '.tmp'
+        with open(tmp, 'w', encoding='utf-8', newline='') as f:
+            f.write(new)
+        os.replace(tmp, filepath)
+    digest = hashlib.sha256(new.encode('utf-8')).hexdigest()
+    return filepath, changes, digest, audit
+
+
+def load_cache():
+    try:
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache):
+    tmp = CACHE_FILE + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp, CACHE_FILE)
 
 
 def main():
-    results = {"vendtech": {}, "jumpgate": {}}
-    
-    # Process VendTech posts
-    vendtech_files = sorted(glob.glob(os.path.join(VENDTECH_DIR, "*.html")))
-    print(f"Processing {len(vendtech_files)} VendTech posts...")
-    for f in vendtech_files:
-        basename = os.path.basename(f)
-        changes = process_file(f, is_vendtech=True)
-        results["vendtech"][basename] = changes
-        status = f"  {'✓' if changes else '○'} {basename}: {', '.join(changes) if changes else 'no changes needed'}"
-        print(status)
-    
-    # Process Jumpgate posts
-    jumpgate_files = sorted(glob.glob(os.path.join(JUMPGATE_DIR, "*.html")))
-    print(f"\nProcessing {len(jumpgate_files)} Jumpgate posts...")
-    for f in jumpgate_files:
-        basename = os.path.basename(f)
-        changes = process_file(f, is_vendtech=False)
-        results["jumpgate"][basename] = changes
-        status = f"  {'✓' if changes else '○'} {basename}: {', '.join(changes) if changes else 'no changes needed'}"
-        print(status)
-    
-    # Summary
-    vt_changed = sum(1 for v in results["vendtech"].values() if v)
-    jg_changed = sum(1 for v in results["jumpgate"].values() if v)
+    args = sys.argv[1:]
+    force, dry_run = '--force' in args, '--dry-run' in args
+    jobs = int(args[args.index('--jobs') + 1]) if '--jobs' in args else (os.cpu_count() or 1)
+
+    cache = {} if force else load_cache()
+    corpora = [("vendtech", VENDTECH_DIR, True), ("jumpgate", JUMPGATE_DIR, False)]
+    files, todo, fresh = {}, [], {}
+    for name, directory, is_vendtech in corpora:
+        files[name] = sorted(glob.glob(os.path.join(directory, "*.html")))
+        for f in files[name]:
+            with open(f, 'rb') as fh:
+                digest = hashlib.sha256(fh.read()).hexdigest()
+            entry = cache.get(f)
+            if entry and entry.get("sha") == digest and entry.get("rules") == RULES_VERSION:
+                fresh[f] = entry
+            else:
+                todo.append((f, is_vendtech, dry_run, ()))
+
+    if any(is_vendtech for _, is_vendtech, _, _ in todo):
+        index = BlogIndex(dirs={"vendtech": VENDTECH_DIR, "jumpgate": JUMPGATE_DIR})
+        index.refresh()
+        todo = [(f, is_vendtech, dry_run, [(m.slug, m.title) for m in index.related(
+                    f"vendtech/{os.path.basename(f)[:-len('.html')]}", k=RELATED_CANDIDATES)] if is_vendtech else ())
+                for f, is_vendtech, dry_run, _ in todo]
+
+    print(f"Rules {RULES_VERSION}: {len(todo)} to process, {len(fresh)} unchanged since last run")
+    if len(todo) >= PARALLEL_MIN_FILES and jobs > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(todo))) as pool:
+            done = list(pool.map(process_file, todo, chunksize=max(1, len(todo) // (jobs * 4))))
+    else:
+        done = [process_file(job) for job in todo]
+
+    results = {}
+    for filepath, changes, digest, audit in done:
+        results[filepath] = changes
+        fresh[filepath] = {"sha": digest, "rules": RULES_VERSION, "audit": audit}
+    if not dry_run:
+        save_cache(fresh)
+
+    for name, _, _ in corpora:
+        processed = [f for f in files[name] if f in results]
+        print(f"\n{name.capitalize()}: {len(files[name])} posts, {len(processed)} processed")
+        for f in processed:
+            changes = results[f]
+            print(f"  {'✓' if changes else '○'} {os.path.basename(f)}: {', '.join(changes) if changes else 'no changes needed'}")
+
+    print("\n=== VendTech Audit ===")
+    failing = 0
+    for f in files["vendtech"]:
+        audit = fresh[f]["audit"]
+        issues = []
+        if audit["links"] < 5:
+            issues.append(f"links={audit['links']}")
+        if not audit["at_kande"]:
+            issues.append("missing 'At Kande VendTech'")
+        if issues:
+            failing += 1
+            print(f"  ⚠ {os.path.basename(f)}: {', '.join(issues)}")
+    if not failing:
+        print(f"  ✅ All {len(files['vendtech'])} VendTech files pass audit!")
+
+    changed = sum(1 for c in results.values() if c)
     print(f"\n=== Summary ===")
-    print(f"VendTech: {vt_changed}/{len(vendtech_files)} files modified")
-    print(f"Jumpgate: {jg_changed}/{len(jumpgate_files)} files modified")
-    print(f"Total: {vt_changed + jg_changed}/{len(vendtech_files) + len(jumpgate_files)} files modified")
-    
-    return results
+    print(f"Total: {changed}/{sum(len(v) for v in files.values())} files {'would be ' if dry_run else ''}modified")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
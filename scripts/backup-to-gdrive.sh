@@ -241,16 +241,19 @@ fi
 # STEP 7: Raw DB dump — complete data.json for exact crash recovery
 # =============================================================================
 log "🗄️  Step 7: Raw DB dump (full disaster recovery copy)..."
-RAW_DB_FILE="$VEND_ARCHIVE_DIR/raw-db-${BACKUP_DATE}.json"
-RAW_DB_LATEST="$VEND_BACKUP_DIR/raw-db-latest.json"
+# Dated copies go into the incremental snapshot store (only changed records are
+# stored), so the Drive upload is one new pack + manifest instead of a full dump
+RAW_DB_FILE="$VEND_BACKUP_DIR/raw-db-latest.json"
+SNAPSHOT_STORE="$VEND_BACKUP_DIR/store"
 
-if python3 /Users/kurtishon/clawd/kande-vendtech/scripts/crm-export.py --raw-db "$RAW_DB_FILE" 2>>"$LOG_FILE"; then
-  cp "$RAW_DB_FILE" "$RAW_DB_LATEST"
+if python3 /Users/kurtishon/clawd/kande-vendtech/scripts/crm-export.py --raw-db --stream "$RAW_DB_FILE" 2>>"$LOG_FILE"; then
   log "  ✅ Raw DB saved locally"
+  python3 "$WORKSPACE/scripts/crm_snapshots.py" ingest "$RAW_DB_FILE" --source gdrive-backup 2>>"$LOG_FILE" | tee -a "$LOG_FILE" \
+    || log "  ⚠ Snapshot ingest failed"
 
   if ! $DRY_RUN; then
-    rclone copy "$RAW_DB_FILE" "$GDRIVE_REMOTE/raw-db-backups/" 2>>"$LOG_FILE" \
-      && log "  ✅ Raw DB → Drive/raw-db-backups/" \
+    rclone copy "$SNAPSHOT_STORE" "$GDRIVE_REMOTE/raw-db-store/" 2>>"$LOG_FILE" \
+      && log "  ✅ Raw DB snapshot → Drive/raw-db-store/" \
       || log "  ⚠ Raw DB Drive upload failed"
 
     # Keep restore-backup.json in git repo fresh so Railway can auto-restore on volume wipe
@@ -64,10 +64,11 @@ print(f'prospects:{prospects}, activities:{activities}, products:{products}, pho
 " 2>/dev/null)
 log "📦 Raw export OK — $SUMMARY"
 
-# Save to clawd repo
-mkdir -p data/vend-backups/archive
+# Save to clawd repo — history goes into the incremental snapshot store, so each
+# commit adds one pack of changed records instead of another full copy
 echo "$FULL_JSON" > data/vend-backups/vend-full-latest.json
-echo "$FULL_JSON" > "data/vend-backups/archive/vend-full-${BACKUP_DATE}.json"
+python3 "$WORKSPACE/scripts/crm_snapshots.py" ingest data/vend-backups/vend-full-latest.json --source github-backup \
+  2>&1 | tee -a "$LOG_FILE" || log "⚠️ Snapshot ingest failed — latest copy still saved"
 
 # Extract order receipts separately
 echo "$FULL_JSON" | python3 -c "import json,sys; d=json.load(sys.stdin); print(json.dumps(d.get('order_receipts',[]), indent=2))" > data/vend-backups/order-receipts-latest.json
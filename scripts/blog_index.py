@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+blog_index.py — Similarity index over every generated Piper blog post.
+
+piper-run used to avoid repeats only by comparing slug filenames, and
+rewrite_blogs.py cross-linked every post to one hard-coded slug. This keeps
+one row per post (VendTech and Jumpgate) in a SQLite store
+(logs/blog-index.db) with two fingerprints:
+
+  terms   word counts of the title (weighted) and article text, after
+          stopwords and a light plural fold. TF-IDF vectors and inverted
+          indexes over whole posts and over titles alone are built from
+          these once per process, so "top-k related posts" and "is this
+          topic already covered" are a few dictionary lookups.
+  sig     a 64-value MinHash signature of the post's 5-word shingles,
+          bucketed into 16 LSH bands, so a near-verbatim draft is caught
+          without comparing it against every post.
+
+refresh() stats every post and only re-reads files whose size or mtime
+moved; a post is re-fingerprinted only when its content hash changed.
+add() indexes a single new post right after it is saved.
+
+Usage:
+    from blog_index import BlogIndex
+    idx = BlogIndex()
+    idx.refresh()
+    idx.duplicates("coworking spaces vending machines las vegas", corpus="vendtech")
+    idx.duplicates(draft_html, corpus="vendtech")       # whole drafts work too
+    idx.related("vendtech/vending-for-car-dealerships-las-vegas", k=3)
+
+CLI:
+    python3 blog_index.py                   # refresh and print a summary
+    python3 blog_index.py --rebuild         # drop the index and re-read every post
+    python3 blog_index.py dup "topic or title" [--corpus vendtech]
+    python3 blog_index.py related <slug> [-k 5]
+"""
+
+import hashlib, html, json, math, random, re, sqlite3, sys, threading, time
+from array import array
+from collections import Counter, defaultdict, namedtuple
+from pathlib import Path
+
+BLOG_DIRS = {
+    "vendtech": Path("/Users/kurtishon/clawd/agent-output/piper/blogs/vendtech"),
+    "jumpgate": Path("/Users/kurtishon/clawd/agent-output/piper/blogs/jumpgate"),
+}
+INDEX_DB = Path("/Users/kurtishon/clawd/logs/blog-index.db")
+
+# Bump when fingerprinting changes; a mismatched store is rebuilt.
+INDEX_VERSION = 1
+
+SHINGLE      = 5       # words per MinHash shingle
+NUM_PERM     = 64
+BANDS        = 16      # 4 rows per band: pairs above ~0.5 Jaccard almost always share a bucket
+TITLE_WEIGHT = 3       # title words count this many times in a post's terms
+DRAFT_WORDS  = 150     # query text at least this long is treated as a draft, not a topic
+
+# Thresholds, calibrated on the 2026 corpus. A topic that already has a post
+# scores 0.43+ against it and the nearest unrelated post 0.33 or less; a
+# post's nearest other post is 0.37 at the median, and the overlapping pairs
+# (two gym posts, two warehouse posts) sit at 0.50-0.55. Distinct posts never
+# share more than ~0.1 of their shingles.
+TOPIC_DUP   = 0.40     # mean of title and whole-post TF-IDF cosine, short topic/title vs a post
+DRAFT_DUP   = 0.50     # whole-post TF-IDF cosine, full draft vs a post
+SHINGLE_DUP = 0.50     # estimated Jaccard of 5-word shingles (near-verbatim copy)
+
+Match = namedtuple("Match", "key corpus slug title score")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before
+being below between both but by can could did do does doing down during each few for from
+further had has have having he her here hers him his how i if in into is it its itself just
+me more most my no nor not now of off on once only or other our ours out over own same she
+should so some such than that the their theirs them then there these they this those through
+to too under until up very was we were what when where which while who whom why will with
+would you your yours 2025 2026 com www http https
+""".split())
+
+WORD_RE    = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+SKIP_RE    = re.compile(r'<(script|style|nav|footer|head)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+ARTICLE_RE = re.compile(r'<article\b[^>]*>(.*)</article\s*>', re.IGNORECASE | re.DOTALL)
+TITLE_RE   = re.compile(r'<title>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+TAG_RE     = re.compile(r'<[^>]+>')
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(49)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_ROWS = NUM_PERM // BANDS
+
+
+# --- Fingerprints ---
+
+def extract(doc):
+    """(title, article text) of a post; plain text passes through as the text."""
+    m = TITLE_RE.search(doc)
+    title = html.unescape(TAG_RE.sub('', m.group(1))).split(' | ')[0].strip() if m else ""
+    if '<' not in doc:
+        return title, doc
+    a = ARTICLE_RE.search(doc)
+    body = a.group(1) if a else SKIP_RE.sub(' ', doc)
+    return title, html.unescape(TAG_RE.sub(' ', SKIP_RE.sub(' ', body)))
+
+
+def words(text):
+    return WORD_RE.findall(text.lower())
+
+
+def _fold(w):
+    """Plural fold so "dealerships" and "dealership" meet."""
+    if len(w) > 4 and w.endswith('s') and not w.endswith(('ss', 'us', 'is')):
+        return w[:-3] + 'y' if w.endswith('ies') else w[:-1]
+    return w
+
+
+def terms(title, text):
+    """Term counts: folded non-stopwords, the title counted TITLE_WEIGHT times."""
+    counts = Counter(_fold(w) for w in words(text) if w not in STOPWORDS and len(w) > 2)
+    for t, n in title_terms(title).items():
+        counts[t] += n * TITLE_WEIGHT
+    return counts
+
+
+def title_terms(title):
+    return Counter(_fold(w) for w in words(title) if w not in STOPWORDS and len(w) > 2)
+
+
+def _tfidf(counts, idf, unseen):
+    """Unit-length TF-IDF vector of a term-count mapping."""
+    vec = {t: (1 + math.log(tf)) * idf.get(t, unseen) for t, tf in counts.items()}
+    norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+    return {t: w / norm for t, w in vec.items()}
+
+
+def _postings(vectors):
+    postings = defaultdict(list)
+    for key, vec in vectors.items():
+        for t, w in vec.items():
+            postings[t].append((key, w))
+    return postings
+
+
+def _idf(counts):
+    df = Counter()
+    for c in counts:
+        df.update(c.keys())
+    n = len(counts)
+    return {t: math.log((1 + n) / (1 + d)) + 1 for t, d in df.items()}, math.log(1 + n) + 1
+
+
+def minhash(ws):
+    """MinHash signature of the 5-word shingles of ws, or None if too short."""
+    if len(ws) < SHINGLE:
+        return None
+    hs = {int.from_bytes(hashlib.blake2b(' '.join(ws[i:i + SHINGLE]).encode(), digest_size=8).digest(), 'little')
+          for i in range(len(ws) - SHINGLE + 1)}
+    return [min((a * h + b) % _PRIME for h in hs) for a, b in _PERMS]
+
+
+def _bands(sig):
+    return [(b, tuple(sig[b * _ROWS:(b + 1) * _ROWS])) for b in range(BANDS)]
+
+
+# --- Index ---
+
+class BlogIndex:
+    def __init__(self, path=INDEX_DB, dirs=BLOG_DIRS):
+        self.dirs = {name: Path(d) for name, d in dirs.items()}
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), timeout=30, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            self.db.execute("DROP TABLE IF EXISTS docs")
+            self.db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS docs (
+            key TEXT PRIMARY KEY, corpus TEXT, slug TEXT, title TEXT,
+            mtime REAL, size INTEGER, sha TEXT, terms TEXT, sig BLOB)""")
+        self.lock = threading.Lock()
+        self._model = None
+
+    # --- Updating ---
+
+    def refresh(self):
+        """Bring the index in line with the blog directories. Returns (indexed, removed)."""
+        with self.lock:
+            stored = {r[0]: r[1:] for r in self.db.execute("SELECT key, mtime, size, sha FROM docs")}
+        seen, indexed = set(), 0
+        for corpus, directory in self.dirs.items():
+            for path in sorted(directory.glob("*.html")):
+                key = f"{corpus}/{path.stem}"
+                seen.add(key)
+                st = path.stat()
+                row = stored.get(key)
+                if row and row[0] == st.st_mtime and row[1] == st.st_size:
+                    continue
+                indexed += self._index(corpus, path, st, known_sha=row[2] if row else None)
+        gone = set(stored) - seen
+        if gone:
+            with self.lock:
+                self.db.executemany("DELETE FROM docs WHERE key = ?", [(k,) for k in gone])
+        if indexed or gone:
+            self._model = None
+        return indexed, len(gone)
+
+    def add(self, path, corpus=None):
+        """Index one post now (e.g. right after it is saved). Returns its key."""
+        path = Path(path)
+        corpus = corpus or next((n for n, d in self.dirs.items() if path.parent == d), path.parent.name)
+        if self._index(corpus, path, path.stat()):
+            self._model = None
+        return f"{corpus}/{path.stem}"
+
+    def _index(self, corpus, path, st, known_sha=None):
+        raw = path.read_bytes()
+        sha = hashlib.sha256(raw).hexdigest()
+        key = f"{corpus}/{path.stem}"
+        with self.lock:
+            if sha == known_sha:
+                # Touched but not edited: just remember the new stat
+                self.db.execute("UPDATE docs SET mtime = ?, size = ? WHERE key = ?", (st.st_mtime, st.st_size, key))
+                return 0
+        title, text = extract(raw.decode("utf-8", errors="ignore"))
+        sig = minhash(words(text))
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO docs (key, corpus, slug, title, mtime, size, sha, terms, sig) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, corpus, path.stem, title, st.st_mtime, st.st_size, sha,
+                 json.dumps(terms(title, text)), array('Q', sig).tobytes() if sig else None))
+        return 1
+
+    # --- Query model ---
+
+    def _load(self):
+        """Build IDF weights, unit vectors, postings and LSH buckets from the stored rows."""
+        if self._model is not None:
+            return self._model
+        with self.lock:
+            rows = self.db.execute("SELECT key, corpus, slug, title, terms, sig FROM docs").fetchall()
+        meta, counts, titles, sigs = {}, {}, {}, {}
+        for key, corpus, slug, title, t, sig in rows:
+            meta[key] = (corpus, slug, title)
+            counts[key] = json.loads(t)
+            titles[key] = title_terms(title)
+            if sig:
+                sigs[key] = array('Q', sig).tolist()
+        idf, unseen = _idf(counts.values())
+        title_idf, title_unseen = _idf(titles.values())
+        vectors = {key: _tfidf(c, idf, unseen) for key, c in counts.items()}
+        title_vectors = {key: _tfidf(c, title_idf, title_unseen) for key, c in titles.items()}
+        buckets = defaultdict(list)
+        for key, sig in sigs.items():
+            for band in _bands(sig):
+                buckets[band].append(key)
+        self._model = {"meta": meta, "idf": (idf, unseen), "title_idf": (title_idf, title_unseen),
+                       "vectors": vectors, "postings": _postings(vectors),
+                       "title_postings": _postings(title_vectors), "sigs": sigs, "buckets": buckets}
+        return self._model
+
+    def _cosines(self, vec, corpus=None, exclude=(), postings="postings"):
+        m = self._load()
+        scores = defaultdict(float)
+        for t, w in vec.items():
+            for key, dw in m[postings].get(t, ()):
+                scores[key] += w * dw
+        return {k: s for k, s in scores.items()
+                if k not in exclude and (corpus is None or m["meta"][k][0] == corpus)}
+
+    def _match(self, key, score):
+        corpus, slug, title = self._load()["meta"][key]
+        return Match(key, corpus, slug, title, round(score, 3))
+
+    # --- Queries ---
+
+    def duplicates(self, text, corpus=None, exclude=()):
+        """Posts the topic, title or draft (text or HTML) would cannibalize, best first.
+
+        A short topic/title scores the mean of its cosine against the post's
+        title and against the whole post, matching at TOPIC_DUP. A draft of
+        DRAFT_WORDS+ words matches on whole-post cosine >= DRAFT_DUP or an
+        estimated shingle Jaccard >= SHINGLE_DUP (LSH candidates only).
+        """
+        m = self._load()
+        title, body = extract(text)
+        ws = words(body)
+        exclude = set(exclude)
+        vec = _tfidf(terms(title, body), *m["idf"])
+        if len(ws) < DRAFT_WORDS:
+            short = title_terms(f"{title} {body}")
+            by_title = self._cosines(_tfidf(short, *m["title_idf"]), corpus, exclude, "title_postings")
+            by_post = self._cosines(vec, corpus, exclude)
+            hits = {k: s for k in by_title.keys() | by_post.keys()
+                    if (s := (by_title.get(k, 0) + by_post.get(k, 0)) / 2) >= TOPIC_DUP}
+        else:
+            hits = {k: s for k, s in self._cosines(vec, corpus, exclude).items() if s >= DRAFT_DUP}
+            sig = minhash(ws)
+            candidates = {k for band in _bands(sig) for k in m["buckets"].get(band, ())}
+            for k in candidates - exclude:
+                if corpus is not None and m["meta"][k][0] != corpus:
+                    continue
+                jaccard = sum(a == b for a, b in zip(sig, m["sigs"][k])) / NUM_PERM
+                if jaccard >= SHINGLE_DUP:
+                    hits[k] = max(hits.get(k, 0), jaccard)
+        return [self._match(k, s) for k, s in sorted(hits.items(), key=lambda kv: -kv[1])]
+
+    def related(self, key, k=5, corpus=None):
+        """Top-k posts most similar to an indexed post (key "corpus/slug"), best first.
+
+        corpus defaults to the post's own, since links are site-relative.
+        """
+        m = self._load()
+        vec = m["vectors"].get(key)
+        if vec is None:
+            return []
+        corpus = corpus or m["meta"][key][0]
+        scores = self._cosines(vec, corpus, exclude={key})
+        return [self._match(kk, s) for kk, s in sorted(scores.items(), key=lambda kv: -kv[1])[:k]]
+
+    def related_to_text(self, text, k=5, corpus=None, exclude=()):
+        """Top-k posts most similar to a draft or topic that is not indexed yet."""
+        title, body = extract(text)
+        scores = self._cosines(_tfidf(terms(title, body), *self._load()["idf"]), corpus, set(exclude))
+        return [self._match(kk, s) for kk, s in sorted(scores.items(), key=lambda kv: -kv[1])[:k]]
+
+    def counts(self):
+        with self.lock:
+            return dict(self.db.execute("SELECT corpus, COUNT(*) FROM docs GROUP BY corpus").fetchall())
+
+
+def main():
+    args = sys.argv[1:]
+    if "--rebuild" in args:
+        INDEX_DB.unlink(missing_ok=True)
+        args.remove("--rebuild")
+    corpus = None
+    if "--corpus" in args:
+        i = args.index("--corpus")
+        corpus = args[i + 1]
+        del args[i:i + 2]
+    k = 5
+    if "-k" in args:
+        i = args.index("-k")
+        k = int(args[i + 1])
+        del args[i:i + 2]
+
+    idx = BlogIndex()
+    t0 = time.time()
+    indexed, removed = idx.refresh()
+    counts = idx.counts()
+    print(f"Index: {', '.join(f'{v} {c}' for c, v in sorted(counts.items())) or 'empty'} "
+          f"({indexed} re-indexed, {removed} removed, {(time.time() - t0) * 1000:.0f}ms)")
+
+    if args[:1] == ["dup"] and len(args) > 1:
+        t0 = time.time()
+        hits = idx.duplicates(" ".join(args[1:]), corpus=corpus)
+        print(f"{len(hits)} near-duplicate(s) in {(time.time() - t0) * 1000:.1f}ms")
+        for h in hits:
+            print(f"  {h.score:.3f}  {h.key}  {h.title}")
+        return 1 if hits else 0
+    if args[:1] == ["related"] and len(args) > 1:
+        key = args[1] if "/" in args[1] else next(
+            (f"{c}/{args[1]}" for c in counts if f"{c}/{args[1]}" in idx._load()["meta"]), args[1])
+        t0 = time.time()
+        hits = idx.related(key, k=k, corpus=corpus)
+        print(f"Related to {key} in {(time.time() - t0) * 1000:.1f}ms")
+        for h in hits:
+            print(f"  {h.score:.3f}  {h.key}  {h.title}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
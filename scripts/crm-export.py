@@ -4,91 +4,320 @@ crm-export.py — Full CRM backup: exports JSON + pulls raw DB dump.
 Usage:
   python3 crm-export.py [output_file]          # full export JSON
   python3 crm-export.py --raw-db [output_file] # raw data.json dump (DR copy)
+  python3 crm-export.py [--raw-db] --stream output_file[.gz|.zst]
+
+--stream never holds the export in memory: it is read in 1 MB chunks,
+compressed on the fly (by output extension: .gz → gzip, .zst → zstd) into
+output_file.part, and record counts come from a byte scanner instead of a
+full parse. Every CHECKPOINT_BYTES the compressed stream is closed at a
+member/frame boundary and the position saved to output_file.part.json, so a
+failed attempt — or a re-run after a crash — resumes with an HTTP Range
+request instead of starting over. The .part file is renamed over
+output_file only once the whole document has arrived.
 Exits 0 on success, 1 on failure.
 """
-import urllib.request, json, http.cookiejar, sys, os, time
+import urllib.request, urllib.error, json, http.cookiejar, sys, os, time, re, gzip
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 CRM      = "https://sales.kandedash.com"
 PASSWORD = "kande2026"
 API_KEY  = "kande2026"
 
+CHUNK            = 1 << 20    # bytes per read
+CHECKPOINT_BYTES = 16 << 20   # raw bytes between resume points
+
 jar = http.cookiejar.CookieJar()
 opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
 opener.addheaders = [('User-Agent', 'Mozilla/5.0')]
 
 raw_mode = '--raw-db' in sys.argv
+stream_mode = '--stream' in sys.argv
 args = [a for a in sys.argv[1:] if not a.startswith('--')]
 out_file = args[0] if args else None
 
-try:
+
+class RecordCounter:
+    """
+    Counts the objects in each top-level array of a JSON document as it
+    streams past, without parsing it. complete() says whether every bracket
+    was closed, i.e. the document was not cut off.
+    """
+    # A whole string (plus ':' if it is a key), a lone quote (string cut off
+    # at the chunk edge), or a bracket
+    TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"(\s*:)?|"|[\[\]{}]')
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.stack = list(state.get('stack', ''))
+        self.key = state.get('key')
+        self.counts = dict(state.get('counts', {}))
+        self.has_error = state.get('has_error', False)
+        self.carry = state.get('carry', '').encode('latin-1')
+
+    def feed(self, data):
+        buf = self.carry + data if self.carry else data
+        stack, counts = self.stack, self.counts
+        self.carry = b''
+        for m in self.TOKEN.finditer(buf):
+            t = m.group()
+            if t[0] == 0x22:  # '"'
+                if len(t) == 1 or (len(stack) == 1 and not m.group(1) and not buf[m.end():].strip()):
+                    self.carry = buf[m.start():]  # finish this string (or find its ':') next chunk
+                    break
+                if m.group(1) and len(stack) == 1:
+                    self.key = json.loads(t[:m.start(1) - m.start()])
+                    self.has_error = self.has_error or self.key == 'error'
+            elif t in b'[{':
+                if len(stack) == 1 and t == b'[':
+                    counts.setdefault(self.key, 0)
+                elif len(stack) == 2 and t == b'{' and stack[1] == '[':
+                    counts[self.key] += 1
+                stack.append(t.decode())
+            elif stack:
+                stack.pop()
+
+    def complete(self):
+        return not self.stack and not self.carry and self.key is not None
+
+    def state(self):
+        return {'stack': ''.join(self.stack), 'key': self.key, 'counts': dict(self.counts),
+                'has_error': self.has_error, 'carry': self.carry.decode('latin-1')}
+
+
+def codec_for(path):
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError("zstd output needs the zstandard package (pip install zstandard)")
+        return 'zstd'
+    return None
+
+
+def open_member(f, codec):
+    """A compressor appending one gzip member / zstd frame to f. Concatenated
+    members decompress as a single stream, which is what makes resume work."""
+    if codec == 'gzip':
+        return gzip.GzipFile(fileobj=f, mode='wb', compresslevel=6, mtime=0)
+    return zstandard.ZstdCompressor(level=3).stream_writer(f, closefd=False)
+
+
+def load_state(state_file, part, url, codec):
+    fresh = {'url': url, 'codec': codec, 'offset': 0, 'size': 0, 'etag': None, 'counter': None}
+    try:
+        with open(state_file) as f:
+            state = json.load(f)
+        if state.get('url') == url and state.get('codec') == codec and os.path.getsize(part) >= state['size']:
+            return state
+    except (OSError, ValueError):
+        pass
+    return fresh
+
+
+def save_state(state_file, state):
+    tmp = state_file + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, state_file)
+
+
+def download_once(url, part, state_file, state, open_url):
+    """
+    One attempt: fetch from state['offset'] to the end into part, saving a
+    checkpoint every CHECKPOINT_BYTES. state only ever holds a checkpoint, so
+    after a failure the next attempt picks up from the last one. Returns the
+    finished RecordCounter.
+    """
+    headers = {}
+    if state['offset']:
+        headers['Range'] = f"bytes={state['offset']}-"
+        if state['etag']:
+            headers['If-Range'] = state['etag']
+    with open_url(url, headers) as r:
+        if state['offset'] and r.status != 206:
+            print(f"Export changed since byte {state['offset']}, starting over", file=sys.stderr)
+            state.update(offset=0, size=0, counter=None)
+        state['etag'] = r.headers.get('ETag')
+        length = r.headers.get('Content-Length')
+        total = state['offset'] + int(length) if length else None
+
+        counter = RecordCounter(state['counter'])
+        offset = state['offset']
+        mode = 'r+b' if state['size'] and os.path.exists(part) else 'wb'
+        with open(part, mode) as f:
+            f.truncate(state['size'])
+            f.seek(state['size'])
+            writer, since = None, 0
+
+            def checkpoint():
+                if writer is not None and writer is not f:
+                    writer.close()
+                f.flush()
+                os.fsync(f.fileno())
+                state.update(offset=offset, size=f.tell(), counter=counter.state())
+                save_state(state_file, state)
+
+            while True:
+                chunk = r.read(CHUNK)
+                if not chunk:
+                    break
+                counter.feed(chunk)
+                if writer is None:
+                    writer = open_member(f, state['codec']) if state['codec'] else f
+                writer.write(chunk)
+                offset += len(chunk)
+                since += len(chunk)
+                if since >= CHECKPOINT_BYTES:
+                    checkpoint()
+                    writer, since = None, 0
+            checkpoint()
+
+    if total is not None and state['offset'] != total:
+        raise IOError(f"short read: {state['offset']} of {total} bytes")
+    if not counter.complete():
+        raise ValueError(f"export ended mid-document after {state['offset']} bytes")
+    return counter
+
+
+def stream_export(url, out_file, open_url, attempts, backoff):
+    """Resumable streamed download of url into out_file. Returns (RecordCounter, raw bytes)."""
+    part, state_file = out_file + '.part', out_file + '.part.json'
+    codec = codec_for(out_file)
+    state = load_state(state_file, part, url, codec)
+    if state['offset']:
+        print(f"Resuming {out_file} at byte {state['offset']}", file=sys.stderr)
+    for attempt in range(attempts):
+        try:
+            counter = download_once(url, part, state_file, state, open_url)
+            break
+        except Exception as e:
+            if isinstance(e, urllib.error.HTTPError) and e.code == 416:
+                # Resume point is past the end of a new snapshot — start over
+                state.update(offset=0, size=0, etag=None, counter=None)
+            if attempt == attempts - 1:
+                raise
+            wait = backoff * (attempt + 1)
+            print(f"Attempt {attempt+1} failed at byte {state['offset']} ({e}), retrying in {wait}s...",
+                  file=sys.stderr)
+            time.sleep(wait)
+    os.replace(part, out_file)
+    os.remove(state_file)
+    return counter, state['offset']
+
+
+def open_raw_db(url, headers):
+    return urllib.request.urlopen(urllib.request.Request(url, headers={
+        'x-api-key': API_KEY, 'User-Agent': 'Mozilla/5.0', **headers}), timeout=90)
+
+
+def open_export(url, headers):
+    jar.clear()
+    req = urllib.request.Request(f"{CRM}/api/auth/login",
+        data=json.dumps({'password': PASSWORD}).encode(),
+        headers={'Content-Type': 'application/json', 'User-Agent': 'Mozilla/5.0'})
+    with opener.open(req, timeout=20) as r:
+        result = json.loads(r.read())
+    if not result.get('success'):
+        raise RuntimeError(f"Auth failed: {result}")
+    return opener.open(urllib.request.Request(url, headers=headers), timeout=90)
+
+
+def run_stream():
+    if not out_file:
+        raise RuntimeError("--stream needs an output file")
+    t0 = time.time()
     if raw_mode:
-        # Raw DB dump — uses API key, no session needed
-        # Retry up to 3 times with backoff (Railway can 502 transiently on cold wake)
-        req = urllib.request.Request(f"{CRM}/api/backup/raw-db",
-            headers={'x-api-key': API_KEY, 'User-Agent': 'Mozilla/5.0'})
-        data = None
-        for attempt in range(3):
-            try:
-                with urllib.request.urlopen(req, timeout=90) as r:
-                    data = r.read()
-                break
-            except Exception as e:
-                if attempt < 2:
-                    wait = 15 * (attempt + 1)
-                    print(f"Attempt {attempt+1} failed ({e}), retrying in {wait}s...", file=sys.stderr)
-                    time.sleep(wait)
-                else:
-                    raise
-        if data is None:
-            raise RuntimeError("All retry attempts failed")
-        parsed = json.loads(data)
-        prospects = len(parsed.get('prospects', []))
-        activities = len(parsed.get('activities', []))
-        photos = len(parsed.get('prospect_photos', []))
-        total_keys = len(parsed.keys())
-        print(f"raw-db: {total_keys} collections | prospects:{prospects} activities:{activities} photos:{photos}", file=sys.stderr)
+        counter, raw_bytes = stream_export(f"{CRM}/api/backup/raw-db", out_file, open_raw_db, 3, 15)
     else:
-        # Session-based full export — retry up to 4x with backoff
-        data = None
-        for attempt in range(4):
-            try:
-                jar.clear()
-                req = urllib.request.Request(f"{CRM}/api/auth/login",
-                    data=json.dumps({'password': PASSWORD}).encode(),
-                    headers={'Content-Type': 'application/json', 'User-Agent': 'Mozilla/5.0'})
-                with opener.open(req, timeout=20) as r:
-                    result = json.loads(r.read())
-                if not result.get('success'):
-                    raise RuntimeError(f"Auth failed: {result}")
-                with opener.open(urllib.request.Request(f"{CRM}/api/export/json"), timeout=90) as r:
-                    data = r.read()
-                parsed = json.loads(data)
-                if 'error' in parsed:
-                    raise RuntimeError(f"Export error: {parsed}")
-                break
-            except Exception as e:
-                if attempt < 3:
-                    wait = 20 * (attempt + 1)
-                    print(f"Attempt {attempt+1} failed ({e}), retrying in {wait}s...", file=sys.stderr)
-                    time.sleep(wait)
-                else:
-                    raise
-        if data is None:
-            raise RuntimeError("All retry attempts failed")
-
-        prospects = len(parsed.get('prospects', []))
-        activities = len(parsed.get('activities', []))
-        photos = len(parsed.get('prospect_photos', []))
-        print(f"prospects:{prospects} activities:{activities} photos:{photos}", file=sys.stderr)
-
-    if out_file:
-        with open(out_file, 'wb') as f:
-            f.write(data)
-    else:
-        sys.stdout.buffer.write(data)
+        counter, raw_bytes = stream_export(f"{CRM}/api/export/json", out_file, open_export, 4, 20)
+        if counter.has_error and 'prospects' not in counter.counts:
+            os.remove(out_file)
+            raise RuntimeError("Export error: server returned an error document")
+    c = counter.counts
+    summary = f"prospects:{c.get('prospects', 0)} activities:{c.get('activities', 0)} photos:{c.get('prospect_photos', 0)}"
+    print(f"raw-db: {len(c)} collections | {summary}" if raw_mode else summary, file=sys.stderr)
+    print(f"{out_file}: {raw_bytes / 1e6:.1f} MB → {os.path.getsize(out_file) / 1e6:.1f} MB "
+          f"in {time.time() - t0:.1f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    try:
+        if stream_mode:
+            run_stream()
+            sys.exit(0)
+
+        if raw_mode:
+            # Raw DB dump — uses API key, no session needed
+            # Retry up to 3 times with backoff (Railway can 502 transiently on cold wake)
+            req = urllib.request.Request(f"{CRM}/api/backup/raw-db",
+                headers={'x-api-key': API_KEY, 'User-Agent': 'Mozilla/5.0'})
+            data = None
+            for attempt in range(3):
+                try:
+                    with urllib.request.urlopen(req, timeout=90) as r:
+                        data = r.read()
+                    break
+                except Exception as e:
+                    if attempt < 2:
+                        wait = 15 * (attempt + 1)
+                        print(f"Attempt {attempt+1} failed ({e}), retrying in {wait}s...", file=sys.stderr)
+                        time.sleep(wait)
+                    else:
+                        raise
+            if data is None:
+                raise RuntimeError("All retry attempts failed")
+            parsed = json.loads(data)
+            prospects = len(parsed.get('prospects', []))
+            activities = len(parsed.get('activities', []))
+            photos = len(parsed.get('prospect_photos', []))
+            total_keys = len(parsed.keys())
+            print(f"raw-db: {total_keys} collections | prospects:{prospects} activities:{activities} photos:{photos}", file=sys.stderr)
+        else:
+            # Session-based full export — retry up to 4x with backoff
+            data = None
+            for attempt in range(4):
+                try:
+                    jar.clear()
+                    req = urllib.request.Request(f"{CRM}/api/auth/login",
+                        data=json.dumps({'password': PASSWORD}).encode(),
+                        headers={'Content-Type': 'application/json', 'User-Agent': 'Mozilla/5.0'})
+                    with opener.open(req, timeout=20) as r:
+                        result = json.loads(r.read())
+                    if not result.get('success'):
+                        raise RuntimeError(f"Auth failed: {result}")
+                    with opener.open(urllib.request.Request(f"{CRM}/api/export/json"), timeout=90) as r:
+                        data = r.read()
+                    parsed = json.loads(data)
+                    if 'error' in parsed:
+                        raise RuntimeError(f"Export error: {parsed}")
+                    break
+                except Exception as e:
+                    if attempt < 3:
+                        wait = 20 * (attempt + 1)
+                        print(f"Attempt {attempt+1} failed ({e}), retrying in {wait}s...", file=sys.stderr)
+                        time.sleep(wait)
+                    else:
+                        raise
+            if data is None:
+                raise RuntimeError("All retry attempts failed")
+
+            prospects = len(parsed.get('prospects', []))
+            activities = len(parsed.get('activities', []))
+            photos = len(parsed.get('prospect_photos', []))
+            print(f"prospects:{prospects} activities:{activities} photos:{photos}", file=sys.stderr)
+
+        if out_file:
+            with open(out_file, 'wb') as f:
+                f.write(data)
+        else:
+            sys.stdout.buffer.write(data)
 
-    sys.exit(0)
+        sys.exit(0)
 
-except Exception as e:
-    print(f"Export failed: {e}", file=sys.stderr)
-    sys.exit(1)
+    except Exception as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        sys.exit(1)
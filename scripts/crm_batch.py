@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+crm_batch.py — Client-side buffer for POST /api/activities/batch.
+
+Activity writers (email-crm-sync) queue
+{prospect_id, type, notes, direction, status?} items and flush once per cycle
+instead of one POST per activity plus one PUT per status change.
+
+    buf = ActivityBuffer("https://vend.kandedash.com", "kande2026", source="email-crm-sync")
+    buf.add(42, "email_received", "Inbound: 'Re: hi' from a@b.com", "inbound",
+            external_id=msg_id)
+    buf.add(42, "proposal_sent", "Sent: 'Proposal'", "outbound", status="proposal_sent")
+    accepted = buf.flush()    # {external_id or index: activity id} for items that landed
+
+If the server predates the batch endpoint (404), flush() falls back to the
+per-item routes so callers don't have to care.
+"""
+
+import json, urllib.request, urllib.error
+
+MAX_BATCH = 500   # server accepts up to 1000 per request
+
+
+class ActivityBuffer:
+    def __init__(self, crm_base, crm_key, source="", dry_run=False, timeout=30, log=print):
+        self.crm_base = crm_base.rstrip("/")
+        self.crm_key = crm_key
+        self.source = source
+        self.dry_run = dry_run
+        self.timeout = timeout
+        self.log = log
+        self.items = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, prospect_id, atype, notes, direction=None, status=None, date=None, external_id=None):
+        item = {"prospect_id": prospect_id, "type": atype, "notes": notes,
+                "direction": direction, "source": self.source}
+        if status:
+            item["status"] = status
+        if date:
+            item["date"] = date
+        if external_id:
+            item["external_id"] = external_id
+        self.items.append(item)
+
+    def _key(self, i, item):
+        return item.get("external_id") or i
+
+    def flush(self):
+        """Send everything queued. Returns {external_id or index: activity id or True} for accepted items."""
+        items, self.items = self.items, []
+        if not items:
+            return {}
+        if self.dry_run:
+            for item in items:
+                self.log(f"      [DRY RUN] log {item['type']} → {item['prospect_id']}"
+                         + (f" (status → {item['status']})" if item.get("status") else ""))
+            return {self._key(i, it): True for i, it in enumerate(items)}
+
+        accepted = {}
+        for start in range(0, len(items), MAX_BATCH):
+            chunk = items[start:start + MAX_BATCH]
+            try:
+                resp = self._post("/api/activities/batch", {"items": chunk})
+            except urllib.error.HTTPError as e:
+                if e.code == 404:
+                    accepted.update(self._flush_per_item(chunk, start))
+                    continue
+                self.log(f"      ⚠️ batch flush failed ({e.code}): {len(chunk)} activities not logged")
+                continue
+            except Exception as e:
+                self.log(f"      ⚠️ batch flush failed: {e}: {len(chunk)} activities not logged")
+                continue
+            for r in resp.get("results", []):
+                i = r.get("i", -1)
+                if r.get("ok") and 0 <= i < len(chunk):
+                    accepted[self._key(start + i, chunk[i])] = r.get("id", True)
+                elif 0 <= i < len(chunk):
+                    self.log(f"      ⚠️ activity for {chunk[i]['prospect_id']} rejected: {r.get('error')}")
+        return accepted
+
+    # --- Transport ---
+
+    def _request(self, path, body, method="POST"):
+        return urllib.request.Request(
+            f"{self.crm_base}{path}", data=json.dumps(body).encode(), method=method,
+            headers={"x-api-key": self.crm_key, "Content-Type": "application/json"})
+
+    def _post(self, path, body):
+        with urllib.request.urlopen(self._request(path, body), timeout=self.timeout) as r:
+            return json.loads(r.read())
+
+    def _flush_per_item(self, chunk, start):
+        """Old servers: one activity POST (and status PUT) per item."""
+        accepted = {}
+        for i, item in enumerate(chunk):
+            pid = item["prospect_id"]
+            try:
+                body = {k: item[k] for k in ("type", "notes", "direction", "date") if item.get(k)}
+                with urllib.request.urlopen(self._request(f"/api/prospects/{pid}/activities", body),
+                                            timeout=10) as r:
+                    act = json.loads(r.read())
+                if item.get("status"):
+                    with urllib.request.urlopen(self._request(f"/api/prospects/{pid}",
+                                                              {"status": item["status"]}, "PUT"), timeout=10):
+                        pass
+                accepted[self._key(start + i, item)] = act.get("id", True)
+            except Exception as e:
+                self.log(f"      ⚠️ log failed: {e}")
+        return accepted
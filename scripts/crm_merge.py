@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+crm_merge.py — Client for POST /api/prospects/:id/merge.
+
+One round trip merges duplicates into a primary prospect on the server:
+fields per policy, notes appended, contacts / activities / photos / pipeline
+cards / outreach sends / tasks re-parented, duplicates deleted — all or
+nothing. dry_run returns the same diff without writing.
+
+    client = MergeClient("https://sales.kandedash.com", "kande2026")
+    diff = client.merge(3916, [518], dry_run=True)
+    print(format_diff(diff))
+    client.merge(3916, [518])
+
+CLI (previews unless --apply):
+    python3 crm_merge.py PRIMARY_ID DUP_ID [DUP_ID ...] [--policy fill] [--apply]
+"""
+
+import json, sys, urllib.request, urllib.error
+
+POLICIES = ("prefer_longer", "fill", "prefer_duplicate")
+
+# API blocks default Python User-Agent; use a browser-like one
+_UA = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
+
+
+class MergeError(Exception):
+    """status/detail come from the server; a 404 with no detail means no merge endpoint."""
+    def __init__(self, message, status=None, detail=""):
+        super().__init__(message)
+        self.status = status
+        self.detail = detail
+
+
+class MergeClient:
+    def __init__(self, crm_base, crm_key, timeout=60):
+        self.crm_base = crm_base.rstrip("/")
+        self.crm_key = crm_key
+        self.timeout = timeout
+
+    def merge(self, primary_id, duplicate_ids, policy="prefer_longer", dry_run=False):
+        """Merge duplicate_ids into primary_id. Returns the server's diff; raises MergeError."""
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        body = {"duplicate_ids": list(duplicate_ids), "policy": policy, "dry_run": dry_run}
+        req = urllib.request.Request(
+            f"{self.crm_base}/api/prospects/{primary_id}/merge", data=json.dumps(body).encode(),
+            headers={"x-api-key": self.crm_key, "Content-Type": "application/json", "User-Agent": _UA})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as r:
+                return json.loads(r.read())
+        except urllib.error.HTTPError as e:
+            try:
+                detail = json.loads(e.read()).get("error", "")
+            except Exception:
+                detail = ""
+            raise MergeError(f"merge #{primary_id} failed ({e.code}) {detail}".strip(), e.code, detail)
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise MergeError(f"merge #{primary_id} failed: {e}")
+
+
+def format_diff(diff, indent="  "):
+    """Human-readable summary of a merge (or dry-run) response."""
+    dups = ", ".join(f"#{d}" for d in diff.get("duplicate_ids", []))
+    verb = "Would merge" if diff.get("dry_run") else "Merged"
+    lines = [f"{indent}{verb} {dups} → #{diff.get('primary_id')} ({diff.get('policy')})"]
+    for field, change in (diff.get("fields") or {}).items():
+        lines.append(f"{indent}  📝 {field}: '{str(change.get('from'))[:40]}' → '{str(change.get('to'))[:40]}'")
+    moved = {k: v for k, v in (diff.get("moved") or {}).items() if v}
+    dropped = {k: v for k, v in (diff.get("dropped") or {}).items() if v}
+    if moved:
+        lines.append(f"{indent}  📦 moved: " + ", ".join(f"{v} {k}" for k, v in moved.items()))
+    if dropped:
+        lines.append(f"{indent}  ⏭️ dropped as duplicates: " + ", ".join(f"{v} {k}" for k, v in dropped.items()))
+    return "\n".join(lines)
+
+
+def main():
+    args = sys.argv[1:]
+    policy = args[args.index("--policy") + 1] if "--policy" in args else "prefer_longer"
+    ids = [int(a) for a in args if a.isdigit()]
+    if len(ids) < 2:
+        print(__doc__)
+        return 1
+    client = MergeClient("https://sales.kandedash.com", "kande2026")
+    try:
+        print(format_diff(client.merge(ids[0], ids[1:], policy, dry_run="--apply" not in args)))
+    except MergeError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
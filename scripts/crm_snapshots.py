@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+crm_snapshots.py — Content-addressed, incremental store for CRM raw-db backups.
+
+Every crm-export.py --raw-db run used to be kept as a complete copy of the
+whole DB, although only a handful of records change between runs. This
+splits each dump into records and stores only what changed:
+
+  packs/<id>.pack              zlib-compressed records that were new in
+                               snapshot <id>; each one is addressed by the
+                               blake2b hash of its canonical JSON
+  manifests/<id>.json.gz       per snapshot: top-level key order, record
+                               counts, and the delta against its parent —
+                               per collection the records added, modified
+                               (with the old ref) and deleted (with the old
+                               ref), keyed by record id
+  manifests/<id>.base.json.gz  the full state, every BASE_EVERY snapshots,
+                               so a restore replays a bounded chain
+
+A ref is [hash, pack, offset, length]. Records are keyed by their `id`
+(falling back to the content hash for id-less or duplicate-id rows); non-list
+top-level values such as nextId live in the VALUES pseudo-collection.
+
+Diff and churn only fold the deltas between two snapshots, so they cost
+O(change) and answer in milliseconds whatever the DB size. Restore replays
+from the nearest base and writes the stored bytes straight out (compact
+JSON, or --pretty to match JSON.stringify(db, null, 2)). Storage and upload
+per backup are one pack of changed records plus a small manifest. The
+manifest is written last, so an interrupted ingest leaves no snapshot.
+
+Usage:
+    from crm_snapshots import SnapshotStore
+    store = SnapshotStore()
+    store.ingest_file('raw-db-latest.json')
+    store.diff(old_id, new_id)     # {collection: {'added': {...}, 'removed': {...}, 'modified': {...}}}
+    store.restore(snapshot_id, 'restored.json')
+
+CLI:
+    python3 crm_snapshots.py ingest FILE[.gz|.zst] [--source NAME]
+    python3 crm_snapshots.py list
+    python3 crm_snapshots.py diff [OLD] [NEW] [--show]   # default: previous vs latest
+    python3 crm_snapshots.py restore [ID] OUT [--pretty]
+    python3 crm_snapshots.py churn [--last N]
+Snapshot ids can be abbreviated to any unique prefix.
+"""
+
+import gzip, hashlib, json, os, sys, time, zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+STORE_DIR  = Path('/Users/kurtishon/clawd/data/vend-backups/store')
+BASE_EVERY = 50          # snapshots between full-state manifests
+VALUES     = '@values'   # pseudo-collection for non-list top-level keys
+
+
+def canonical(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def record_hash(data):
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+def open_dump(path):
+    """Open a raw-db dump, plain or compressed by extension (crm-export.py --stream output)."""
+    path = str(path)
+    if path == '-':
+        return sys.stdin.buffer
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError('reading .zst needs the zstandard package (pip install zstandard)')
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'))
+    return open(path, 'rb')
+
+
+def split_records(doc):
+    """{collection: {key: canonical bytes}} in document order, plus the top-level key order."""
+    out = {VALUES: {}}
+    for name, value in doc.items():
+        if not isinstance(value, list):
+            out[VALUES][name] = canonical(value)
+            continue
+        recs = out[name] = {}
+        for item in value:
+            data = canonical(item)
+            key = None
+            if isinstance(item, dict) and item.get('id') is not None:
+                key = str(item['id'])
+            if key is None or key in recs:
+                key, n = '#' + record_hash(data), 1
+                while key in recs:
+                    n += 1
+                    key = f"#{record_hash(data)}~{n}"
+            recs[key] = data
+    return out, list(doc)
+
+
+class SnapshotStore:
+    def __init__(self, root=STORE_DIR):
+        self.root = Path(root)
+        self.packs = self.root / 'packs'
+        self.manifests = self.root / 'manifests'
+        self._manifest_cache = {}
+
+    # ── Snapshots and manifests ─────────────────────────────────────────────
+
+    def snapshots(self):
+        """Snapshot ids, oldest first."""
+        if not self.manifests.exists():
+            return []
+        return sorted(p.name[:-8] for p in self.manifests.glob('*.json.gz')
+                      if not p.name.endswith('.base.json.gz'))
+
+    def resolve(self, prefix):
+        ids = self.snapshots()
+        if prefix in ('latest', None):
+            if not ids:
+                raise KeyError('store is empty')
+            return ids[-1]
+        matches = [i for i in ids if i.startswith(prefix)]
+        if len(matches) != 1:
+            raise KeyError(f"snapshot '{prefix}' matches {len(matches)} snapshots")
+        return matches[0]
+
+    def manifest(self, sid):
+        if sid not in self._manifest_cache:
+            with gzip.open(self.manifests / f'{sid}.json.gz', 'rt') as f:
+                self._manifest_cache[sid] = json.load(f)
+        return self._manifest_cache[sid]
+
+    def chain(self, sid, stop=None):
+        """Manifests from sid back to (not including) stop, or back to and including the nearest base."""
+        out = []
+        while sid and sid != stop:
+            m = self.manifest(sid)
+            out.append(m)
+            if stop is None and m['base']:
+                break
+            sid = m['parent']
+        if stop is not None and sid != stop:
+            raise KeyError(f'{stop} is not an ancestor of {out[0]["id"]}')
+        return out[::-1]
+
+    def state(self, sid):
+        """Full {collection: {key: ref}} of a snapshot, in document order."""
+        chain = self.chain(sid)
+        if not chain:
+            return {}
+        with gzip.open(self.manifests / f'{chain[0]["id"]}.base.json.gz', 'rt') as f:
+            state = {c: dict(rows) for c, rows in json.load(f).items()}
+        for m in chain[1:]:
+            for coll, d in m['delta'].items():
+                recs = state.setdefault(coll, {})
+                for k in d.get('del', ()):
+                    del recs[k]
+                for k, (ref, _old) in d.get('mod', {}).items():
+                    recs[k] = ref
+                recs.update(d.get('add', {}))
+                if 'order' in d:
+                    state[coll] = {k: recs[k] for k in d['order']}
+        return state
+
+    # ── Ingest ──────────────────────────────────────────────────────────────
+
+    def ingest_file(self, path, source=None):
+        with open_dump(path) as f:
+            raw = f.read()
+        return self.ingest(json.loads(raw), source=source or str(path), raw_bytes=len(raw))
+
+    def ingest(self, doc, source='', raw_bytes=0, now=None):
+        """Store a raw-db document as a new snapshot. Returns its manifest."""
+        now = now or datetime.now(timezone.utc)
+        sid = now.strftime('%Y%m%dT%H%M%SZ')
+        ids = self.snapshots()
+        parent = ids[-1] if ids else None
+        if parent and sid <= parent:
+            raise ValueError(f'snapshot {sid} is not newer than {parent}')
+        pstate = self.state(parent) if parent else {}
+        pmeta = self.manifest(parent) if parent else None
+        known = {ref[0]: ref for recs in pstate.values() for ref in recs.values()}
+
+        current, keys = split_records(doc)
+        self.packs.mkdir(parents=True, exist_ok=True)
+        self.manifests.mkdir(parents=True, exist_ok=True)
+        pack_tmp = self.packs / f'{sid}.pack.tmp'
+        state, delta, new_bytes = {}, {}, 0
+        with open(pack_tmp, 'wb') as pack:
+            for coll, recs in current.items():
+                prev = pstate.get(coll, {})
+                refs = state[coll] = {}
+                add, mod = {}, {}
+                for k, data in recs.items():
+                    h = record_hash(data)
+                    old = prev.get(k)
+                    if old is not None and old[0] == h:
+                        refs[k] = old
+                        continue
+                    ref = known.get(h)
+                    if ref is None:
+                        blob = zlib.compress(data, 6)
+                        ref = known[h] = [h, sid, pack.tell(), len(blob)]
+                        pack.write(blob)
+                        new_bytes += len(blob)
+                    refs[k] = ref
+                    if old is None:
+                        add[k] = ref
+                    else:
+                        mod[k] = [ref, old]
+                dels = {k: ref for k, ref in prev.items() if k not in recs}
+                d = {name: v for name, v in (('add', add), ('mod', mod), ('del', dels)) if v}
+                expected = [k for k in prev if k in recs] + [k for k in recs if k not in prev]
+                if list(recs) != expected:
+                    d['order'] = list(recs)
+                if d:
+                    delta[coll] = d
+            for coll in pstate.keys() - current.keys():
+                if pstate[coll]:
+                    delta[coll] = {'del': pstate[coll]}
+
+        if new_bytes:
+            os.replace(pack_tmp, self.packs / f'{sid}.pack')
+        else:
+            pack_tmp.unlink()
+        depth = pmeta['depth'] + 1 if pmeta else 0
+        base = depth >= BASE_EVERY or pmeta is None
+        if base:
+            depth = 0
+            self._write_gz(self.manifests / f'{sid}.base.json.gz',
+                           {c: list(r.items()) for c, r in state.items()})
+        manifest = {
+            'id': sid, 'taken_at': now.isoformat(), 'source': source, 'parent': parent,
+            'base': base, 'depth': depth, 'keys': keys, 'raw_bytes': raw_bytes,
+            'new_bytes': new_bytes,
+            'counts': {c: len(r) for c, r in state.items()},
+            'delta': delta,
+        }
+        # Manifest last: it is what makes the snapshot exist
+        self._write_gz(self.manifests / f'{sid}.json.gz', manifest)
+        self._manifest_cache[sid] = manifest
+        return manifest
+
+    @staticmethod
+    def _write_gz(path, obj):
+        tmp = path.with_name(path.name + '.tmp')
+        with gzip.open(tmp, 'wt') as f:
+            json.dump(obj, f, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    # ── Diff / churn ────────────────────────────────────────────────────────
+
+    def diff(self, old, new):
+        """
+        Per collection, the records added, removed and modified between two
+        snapshots: {coll: {'added': {k: ref}, 'removed': {k: ref},
+        'modified': {k: [new_ref, old_ref]}}}. Folds only the deltas in between.
+        """
+        if old > new:
+            old, new = new, old
+        first, last = {}, {}   # (coll, key) → (event, ref at old) / (event, ref at new)
+        for m in self.chain(new, stop=old):
+            for coll, d in m['delta'].items():
+                for event in ('add', 'mod', 'del'):
+                    for k, v in d.get(event, {}).items():
+                        at_old = None if event == 'add' else (v[1] if event == 'mod' else v)
+                        at_new = None if event == 'del' else (v[0] if event == 'mod' else v)
+                        first.setdefault((coll, k), (event, at_old))
+                        last[(coll, k)] = (event, at_new)
+        out = {}
+        for ck, (_, at_old) in first.items():
+            at_new = last[ck][1]
+            if at_old is None and at_new is None:
+                continue
+            if at_old is not None and at_new is not None and at_old[0] == at_new[0]:
+                continue   # changed and changed back
+            kind = 'added' if at_old is None else 'removed' if at_new is None else 'modified'
+            bucket = out.setdefault(ck[0], {'added': {}, 'removed': {}, 'modified': {}})[kind]
+            bucket[ck[1]] = [at_new, at_old] if kind == 'modified' else (at_new or at_old)
+        return out
+
+    def churn(self, last=None):
+        """Per collection over the last N snapshots: adds, mods, dels, new bytes, and
+        record counts before and after. Returns (stats, snapshot ids covered)."""
+        ids = self.snapshots()[-last:] if last else self.snapshots()
+        out = {}
+        for sid in ids:
+            m = self.manifest(sid)
+            if m['parent'] is None:
+                continue   # the first snapshot is the initial load, not churn
+            for coll, d in m['delta'].items():
+                c = out.setdefault(coll, {'snapshots': 0, 'add': 0, 'mod': 0, 'del': 0, 'new_bytes': 0})
+                c['snapshots'] += 1
+                for event in ('add', 'mod', 'del'):
+                    c[event] += len(d.get(event, ()))
+                for ref in list(d.get('add', {}).values()) + [v[0] for v in d.get('mod', {}).values()]:
+                    if ref[1] == sid:
+                        c['new_bytes'] += ref[3]
+        if ids:
+            parent = self.manifest(ids[0])['parent']
+            before = self.manifest(parent)['counts'] if parent else {}
+            after = self.manifest(ids[-1])['counts']
+            for coll, c in out.items():
+                c['before'], c['after'] = before.get(coll, 0), after.get(coll, 0)
+        return out, ids
+
+    # ── Restore ─────────────────────────────────────────────────────────────
+
+    def read(self, ref, _handles=None):
+        h, pack, off, length = ref
+        handles = _handles if _handles is not None else {}
+        f = handles.get(pack)
+        if f is None:
+            f = handles[pack] = open(self.packs / f'{pack}.pack', 'rb')
+        f.seek(off)
+        return zlib.decompress(f.read(length))
+
+    def restore(self, sid, out_path, pretty=False):
+        """Rebuild snapshot sid as a raw-db JSON file (atomic). Returns bytes written."""
+        m = self.manifest(sid)
+        state = self.state(sid)
+        values = state.get(VALUES, {})
+        handles = {}
+        tmp = f'{out_path}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                if pretty:
+                    doc = {}
+                    for key in m['keys']:
+                        if key in values:
+                            doc[key] = json.loads(self.read(values[key], handles))
+                        else:
+                            doc[key] = [json.loads(self.read(r, handles)) for r in state.get(key, {}).values()]
+                    f.write(json.dumps(doc, indent=2, ensure_ascii=False).encode())
+                else:
+                    f.write(b'{')
+                    for i, key in enumerate(m['keys']):
+                        f.write((b',' if i else b'') + canonical(key) + b':')
+                        if key in values:
+                            f.write(self.read(values[key], handles))
+                            continue
+                        f.write(b'[')
+                        for j, ref in enumerate(state.get(key, {}).values()):
+                            if j:
+                                f.write(b',')
+                            f.write(self.read(ref, handles))
+                        f.write(b']')
+                    f.write(b'}')
+                size = f.tell()
+            os.replace(tmp, out_path)
+        finally:
+            for h in handles.values():
+                h.close()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return size
+
+
+def _fmt_bytes(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f'{n:.0f} {unit}' if unit == 'B' else f'{n:.1f} {unit}'
+        n /= 1024
+
+
+def main():
+    args = sys.argv[1:]
+
+    def opt(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    store = SnapshotStore()
+    cmd = args[0] if args else 'list'
+    pos = [a for i, a in enumerate(args[1:], 1)
+           if not a.startswith('--') and not (i > 1 and args[i - 1] in ('--source', '--last'))]
+    t0 = time.time()
+
+    if cmd == 'ingest':
+        if not pos:
+            print(__doc__)
+            return 1
+        m = store.ingest_file(pos[0], source=opt('--source', None))
+        changed = sum(len(d.get(e, ())) for d in m['delta'].values() for e in ('add', 'mod', 'del'))
+        print(f"📦 {m['id']}: {changed} changed records in {len(m['delta'])} collections, "
+              f"{_fmt_bytes(m['new_bytes'])} stored for {_fmt_bytes(m['raw_bytes'])} dump"
+              f"{' (base)' if m['base'] else ''} in {time.time() - t0:.1f}s")
+        return 0
+
+    if cmd == 'list':
+        total_raw = 0
+        for sid in store.snapshots():
+            m = store.manifest(sid)
+            total_raw += m['raw_bytes']
+            changed = sum(len(d.get(e, ())) for d in m['delta'].values() for e in ('add', 'mod', 'del'))
+            print(f"  {sid}  {changed:7d} changed  +{_fmt_bytes(m['new_bytes']):>9}  "
+                  f"{sum(m['counts'].values()):8d} records{'  base' if m['base'] else ''}")
+        stored = sum(p.stat().st_size for d in (store.packs, store.manifests) if d.exists() for p in d.iterdir())
+        print(f"Store: {_fmt_bytes(stored)} for {_fmt_bytes(total_raw)} of full dumps")
+        return 0
+
+    if cmd == 'diff':
+        ids = store.snapshots()
+        old = store.resolve(pos[0]) if pos else ids[-2]
+        new = store.resolve(pos[1]) if len(pos) > 1 else ids[-1]
+        result = store.diff(old, new)
+        elapsed = (time.time() - t0) * 1000
+        handles = {}
+        for coll, kinds in sorted(result.items()):
+            print(f"{coll}: +{len(kinds['added'])} ~{len(kinds['modified'])} -{len(kinds['removed'])}")
+            for kind, sign in (('added', '+'), ('modified', '~'), ('removed', '-')):
+                for k, v in kinds[kind].items():
+                    line = f"  {sign} {k}"
+                    if '--show' in args and kind == 'modified':
+                        a, b = (json.loads(store.read(r, handles)) for r in (v[1], v[0]))
+                        if isinstance(a, dict) and isinstance(b, dict):
+                            fields = sorted(f for f in a.keys() | b.keys() if a.get(f) != b.get(f))
+                            line += f"  ({', '.join(fields)})"
+                    print(line)
+        print(f"{old} → {new}: {len(result)} collections changed ({elapsed:.0f} ms)")
+        return 0
+
+    if cmd == 'restore':
+        if not pos:
+            print(__doc__)
+            return 1
+        sid = store.resolve(pos[0] if len(pos) > 1 else 'latest')
+        size = store.restore(sid, pos[-1], pretty='--pretty' in args)
+        print(f"♻️  {sid} → {pos[-1]} ({_fmt_bytes(size)}) in {time.time() - t0:.1f}s")
+        return 0
+
+    if cmd == 'churn':
+        stats, ids = store.churn(int(opt('--last', 0)) or None)
+        if not ids:
+            print('store is empty')
+            return 0
+        print(f"Churn over {len(ids)} snapshots ({ids[0]} → {ids[-1]}):")
+        for coll, c in sorted(stats.items(), key=lambda kv: -(kv[1]['add'] + kv[1]['mod'] + kv[1]['del'])):
+            size = max(c['before'], c['after'])
+            pct = 100 * min(c['add'] + c['mod'] + c['del'], size) / size if size else 0
+            print(f"  {coll:32s} +{c['add']:<6d} ~{c['mod']:<6d} -{c['del']:<6d} {pct:5.1f}% of "
+                  f"{c['before']:>7d} → {c['after']:<7d} {_fmt_bytes(c['new_bytes']):>9} new")
+        return 0
+
+    print(__doc__)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
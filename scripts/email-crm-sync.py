@@ -3,11 +3,20 @@
 Bidirectional Email → CRM Sync
 Watches ALL inbound + outbound emails for both VendTech and PhotoBooths.
 Matches to CRM prospects and logs activities. Never double-logs.
+Each search resumes from a per-account watermark (newest message date seen)
+and pages past the result cap, so every run reads exactly the new mail. A
+backlog too big for one run is finished over several: the paging cursor is
+saved and the next run continues from it.
 
 Usage: python3 email-crm-sync.py [--dry-run]
 """
 
-import json, subprocess, re, datetime, sys, urllib.request
+import json, os, subprocess, re, datetime, sys, sqlite3, threading, time, urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+sys.path.insert(0, "/Users/kurtishon/clawd/scripts")
+from crm_batch import ActivityBuffer
 from pathlib import Path
 
 ACCOUNTS = [
@@ -40,6 +49,13 @@ INTERNAL_EMAILS = {
 ALL_STAFF = set()
 
 STATE_FILE = Path("/Users/kurtishon/clawd/logs/email-sync-state.json")
+SEEN_DB    = Path("/Users/kurtishon/clawd/logs/email-sync-seen.db")
+SEARCH_WINDOW_DAYS = 3                        # first-run window, before any watermark exists
+SEEN_RETENTION_DAYS = SEARCH_WINDOW_DAYS + 11  # keep IDs well past the window, then expire
+PAGE_SIZE     = 50     # results per gog search call
+MAX_PAGES     = 40     # safety stop per search per run
+WM_OVERLAP_S  = 3600   # re-read this much before the watermark; SeenStore drops the repeats
+GMAIL_WORKERS = 6   # concurrent gog processes per account for message details
 DRY_RUN    = "--dry-run" in sys.argv
 TODAY      = datetime.date.today().isoformat()
 
@@ -47,15 +63,78 @@ TODAY      = datetime.date.today().isoformat()
 def load_state():
     if STATE_FILE.exists():
         return json.loads(STATE_FILE.read_text())
-    return {"processed_ids": []}
+    return {}
 
 def save_state(state):
     STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
     STATE_FILE.write_text(json.dumps(state, indent=2))
 
+class SeenStore:
+    """
+    Processed Gmail message IDs in SQLite: indexed membership, per-message
+    inserts (nothing is rewritten), and expiry by age once an ID is far outside
+    the newer_than search window — so nothing still searchable is ever forgotten.
+    """
+    def __init__(self, path=SEEN_DB):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS seen (
+            id TEXT PRIMARY KEY, account TEXT, seen_at INTEGER NOT NULL)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS seen_at_idx ON seen (seen_at)")
+        self.lock = threading.Lock()   # accounts sync on parallel threads
+        self.legacy = set()            # dry runs: old state-file IDs, not written to the DB
+
+    def __contains__(self, msg_id):
+        return bool(self.seen_among([msg_id]))
+
+    def seen_among(self, msg_ids):
+        """The subset of msg_ids already processed (one indexed query)."""
+        msg_ids = list(msg_ids)
+        if not msg_ids:
+            return set()
+        with self.lock:
+            rows = self.db.execute(f"SELECT id FROM seen WHERE id IN ({','.join('?' * len(msg_ids))})",
+                                   msg_ids).fetchall()
+        return {r[0] for r in rows} | (self.legacy & set(msg_ids))
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def add(self, msg_id, account=""):
+        if DRY_RUN:
+            return
+        with self.lock:
+            self.db.execute("INSERT OR IGNORE INTO seen (id, account, seen_at) VALUES (?, ?, ?)",
+                            (msg_id, account, int(time.time())))
+
+    def import_legacy(self, state):
+        """One-time move of the old processed_ids list out of the JSON state file."""
+        ids = state.pop("processed_ids", None)
+        if ids and DRY_RUN:
+            self.legacy = set(ids)
+        elif ids:
+            with self.lock:
+                self.db.executemany("INSERT OR IGNORE INTO seen (id, account, seen_at) VALUES (?, '', ?)",
+                                    [(i, int(time.time())) for i in ids])
+        return len(ids or [])
+
+    def expire(self, days=SEEN_RETENTION_DAYS, keep_after=None):
+        """
+        Drop IDs older than `days`. keep_after (epoch s) lowers the cutoff so IDs
+        a held watermark will re-read are never expired out from under it.
+        """
+        if DRY_RUN:
+            return 0
+        cutoff = int(time.time()) - days * 86400
+        if keep_after is not None:
+            cutoff = min(cutoff, int(keep_after))
+        with self.lock:
+            return self.db.execute("DELETE FROM seen WHERE seen_at < ?", (cutoff,)).rowcount
+
 # ── Gmail ─────────────────────────────────────────────────────────────────────
 def gog(account, password, args):
-    import os
     env = dict(os.environ)
     env["GOG_KEYRING_PASSWORD"] = password
     env["GOG_ACCOUNT"]          = account
@@ -80,6 +159,59 @@ def search_emails(account, password, query, max_results=25):
             })
     return emails
 
+def parse_msg_date(raw):
+    """Epoch seconds from a gog DATE column, or None."""
+    raw = (raw or "").strip()
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%SZ"):
+        try:
+            return int(datetime.datetime.strptime(raw, fmt).timestamp())
+        except ValueError:
+            pass
+    try:
+        return int(parsedate_to_datetime(raw).timestamp())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def search_since(account, password, query, since=None, resume=None):
+    """
+    Every message matching query newer than the watermark `since` (epoch s).
+    No watermark yet → the newer_than window. When a page comes back full,
+    the next page is the same search with before:<oldest date on the page>,
+    so nothing is lost to the result cap however much mail arrived.
+
+    Returns (emails, newest, resume). newest is the newest message date this
+    scan has seen (including runs it resumed). resume is None once paging
+    reached `since`; otherwise {"before", "newest"} to pass back next run, which
+    then pages on from where this one stopped instead of re-reading the top.
+    """
+    window = f"after:{since - WM_OVERLAP_S}" if since else f"newer_than:{SEARCH_WINDOW_DAYS}d"
+    before = (resume or {}).get("before")
+    newest = (resume or {}).get("newest")
+    emails, ids = [], set()
+    for _ in range(MAX_PAGES):
+        q = f"{query} {window}" + (f" before:{before}" if before else "")
+        page = search_emails(account, password, q, max_results=PAGE_SIZE)
+        for e in page:
+            if e["id"] not in ids:
+                ids.add(e["id"])
+                emails.append(e)
+        dates = [d for d in (parse_msg_date(e["date"]) for e in page) if d]
+        if dates:
+            newest = max(dates + [newest or 0])
+        if len(page) < PAGE_SIZE:
+            return emails, newest, None
+        oldest = min(dates) if dates else None
+        if not oldest:
+            break  # can't page by date
+        if before and oldest + 1 >= before:
+            # A full page inside one second: step past that second rather than re-read it forever
+            print(f"    ⚠️ over {PAGE_SIZE} messages at {oldest}, skipping the rest of that second: {query[:50]}")
+            before = oldest
+        else:
+            before = oldest + 1
+    print(f"    ⚠️ search stopped after {len(emails)} results, resuming next run: {query[:50]}")
+    return emails, newest, {"before": before, "newest": newest}
+
 def get_email_detail(account, password, msg_id):
     """Returns dict with to, from, subject from gog get output."""
     out = gog(account, password, ["gmail", "get", msg_id])
@@ -90,6 +222,20 @@ def get_email_detail(account, password, msg_id):
             detail[parts[0].strip().lower()] = parts[1].strip()
     return detail
 
+def get_email_details(account, password, msg_ids):
+    """{msg_id: detail} for many messages — gog gets run concurrently, not one after another."""
+    msg_ids = list(dict.fromkeys(msg_ids))
+    if not msg_ids:
+        return {}
+    def fetch(mid):
+        try:
+            return mid, get_email_detail(account, password, mid)
+        except Exception as e:  # timeout etc. — treat like an empty gog reply
+            print(f"    ⚠️ gmail get {mid} failed: {e}")
+            return mid, {}
+    with ThreadPoolExecutor(max_workers=min(GMAIL_WORKERS, len(msg_ids))) as pool:
+        return dict(pool.map(fetch, msg_ids))
+
 def extract_email_addr(raw):
     """Extract plain email from 'Name <email>' or return as-is."""
     m = re.search(r'<([^>]+)>', raw)
@@ -125,23 +271,40 @@ def load_prospects(crm_base, crm_key, crm_auth="api-key"):
         print(f"    ⚠️ Could not load prospects: {e}")
         return []
 
-def find_prospect(prospects, email_addr):
-    email_addr = extract_email_addr(email_addr)
-    for p in prospects:
-        for c in (p.get("contacts") or []):
-            if extract_email_addr(c.get("email") or "") == email_addr:
-                return p
-        if email_addr in (p.get("primary_contact") or "").lower():
-            return p
-        # Domain match (non-generic)
-        if "@" in email_addr:
-            domain = email_addr.split("@")[1]
-            if domain not in {"gmail.com","yahoo.com","hotmail.com","outlook.com","icloud.com","aol.com"}:
-                for c in (p.get("contacts") or []):
-                    ce = (c.get("email") or "")
-                    if "@" in ce and ce.split("@")[1].lower() == domain:
-                        return p
-    return None
+GENERIC_DOMAINS = {"gmail.com","yahoo.com","hotmail.com","outlook.com","icloud.com","aol.com"}
+
+class ProspectMatcher:
+    """
+    Exact-address and corporate-domain hash indexes over one account's prospects,
+    built in memory once per run so each lookup is two dict gets instead of a
+    scan over every prospect and contact.
+    """
+    def __init__(self, prospects):
+        self.by_id = {p["id"]: p for p in prospects}
+        # First prospect in CRM order wins, like the old linear scan
+        self.by_email, self.by_domain = {}, {}
+        for p in prospects:
+            emails, domains = self._keys_for(p)
+            for addr in emails:
+                self.by_email.setdefault(addr, p["id"])
+            for domain in domains:
+                self.by_domain.setdefault(domain, p["id"])
+
+    @staticmethod
+    def _keys_for(p):
+        emails = {extract_email_addr(c.get("email") or "") for c in (p.get("contacts") or [])}
+        emails.discard("")
+        # primary_contact is usually a name, but some records carry an address there
+        emails.update(a.lower() for a in re.findall(r'[\w.+-]+@[\w-]+\.[\w.-]+', p.get("primary_contact") or ""))
+        domains = {e.split("@")[1] for e in emails if "@" in e} - GENERIC_DOMAINS
+        return emails, domains
+
+    def find(self, email_addr):
+        email_addr = extract_email_addr(email_addr)
+        pid = self.by_email.get(email_addr)
+        if pid is None and "@" in email_addr:
+            pid = self.by_domain.get(email_addr.split("@")[1])
+        return self.by_id.get(pid) if pid is not None else None
 
 def log_activity(crm_base, crm_key, crm_auth, prospect_id, atype, notes, direction):
     if DRY_RUN:
@@ -166,22 +329,14 @@ def log_activity(crm_base, crm_key, crm_auth, prospect_id, atype, notes, directi
         print(f"      ⚠️ log failed: {e}")
         return False
 
-def update_status(crm_base, crm_key, crm_auth, prospect_id, status):
-    if DRY_RUN or crm_auth == "bearer":
-        return  # PB inbox has no status field
-    body = json.dumps({"status": status}).encode()
-    req  = urllib.request.Request(
-        f"{crm_base}/api/prospects/{prospect_id}",
-        data=body, method="PUT",
-        headers={"x-api-key": crm_key, "Content-Type": "application/json"})
-    try:
-        with urllib.request.urlopen(req, timeout=10) as r:
-            pass
-    except:
-        pass
-
 # ── Sync one account ──────────────────────────────────────────────────────────
-def sync_account(acct, processed):
+def sync_account(acct, store, marks):
+    """
+    store: SeenStore. Each handled message is recorded as soon as it's done.
+    marks: this account's {search: newest message epoch} watermarks, plus
+    marks["resume"] = {search: paging cursor} for searches still working through
+    a backlog. A watermark only advances once its search has been read down to it.
+    """
     email    = acct["email"]
     password = acct["password"]
     crm_base = acct["crm_base"]
@@ -191,15 +346,63 @@ def sync_account(acct, processed):
     staff    = set(acct.get("staff", [])) | {email}
 
     prospects   = load_prospects(crm_base, crm_key, crm_auth)
+    matcher     = ProspectMatcher(prospects)
     new_seen    = []
     logged      = 0
 
+    buf         = ActivityBuffer(crm_base, crm_key, source="email-crm-sync", dry_run=DRY_RUN)
+    pending     = []   # message IDs whose activity is waiting in buf
+
+    def mark(mid):
+        new_seen.append(mid)
+        store.add(mid, label)
+
+    def record(mid, p, atype, notes, direction, status=None):
+        """Queue an activity (one batch POST at the end); PB inbox still logs per item."""
+        nonlocal logged
+        if crm_auth == "bearer":
+            if log_activity(crm_base, crm_key, crm_auth, p["id"], atype, notes, direction):
+                logged += 1
+            mark(mid)
+        else:
+            buf.add(p["id"], atype, notes, direction, status=status, date=TODAY, external_id=mid)
+            pending.append(mid)
+
     print(f"\n  [{label}] {len(prospects)} prospects loaded")
 
+    # ── Searches + message details, fetched up front and concurrently ────────
+    searches = {
+        "inbound":  "-from:noreply -from:no-reply -from:notifications",
+        "cc":       f"cc:{email} -from:{email} -from:noreply",
+        "outbound": f"from:{email} in:sent",
+    }
+    with ThreadPoolExecutor(max_workers=len(searches)) as pool:
+        results = dict(zip(searches, pool.map(
+            lambda name: search_since(email, password, searches[name], marks.get(name),
+                                      marks.get("resume", {}).get(name)), searches)))
+    found = {name: emails for name, (emails, _newest, _resume) in results.items()}
+    inbound, cc_emails, outbound = found["inbound"], found["cc"], found["outbound"]
+
+    new_marks = dict(marks)
+    resume = new_marks["resume"] = {}
+    for name, (_emails, newest, cursor) in results.items():
+        if cursor:
+            resume[name] = cursor
+        elif newest:
+            new_marks[name] = max(newest, marks.get(name) or 0)
+    # Snapshot before this run marks anything: a staff email seen by the inbound
+    # pass must still be handled by the CC pass
+    processed = store.seen_among(e["id"] for e in inbound + cc_emails + outbound)
+
+    need_detail = [e["id"] for e in cc_emails
+                   if e["id"] not in processed and extract_email_addr(e["from"]) in staff]
+    need_detail += [e["id"] for e in outbound if e["id"] not in processed]
+    details = get_email_details(email, password, need_detail)
+    print(f"  [{label}] {len(inbound)} inbound, {len(cc_emails)} cc, {len(outbound)} sent — "
+          f"{len(details)} details fetched")
+
     # ── Inbound from prospects ────────────────────────────────────────────────
     print(f"  [{label}] 📥 Checking inbound...")
-    inbound = search_emails(email, password,
-        "-from:noreply -from:no-reply -from:notifications newer_than:3d", max_results=30)
 
     for e in inbound:
         mid = e["id"]
@@ -211,22 +414,19 @@ def sync_account(acct, processed):
         subject   = e["subject"]
 
         if from_addr in INTERNAL_EMAILS:
-            new_seen.append(mid)
+            mark(mid)
             continue
 
-        p = find_prospect(prospects, from_addr)
+        p = matcher.find(from_addr)
         if p:
             atype = "email_reply_received" if re.match(r're:', subject, re.I) else "email_received"
             print(f"    ✉️  [{label}] Inbound: {p['name']} | {subject[:45]}")
-            if log_activity(crm_base, crm_key, crm_auth, p["id"], atype,
-                            f"Inbound: '{subject}' from {from_addr}", "inbound"):
-                logged += 1
-        new_seen.append(mid)
+            record(mid, p, atype, f"Inbound: '{subject}' from {from_addr}", "inbound")
+            continue
+        mark(mid)
 
     # ── Staff emails (CC'd to Kurtis) ─────────────────────────────────────────
     print(f"  [{label}] 👥 Checking staff CC'd emails...")
-    cc_emails = search_emails(email, password,
-        f"cc:{email} -from:{email} -from:noreply newer_than:3d", max_results=30)
 
     for e in cc_emails:
         mid       = e["id"]
@@ -239,35 +439,31 @@ def sync_account(acct, processed):
 
         # Only track emails from this account's staff
         if from_addr not in staff:
-            new_seen.append(mid)
+            mark(mid)
             continue
 
-        detail      = get_email_detail(email, password, mid)
+        detail      = details.get(mid, {})
         to_addr     = detail.get("to", "")
         sender_name = from_raw.split("<")[0].strip() or from_addr
 
-        p = find_prospect(prospects, to_addr) if to_addr else None
+        p = matcher.find(to_addr) if to_addr else None
         if p:
             print(f"    👥 [{label}] {sender_name}→{p['name']}: {subject[:40]}")
-            if log_activity(crm_base, crm_key, crm_auth, p["id"],
-                            "staff_email_sent",
-                            f"{sender_name} sent: '{subject}' to {to_addr}", "outbound"):
-                if p.get("status") not in ("signed","negotiating","proposal_sent","active"):
-                    update_status(crm_base, crm_key, crm_auth, p["id"], "active")
-                logged += 1
-        new_seen.append(mid)
+            status = "active" if p.get("status") not in ("signed","negotiating","proposal_sent","active") else None
+            record(mid, p, "staff_email_sent",
+                   f"{sender_name} sent: '{subject}' to {to_addr}", "outbound", status)
+            continue
+        mark(mid)
 
     # ── Outbound ──────────────────────────────────────────────────────────────
     print(f"  [{label}] 📤 Checking outbound...")
-    outbound = search_emails(email, password,
-        f"from:{email} in:sent newer_than:3d", max_results=30)
 
     for e in outbound:
         mid     = e["id"]
         if mid in processed:
             continue
         subject = e["subject"]
-        detail  = get_email_detail(email, password, mid)
+        detail  = details.get(mid, {})
         to_addr = detail.get("to", "")
 
         atype = "email_sent"
@@ -276,40 +472,66 @@ def sync_account(acct, processed):
         elif "proposal" in subject.lower():
             atype = "proposal_sent"
 
-        p = find_prospect(prospects, to_addr) if to_addr else None
+        p = matcher.find(to_addr) if to_addr else None
         if p:
             print(f"    📤 [{label}] Outbound: {p['name']} | {subject[:45]}")
-            if log_activity(crm_base, crm_key, crm_auth, p["id"], atype,
-                            f"Sent: '{subject}' to {to_addr}", "outbound"):
-                if atype in ("proposal_sent","visit_follow_up_email"):
-                    if p.get("status") not in ("signed","negotiating","proposal_sent"):
-                        update_status(crm_base, crm_key, crm_auth, p["id"], "proposal_sent")
-                logged += 1
-        new_seen.append(mid)
+            status = None
+            if atype in ("proposal_sent","visit_follow_up_email"):
+                if p.get("status") not in ("signed","negotiating","proposal_sent"):
+                    status = "proposal_sent"
+            record(mid, p, atype, f"Sent: '{subject}' to {to_addr}", "outbound", status)
+            continue
+        mark(mid)
+
+    # ── One round trip for every queued activity + status change ─────────────
+    if len(buf):
+        queued = len(buf)
+        accepted = buf.flush()
+        logged += len(accepted)
+        for mid in pending:
+            if mid in accepted:
+                mark(mid)
+        if len(accepted) < queued:
+            # Unlogged messages stay unseen; hold the watermarks so they're searched again
+            print(f"  [{label}] ⚠️ {queued - len(accepted)} activities not logged — will retry next run")
+            new_marks = dict(marks)
 
     print(f"  [{label}] ✅ {logged} logged, {len(new_seen)} marked seen")
-    return new_seen, logged
+    return new_seen, logged, new_marks
 
 # ── Main ──────────────────────────────────────────────────────────────────────
+def oldest_watermark(watermarks):
+    """
+    Earliest epoch any search will re-read from (watermark minus overlap, a day
+    of slack for clock/zone skew), or None. A message is marked seen after it
+    was sent, so IDs seen after this point must outlive SEEN_RETENTION_DAYS
+    for as long as a watermark is held back.
+    """
+    marks = [v for m in watermarks.values() for k, v in m.items()
+             if k != "resume" and isinstance(v, (int, float))]
+    return min(marks) - WM_OVERLAP_S - 86400 if marks else None
+
 def main():
     state     = load_state()
-    processed = set(state.get("processed_ids", []))
-    all_new   = []
+    processed = SeenStore()
+    migrated  = processed.import_legacy(state)
+    watermarks = state.setdefault("watermarks", {})
+    expired   = processed.expire(keep_after=oldest_watermark(watermarks))
     total     = 0
 
     print(f"\n📧 Bidirectional Email-CRM Sync{'  [DRY RUN]' if DRY_RUN else ''}")
-    print(f"   {TODAY} | {len(processed)} previously processed")
-
-    for acct in ACCOUNTS:
-        new_seen, logged = sync_account(acct, processed)
-        all_new.extend(new_seen)
-        total += logged
-
-    all_ids = list(processed | set(all_new))
-    if len(all_ids) > 1000:
-        all_ids = all_ids[-1000:]
-    state["processed_ids"] = all_ids
-    state["last_run"]      = datetime.datetime.now().isoformat()
+    print(f"   {TODAY} | {len(processed)} previously processed"
+          + (f" ({migrated} migrated from state file)" if migrated else "")
+          + (f", {expired} expired" if expired else ""))
+
+    # Accounts are independent (own Gmail, own CRM) — sync them side by side
+    with ThreadPoolExecutor(max_workers=len(ACCOUNTS)) as pool:
+        runs = pool.map(lambda a: sync_account(a, processed, watermarks.get(a["label"], {})), ACCOUNTS)
+        for acct, (_new_seen, logged, marks) in zip(ACCOUNTS, runs):
+            watermarks[acct["label"]] = marks
+            total += logged
+
+    state["last_run"] = datetime.datetime.now().isoformat()
     if not DRY_RUN:
         save_state(state)
 
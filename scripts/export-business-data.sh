@@ -35,7 +35,7 @@ log "📊 Business data export starting ($BACKUP_DATE)..."
 log "  Fetching full export from sales.kandedash.com..."
 EXPORT_OK=0
 for attempt in 1 2 3 4; do
-  if python3 /Users/kurtishon/clawd/kande-vendtech/scripts/crm-export.py "$TMP/full.json" 2>&1 | tee -a "$LOG_FILE" | grep -q "prospects:"; then
+  if python3 /Users/kurtishon/clawd/kande-vendtech/scripts/crm-export.py --stream "$TMP/full.json" 2>&1 | tee -a "$LOG_FILE" | grep -q "prospects:"; then
     if [ -s "$TMP/full.json" ]; then
       EXPORT_OK=1; break
     fi
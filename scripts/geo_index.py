@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+geo_index.py — Grid spatial index over CRM prospect coordinates.
+
+Prospects carry lat/lng from the server's geocodeProspect(). Bucketing them
+into fixed ~1 km cells answers the two questions the scouts care about in
+milliseconds, without scanning the whole prospect list:
+
+  knn(lat, lng, k)   → k nearest prospects (ring search outward from one cell)
+  gaps(n)            → empty / thin cells sitting next to high-value clusters
+                       (signed/active accounts, A-tier leads) — real coverage
+                       gaps instead of random zip-code picks
+
+Used by glm-scout.py nearby_sweep_queries(); other scouts can import it the
+same way:
+    from geo_index import GeoIndex
+    geo = GeoIndex.from_prospects(leads)
+
+CLI:
+  python3 geo_index.py gaps [n]           # top coverage gaps from the live CRM
+  python3 geo_index.py near LAT LNG [k]   # nearest prospects to a point
+"""
+
+import math, re, sys, time
+from collections import defaultdict
+
+CELL_DEG = 0.01   # ~1.1 km N-S, ~0.9 km E-W at Las Vegas latitude
+EARTH_KM = 6371.0
+
+# Las Vegas metro bounding box — filters geocoder misses (0,0 / wrong state)
+BOUNDS = (35.85, 36.45, -115.45, -114.85)   # lat_min, lat_max, lng_min, lng_max
+
+STATUS_VALUE = {
+    "signed": 3.0, "active": 3.0, "deployed": 3.0, "won": 3.0,
+    "proposal": 2.0, "negotiating": 2.0, "interested": 2.0,
+    "contacted": 1.0, "new": 0.5,
+}
+DEAD_STATUSES = ("closed", "lost", "stale")
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_KM * math.asin(math.sqrt(a))
+
+
+def prospect_value(p):
+    """How much a prospect says 'this area is worth covering'."""
+    v = STATUS_VALUE.get((p.get("status") or "").lower(), 0.5)
+    if (p.get("glm_tier") or p.get("qual_gate_tier")) == "A":
+        v += 1.0
+    if (p.get("priority") or "").lower() in ("high", "urgent"):
+        v += 0.5
+    return v
+
+
+def _coords(p):
+    try:
+        lat, lng = float(p.get("lat")), float(p.get("lng"))
+    except (TypeError, ValueError):
+        return None
+    lat_min, lat_max, lng_min, lng_max = BOUNDS
+    if not (lat_min <= lat <= lat_max and lng_min <= lng <= lng_max):
+        return None
+    return lat, lng
+
+
+class GeoIndex:
+    def __init__(self, cell_deg=CELL_DEG):
+        self.cell_deg = cell_deg
+        self.cells = defaultdict(list)   # (row, col) → [(lat, lng, prospect)]
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def cell_of(self, lat, lng):
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def cell_center(self, cell):
+        return ((cell[0] + 0.5) * self.cell_deg, (cell[1] + 0.5) * self.cell_deg)
+
+    def add(self, p):
+        c = _coords(p)
+        if c is None:
+            return False
+        self.cells[self.cell_of(*c)].append((c[0], c[1], p))
+        self.size += 1
+        return True
+
+    @classmethod
+    def from_prospects(cls, prospects, include_dead=False, cell_deg=CELL_DEG):
+        if isinstance(prospects, dict):
+            prospects = prospects.get("prospects") or prospects.get("data") or []
+        index = cls(cell_deg)
+        for p in prospects:
+            if include_dead or (p.get("status") or "") not in DEAD_STATUSES:
+                index.add(p)
+        return index
+
+    # --- Queries ---
+
+    def _ring(self, cell, r):
+        """Cells at Chebyshev distance exactly r from cell."""
+        row, col = cell
+        if r == 0:
+            yield cell
+            return
+        for dc in range(-r, r + 1):
+            yield (row - r, col + dc)
+            yield (row + r, col + dc)
+        for dr in range(-r + 1, r):
+            yield (row + dr, col - r)
+            yield (row + dr, col + r)
+
+    def knn(self, lat, lng, k=5, max_km=25.0):
+        """[(km, prospect)] for the k nearest prospects within max_km, nearest first."""
+        if not self.size:
+            return []
+        center = self.cell_of(lat, lng)
+        # One ring is at least this many km further out (E-W cells are the narrow side)
+        ring_km = self.cell_deg * 111.0 * math.cos(math.radians(lat))
+        max_r = int(max_km / ring_km) + 1
+        found = []
+        for r in range(max_r + 1):
+            for cell in self._ring(center, r):
+                for plat, plng, p in self.cells.get(cell, ()):
+                    found.append((haversine_km(lat, lng, plat, plng), p))
+            # Everything in unvisited rings is at least r * ring_km away
+            if len(found) >= k:
+                found.sort(key=lambda x: x[0])
+                if found[k - 1][0] <= r * ring_km:
+                    break
+        found.sort(key=lambda x: x[0])
+        return [(round(d, 3), p) for d, p in found[:k] if d <= max_km]
+
+    def density(self, cell):
+        return len(self.cells.get(cell, ()))
+
+    def gaps(self, n=5, radius=2, max_density=1, min_value=3.0):
+        """
+        Thin cells (<= max_density prospects) whose neighbourhood (Chebyshev
+        radius in cells) holds high-value prospects. Scored by neighbourhood
+        value / (1 + own density). Returns dicts with the cell center and the
+        most valuable nearby anchor prospect, best first.
+        """
+        # Candidate gaps are only ever next to an occupied cell, so walk those
+        value = {cell: sum(prospect_value(p) for _, _, p in pts) for cell, pts in self.cells.items()}
+        scored = {}
+        for cell in self.cells:
+            for r in range(radius + 1):
+                for nb in self._ring(cell, r):
+                    if nb in scored or self.density(nb) > max_density:
+                        continue
+                    hood = 0.0
+                    for rr in range(1, radius + 1):
+                        for c in self._ring(nb, rr):
+                            hood += value.get(c, 0.0)
+                    if hood >= min_value:
+                        scored[nb] = hood / (1 + self.density(nb))
+        out = []
+        for cell, score in sorted(scored.items(), key=lambda x: -x[1])[:n]:
+            lat, lng = self.cell_center(cell)
+            anchors = [p for _, p in self.knn(lat, lng, k=5, max_km=radius * 2.5)]
+            anchor = max(anchors, key=prospect_value) if anchors else None
+            out.append({"cell": cell, "lat": round(lat, 5), "lng": round(lng, 5),
+                        "density": self.density(cell), "score": round(score, 2),
+                        "anchor": anchor})
+        return out
+
+
+def street_and_zip(address):
+    """('Dean Martin Dr', '89118') from a prospect address; either may be ''."""
+    address = address or ""
+    zip_match = re.search(r'\b8\d{4}\b', address)
+    street_match = re.search(r'\d+\s+([\w\s.]+?)(?:,|Las Vegas|Henderson|NV)', address)
+    return (street_match.group(1).strip() if street_match else "",
+            zip_match.group(0) if zip_match else "")
+
+
+def main():
+    sys.path.insert(0, "/Users/kurtishon/clawd/scripts")
+    from name_index import fetch_prospects
+    args = sys.argv[1:] or ["gaps"]
+    leads = fetch_prospects()
+    t0 = time.perf_counter()
+    geo = GeoIndex.from_prospects(leads)
+    build_ms = (time.perf_counter() - t0) * 1000
+    print(f"{len(geo)}/{len(leads)} prospects with coordinates in {len(geo.cells)} cells ({build_ms:.1f}ms)")
+
+    t0 = time.perf_counter()
+    if args[0] == "near" and len(args) >= 3:
+        k = int(args[3]) if len(args) > 3 else 5
+        rows = geo.knn(float(args[1]), float(args[2]), k)
+        for km, p in rows:
+            print(f"  {km:6.2f} km  {p.get('name', '')[:50]:50s} {p.get('status', '')}")
+    else:
+        n = int(args[1]) if len(args) > 1 else 10
+        for g in geo.gaps(n):
+            a = g["anchor"] or {}
+            print(f"  ({g['lat']}, {g['lng']}) density {g['density']} score {g['score']:5.1f}  "
+                  f"near {a.get('name', '?')[:40]} — {a.get('address', '')[:50]}")
+    print(f"query {(time.perf_counter() - t0) * 1000:.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
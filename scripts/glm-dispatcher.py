@@ -260,7 +260,17 @@ def _main():
     log(f"GLM scout done (exit {code}): {out[-200:].strip()}")
 
     # Priority 4: Piper content generation — fire and forget (non-blocking)
-    # piper-run.py takes 20+ min; don't block the dispatcher or hold the lock
+    # piper-run.py takes 20+ min; don't block the dispatcher or hold the lock.
+    # It works the GLM generation queue; while a run is still draining it,
+    # launching another would only stack processes, so skip this cycle.
+    sys.path.insert(0, "/Users/kurtishon/clawd/scripts")
+    from glm_queue import GenerationQueue
+    queue = GenerationQueue()
+    if queue.runner_active():
+        counts = queue.counts()
+        log(f"TASK: Piper still generating ({counts.get('running', 0)} running, "
+            f"{counts.get('queued', 0)} queued) — not launching another")
+        return
     import subprocess as _sp
     _sp.Popen(["python3", "/Users/kurtishon/clawd/scripts/piper-run.py"],
               stdout=open("/tmp/piper-bg.log", "a"),
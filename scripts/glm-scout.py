@@ -4,6 +4,7 @@ glm-scout.py — GLM lead discovery via Brave web search.
 Different from Kimi K2.6's Google Maps approach: uses web search to find
 businesses by category, cross-checks against CRM, qualifies A/B candidates.
 Logs source=glm-scout for daily comparison.
+Queries are picked by yield (scout_bandit.py), not round-robin.
 """
 
 import json, os, sys, datetime, urllib.request, urllib.parse, time, re
@@ -12,6 +13,11 @@ from pathlib import Path
 import sys, os
 sys.path.insert(0, "/Users/kurtishon/clawd/scripts")
 from job_lock import acquire_job_lock
+from name_index import load_index
+from glm_batch_qualify import qualify_batch, cache_key
+from glm_client import GLMClient
+from geo_index import GeoIndex, street_and_zip
+from scout_bandit import BanditScheduler, arm_ids, run_cost
 
 acquire_job_lock("glm-scout")
 
@@ -26,6 +32,7 @@ STATE_FILE = Path("/Users/kurtishon/clawd/logs/glm-scout-state.json")
 
 TODAY = datetime.date.today().isoformat()
 SLEEP_S = 1.5
+SWEEP_COOLDOWN_DAYS = 14   # don't re-sweep the same coverage-gap cell sooner
 
 # Search queries — different from Kimi K2.6's Google Maps categories
 SEARCH_QUERIES = [
@@ -170,48 +177,80 @@ def crm_post(path, data):
     with urllib.request.urlopen(req, timeout=15) as r:
         return json.loads(r.read())
 
-def get_existing_names():
-    """Get normalized set of existing CRM lead names."""
+def get_crm_leads():
+    """Current CRM prospect list, or None if the CRM is unreachable."""
     try:
         leads = crm_get("/api/prospects?limit=1000")
         if isinstance(leads, dict): leads = leads.get("data", [])
-        return {normalize(l.get("name", "")) for l in leads}
-    except:
-        return set()
+        return leads
+    except Exception as e:
+        log(f"CRM fetch error: {e} — using persisted name index")
+        return None
+
+def get_existing_names(leads):
+    """Name index over existing CRM leads (merged with the persisted index)."""
+    return load_index(leads)
 
-def nearby_sweep_queries(n=3):
+def nearby_sweep_queries(n=3, state=None, leads=None):
     """
     Metric 1: Proximity clustering.
-    Pick n existing CRM prospects, generate location-specific search queries
-    targeting other high-traffic businesses in the same zip/corridor.
+    Target the thinnest grid cells next to high-value CRM clusters (geo_index
+    gaps) with location-specific queries, anchored on the nearest valuable
+    prospect's street/zip. Cells swept in the last SWEEP_COOLDOWN_DAYS are
+    skipped (tracked in state["swept_cells"]). Falls back to random zip-code
+    anchors when too few prospects have coordinates.
     """
     import random
     queries = []
     try:
-        leads = crm_get("/api/prospects?limit=1000")
-        if isinstance(leads, dict): leads = leads.get("data", [])
-        # Filter to active leads with usable addresses in LV metro
-        candidates = [l for l in leads
-                      if l.get("address") and
-                      any(z in (l.get("address") or "") for z in ["89118","89119","89103","89113","89128","89117","89139","89148","89030","89081"])
-                      and l.get("status") not in ("closed","lost","stale")]
-        if not candidates:
-            return []
-        picks = random.sample(candidates, min(n, len(candidates)))
-        for lead in picks:
-            addr = lead.get("address", "")
-            # Extract zip code
-            zip_match = re.search(r'8\d{4}', addr)
-            zip_code = zip_match.group(0) if zip_match else ""
-            # Extract street name for corridor search
-            street_match = re.search(r'\d+\s+([\w\s]+?)(?:,|Las Vegas|Henderson|NV)', addr)
-            street = street_match.group(1).strip() if street_match else ""
+        if leads is None:
+            leads = crm_get("/api/prospects?limit=1000")
+            if isinstance(leads, dict): leads = leads.get("data", [])
+        swept = state.setdefault("swept_cells", {}) if state is not None else {}
+        cutoff = (datetime.date.today() - datetime.timedelta(days=SWEEP_COOLDOWN_DAYS)).isoformat()
+        for key in [k for k, d in swept.items() if d < cutoff]:
+            del swept[key]
+
+        geo = GeoIndex.from_prospects(leads)
+        anchors = []
+        for gap in geo.gaps(n=n * 4):
+            key = f"{gap['cell'][0]},{gap['cell'][1]}"
+            if key in swept or not gap["anchor"]:
+                continue
+            anchors.append(gap["anchor"])
+            swept[key] = TODAY
+            if len(anchors) >= n:
+                break
+        if anchors:
+            log(f"Nearby sweep: {len(anchors)} coverage-gap anchors from {len(geo)} geocoded prospects")
+        else:
+            # Filter to active leads with usable addresses in LV metro
+            candidates = [l for l in leads
+                          if l.get("address") and
+                          any(z in (l.get("address") or "") for z in ["89118","89119","89103","89113","89128","89117","89139","89148","89030","89081"])
+                          and l.get("status") not in ("closed","lost","stale")]
+            if not candidates:
+                return []
+            anchors = random.sample(candidates, min(n, len(candidates)))
+            log(f"Nearby sweep: no geo gaps — {len(anchors)} random zip anchors")
+
+        per_anchor = []
+        for lead in anchors:
+            street, zip_code = street_and_zip(lead.get("address", ""))
+            qs = []
             if zip_code:
-                queries.append(f"companies businesses {zip_code} Las Vegas NV 50+ employees warehouse office")
-                queries.append(f"industrial commercial businesses near {street} Las Vegas NV workforce employees")
+                qs.append(f"companies businesses {zip_code} Las Vegas NV 50+ employees warehouse office")
+                if street:
+                    qs.append(f"industrial commercial businesses near {street} Las Vegas NV workforce employees")
             elif street:
-                queries.append(f"businesses near {street} Las Vegas NV employees daily foot traffic")
-        log(f"Nearby sweep: {len(queries)} proximity queries from {len(picks)} CRM anchors")
+                qs.append(f"businesses near {street} Las Vegas NV employees daily foot traffic")
+            per_anchor.append(qs)
+        # First query of every anchor before second ones, so the cap keeps areas distinct
+        for i in range(2):
+            for qs in per_anchor:
+                if i < len(qs) and qs[i] not in queries:
+                    queries.append(qs[i])
+        log(f"Nearby sweep: {len(queries)} proximity queries from {len(anchors)} anchors")
     except Exception as e:
         log(f"Nearby sweep error: {e}")
     return queries[:n]  # cap at n
@@ -388,13 +427,7 @@ def hard_traffic_rule(candidate):
     return 'glm'
 
 
-def glm_qualify(candidate):
-    """Ask GLM: is this a good vending machine location? Returns tier A/B/C/D or None."""
-    prompt = f"""You are evaluating a potential vending machine location for Las Vegas, NV.
-
-Business: {candidate['name']}
-Address: {candidate['address'] or 'Las Vegas area'}
-Context: {candidate['snippet']}
+QUAL_RUBRIC = """You are evaluating potential vending machine locations for Las Vegas, NV.
 
 HARD REQUIREMENT: The location must have at least 100 people coming in and out per day.
 This is a strict floor — locations below this threshold are not worth placing a machine.
@@ -416,28 +449,27 @@ CATEGORY RULES:
 - Distribution warehouses: 50+ drivers/staff = good
 - Small businesses with <5 staff, kiosks, food trucks, pop-ups: always D
 
-Reply with ONE of these only:
+TIERS:
 A - Excellent (200+ people/day, high dwell time, 6-7 day operation)
 B - Good (100-200 people/day, solid fit)
 C - Borderline (50-100 people/day, might be worth it)
 D - Disqualify (<50 people/day, residential, permanently closed, or wrong type)
-SKIP - Not enough info to judge
+SKIP - Not enough info to judge"""
 
-Reply with just the letter (A, B, C, D, or SKIP):"""
 
-    from glm_utils import glm_with_retry
-    reply = glm_with_retry(prompt, max_tokens=5, timeout=60, retries=2, backoff=15, temperature=0.1)
-    if reply:
-        reply = reply.strip().upper()
-        for tier in ["A", "B", "C", "D", "SKIP"]:
-            if reply.startswith(tier):
-                return tier
-    return None
+def glm_qualify_batch(candidates, sources=None):
+    """Ask GLM to tier many candidates in shared prompts. Returns {cache_key: tier or None}."""
+    glm = GLMClient(GLM_URL, GLM_MODEL, caller="glm-scout")
+    return qualify_batch(candidates, QUAL_RUBRIC, glm, log=log, sources=sources)
 
 DISCOVERY_QUEUE = Path("/Users/kurtishon/clawd/agent-output/scout/glm-discovery-queue.jsonl")
 
-def queue_for_enrichment(candidate, tier):
-    """Save to discovery queue — Kimi K2.6 enriches and adds to CRM."""
+def queue_for_enrichment(candidate, tier, tier_source):
+    """
+    Save to discovery queue — Kimi K2.6 enriches and adds to CRM.
+    tier_source is "glm", "local" (tier_classifier) or "rule" (hard_traffic_rule);
+    only "glm" entries are used to train the local classifier.
+    """
     try:
         DISCOVERY_QUEUE.parent.mkdir(parents=True, exist_ok=True)
         entry = {
@@ -445,6 +477,7 @@ def queue_for_enrichment(candidate, tier):
             "address": candidate["address"] or "Las Vegas, NV",
             "source": "glm-scout",
             "glm_tier": tier,
+            "tier_source": tier_source,
             "url": candidate.get("url", ""),
             "snippet": candidate.get("snippet", "")[:200],
             "query": candidate.get("query", ""),
@@ -457,67 +490,108 @@ def queue_for_enrichment(candidate, tier):
         log(f"Queue error: {e}")
         return False
 
+def handle_tier(candidate, tier, existing, tier_source="glm"):
+    """Queue A/B candidates, log the rest. Returns 1 if queued."""
+    name = candidate["name"]
+    if tier in ("A", "B"):
+        if queue_for_enrichment(candidate, tier, tier_source):
+            log(f"  ✅ Queued Tier {tier}: {name[:50]}")
+            existing.add(normalize(name))
+            return 1
+    elif tier in ("C", "D"):
+        log(f"  ⬇️  Tier {tier} skip: {name[:50]}")
+    else:
+        log(f"  ❓ SKIP/unknown: {name[:50]}")
+    return 0
+
+def judge_glm_batch(needs_glm, tiers, sources, existing, yields, arm_of):
+    """Queue GLM-judged candidates and credit their query's bandit arm. Returns leads added."""
+    added = 0
+    for c in needs_glm:
+        if existing.matches(normalize(c["name"])):
+            continue  # queued earlier in this run
+        key = cache_key(c["name"], c["address"])
+        tier = tiers.get(key)
+        n = handle_tier(c, tier, existing, sources.get(key, "glm"))
+        added += n
+        y = yields.get(arm_of.get(c["query"]))
+        if y is not None:
+            y["new"] += n
+            y["rejected"] += tier in ("C", "D")
+    return added
+
 def main():
     log("=== GLM Scout ===")
 
     state = load_state()
-    existing = get_existing_names()
+    leads = get_crm_leads()
+    existing = get_existing_names(leads)
     log(f"CRM has {len(existing)} existing leads")
 
-    # Pick next 2 queries from rotation
-    idx = state.get("index", 0) % len(SEARCH_QUERIES)
+    # Pick 2 queries by expected new leads per Brave call + GLM minute
+    sched = BanditScheduler(state.setdefault("arms", {}))
     stall_suffix = state.get("stall_suffix", "")
-    queries = []
-    for i in range(2):
-        q = SEARCH_QUERIES[(idx + i) % len(SEARCH_QUERIES)]
-        if stall_suffix:
-            q = q + " " + stall_suffix
-        queries.append(q)
+    arm_of = {}   # query as sent → SEARCH_QUERIES entry
+    for base in sched.pick(arm_ids(SEARCH_QUERIES), 2):
+        arm_of[f"{base} {stall_suffix}" if stall_suffix else base] = base
+    queries = list(arm_of)
+    yields = {base: {"found": 0, "new": 0, "rejected": 0, "glm": 0} for base in arm_of.values()}
     if stall_suffix:
         log(f"STALL MODE active — appending '{stall_suffix}' to queries")
 
     # Metric 1: Run nearby sweep queries alongside regular queries
-    nearby_queries = nearby_sweep_queries(n=2)
+    nearby_queries = nearby_sweep_queries(n=2, state=state, leads=leads)
     all_queries = queries + nearby_queries
     log(f"Running {len(queries)} regular + {len(nearby_queries)} nearby-sweep queries")
 
     added = 0
+    needs_glm = []
     for query in all_queries:
         log(f"Searching: {query[:60]}...")
         results = brave_search(query)
         time.sleep(SLEEP_S)
 
         candidates = extract_businesses(results, query)
+        y = yields.get(arm_of.get(query), {"found": 0, "new": 0, "rejected": 0, "glm": 0})
         for c in candidates:
             name_norm = normalize(c["name"])
             # Skip if already in CRM
-            if any(name_norm in ex or ex in name_norm for ex in existing if len(ex) > 5):
+            if existing.matches(name_norm):
                 continue
+            y["found"] += 1
 
             # Hard traffic rule first (no LLM cost)
             rule = hard_traffic_rule(c)
             if rule == 'fail':
                 log(f"  ✖️  Hard fail (low traffic): {c['name'][:50]}")
-                continue
+                y["rejected"] += 1
             elif rule == 'pass':
-                tier = 'B'  # Hard pass → auto-qualify as B, let enrichment refine
+                # Hard pass → auto-qualify as B, let enrichment refine
                 log(f"  ✅ Hard pass (100+ traffic): {c['name'][:50]}")
+                n = handle_tier(c, 'B', existing, "rule")
+                added += n
+                y["new"] += n
             else:
-                # Needs GLM judgment
-                tier = glm_qualify(c)
-                time.sleep(1)
-
-            if tier in ("A", "B"):
-                if queue_for_enrichment(c, tier):
-                    log(f"  ✅ Queued Tier {tier}: {c['name'][:50]}")
-                    existing.add(name_norm)
-                    added += 1
-            elif tier in ("C", "D"):
-                log(f"  ⬇️  Tier {tier} skip: {c['name'][:50]}")
-            else:
-                log(f"  ❓ SKIP/unknown: {c['name'][:50]}")
-
-    state["index"] = (idx + 2) % len(SEARCH_QUERIES)
+                needs_glm.append(c)  # judged below in one batched GLM pass
+                y["glm"] += 1
+
+    glm_s = 0.0
+    if needs_glm:
+        log(f"GLM qualifying {len(needs_glm)} candidates (batched)")
+        t0 = time.time()
+        sources = {}
+        tiers = glm_qualify_batch(needs_glm, sources)
+        glm_s = time.time() - t0
+        added += judge_glm_batch(needs_glm, tiers, sources, existing, yields, arm_of)
+
+    # Bandit update: one Brave call each + their share of the GLM batch time
+    for base, y in yields.items():
+        share = glm_s * y["glm"] / len(needs_glm) if needs_glm else 0.0
+        sched.record(base, found=y["found"], new=y["new"], rejected=y["rejected"],
+                     cost=run_cost(1, share))
+    log(f"Query yield: {sched.report(top=3)}")
+
+    state.pop("index", None)  # round-robin cursor from before the bandit
     state["total_added"] = state.get("total_added", 0) + added
     state["last_run"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
 
@@ -539,6 +613,7 @@ def main():
             log(f"Zero runs: {zero_runs}/{STALL_THRESHOLD} before stall mode")
 
     save_state(state)
+    existing.save()
     log(f"Done. Added {added} new A/B leads this run (total: {state['total_added']})")
     sys.exit(0 if added > 0 else 1)
 
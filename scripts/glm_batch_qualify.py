@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+glm_batch_qualify.py — Batched + cached GLM tier qualification for the scouts.
+
+Instead of one llama-server request (and a 1-token answer) per candidate, many
+candidates share one prompt and come back as a JSON array of per-candidate
+tiers. Every answer is written to a persistent cache keyed by normalized
+name + address + type, so a candidate that gets re-discovered next week never
+reaches the model again.
+
+Used by glm-scout.py and scrapling-scout.py:
+    from glm_batch_qualify import qualify_batch
+    tiers = qualify_batch(candidates, rubric, glm)   # {key: tier}
+
+The rubric goes out as the system message (identical every call, so
+llama-server reuses its prompt cache) and the reply is schema-constrained
+through glm_client.GLMClient.
+
+Before anything reaches GLM, tier_classifier.py (a local hashed n-gram model
+trained on earlier GLM verdicts) resolves the candidates it is confident about.
+"""
+
+import json, os, re, time
+from pathlib import Path
+
+from tier_classifier import preclassify
+
+CACHE_FILE     = Path("/Users/kurtishon/clawd/logs/glm-qual-cache.json")
+CACHE_TTL_DAYS = 90     # re-ask after this long — businesses change
+BATCH_SIZE     = 12
+TIERS          = ("A", "B", "C", "D", "SKIP")
+
+BATCH_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"i": {"type": "integer"}, "tier": {"enum": list(TIERS)}},
+        "required": ["i", "tier"],
+    },
+}
+
+
+def _norm(s):
+    return re.sub(r'[^a-z0-9 ]', '', re.sub(r'\s+', ' ', (s or "").lower())).strip()
+
+
+def cache_key(name, address="", type_hint=""):
+    return f"{_norm(name)}|{_norm(address)}|{_norm(type_hint)}"
+
+
+# --- Persistent cache ---
+
+class QualCache:
+    def __init__(self, path=CACHE_FILE):
+        self.path = Path(path)
+        self.dirty = False
+        try:
+            self.entries = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        e = self.entries.get(key)
+        if e:
+            age_days = (time.time() - e.get("ts", 0)) / 86400
+            if age_days <= CACHE_TTL_DAYS:
+                self.hits += 1
+                return e["tier"]
+        self.misses += 1
+        return None
+
+    def put(self, key, tier):
+        self.entries[key] = {"tier": tier, "ts": int(time.time())}
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.entries))
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+# --- Prompt + parsing ---
+
+def build_batch_prompt(candidates):
+    lines = []
+    for i, c in enumerate(candidates, 1):
+        parts = [f"Name: {c['name']}", f"Address: {c.get('address') or 'Las Vegas area'}"]
+        if c.get("type"):
+            parts.append(f"Type: {c['type']}")
+        if c.get("snippet"):
+            parts.append(f"Context: {c['snippet'][:200]}")
+        lines.append(f"{i}. " + " | ".join(parts))
+    return f"""CANDIDATES:
+{chr(10).join(lines)}
+
+Judge each candidate independently. Reply with a JSON array only, one object per candidate, in order:
+[{{"i": 1, "tier": "A|B|C|D|SKIP"}}, ...]"""
+
+
+def parse_batch_reply(reply, n):
+    """Return {index (1-based): tier} from the model reply; missing entries are left out."""
+    out = {}
+    if not reply:
+        return out
+    m = re.search(r'\[.*\]', reply, re.DOTALL)
+    if m:
+        try:
+            for row in json.loads(m.group(0)):
+                i = int(row.get("i", 0))
+                tier = str(row.get("tier", "")).strip().upper()
+                if 1 <= i <= n and tier in TIERS:
+                    out[i] = tier
+            return out
+        except (ValueError, TypeError, AttributeError):
+            pass
+    # Fallback: "1: A" / "2 - SKIP" lines
+    for i, tier in re.findall(r'^\s*(\d+)\s*[:.)\-]\s*(SKIP|[ABCD])\b', reply, re.MULTILINE | re.IGNORECASE):
+        if 1 <= int(i) <= n:
+            out[int(i)] = tier.upper()
+    return out
+
+
+# --- Main entry point ---
+
+def qualify_batch(candidates, rubric, glm, log=print, batch_size=BATCH_SIZE, cache=None, local=True,
+                  sources=None):
+    """
+    Qualify candidates ({name, address, type?, snippet?}) in shared prompts.
+    Returns {cache_key: tier or None}. None = model gave no usable answer (not cached).
+    local=False skips the local pre-classifier and sends every cache miss to GLM.
+    sources, if given, is filled with {cache_key: "glm" | "local"} for every tier
+    returned, so callers can tag queued leads with where the tier came from.
+    """
+    sources = {} if sources is None else sources
+    own_cache = cache is None
+    cache = cache or QualCache()
+    results, pending, seen = {}, [], set()
+
+    for c in candidates:
+        key = cache_key(c["name"], c.get("address", ""), c.get("type", ""))
+        if key in seen:
+            continue
+        seen.add(key)
+        tier = cache.get(key)
+        if tier:
+            results[key] = tier
+            sources[key] = "glm"   # the cache only ever holds GLM verdicts
+        else:
+            pending.append((key, c))
+
+    if results:
+        log(f"  Qual cache: {len(results)} hit(s), {len(pending)} uncached")
+
+    if local and pending:
+        # Local answers are not cached: the cache is the classifier's training data
+        resolved, uncertain = preclassify([c for _, c in pending], log=log, caller=glm.caller)
+        for i, tier in resolved.items():
+            results[pending[i][0]] = tier
+            sources[pending[i][0]] = "local"
+        pending = [pending[i] for i in uncertain]
+
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        reply = glm.complete(build_batch_prompt([c for _, c in chunk]), system=rubric,
+                             schema=BATCH_SCHEMA, max_tokens=16 * len(chunk) + 64)
+        tiers = parse_batch_reply(reply, len(chunk))
+        log(f"  GLM batch: {len(tiers)}/{len(chunk)} qualified — {glm.describe_last()}")
+        for i, (key, _c) in enumerate(chunk, 1):
+            tier = tiers.get(i)
+            results[key] = tier
+            if tier:
+                sources[key] = "glm"
+                cache.put(key, tier)
+
+    if own_cache:
+        cache.save()
+    return results
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+glm_client.py — One client for the local GLM llama-server.
+
+Replaces the per-script blocking calls (glm_call in scrapling-scout,
+glm_with_retry in glm-scout, glm_generate in piper-run):
+
+  - Streams tokens (SSE), so a hung generation is caught by an idle timeout
+    instead of a 600 s wall clock, and callers can write output as it arrives.
+  - Sends shared instructions as a stable system message with cache_prompt,
+    so llama-server reuses the KV cache for that prefix across calls.
+  - Requests JSON-schema-constrained output (response_format) — no regex
+    scraping of "[...]" out of prose and no parse-failure retries.
+  - Records time-to-first-token, tokens/sec and prompt-cache reuse for every
+    call in logs/glm-calls.jsonl.
+
+Usage:
+    from glm_client import GLMClient
+    glm = GLMClient(caller="scrapling-scout")
+    text = glm.complete("Write ...", system=INSTRUCTIONS, max_tokens=800)
+    rows = glm.complete_json(page_text, schema=LEADS_SCHEMA, system=EXTRACT_RULES)
+    glm.last  # metrics for the most recent call
+"""
+
+import json, re, time, datetime, urllib.request, urllib.error
+from pathlib import Path
+
+GLM_URL     = "http://192.168.1.52:52415/v1/chat/completions"
+GLM_MODEL   = "GLM-5.1-UD-IQ4_XS-00001-of-00009.gguf"
+METRICS_LOG = Path("/Users/kurtishon/clawd/logs/glm-calls.jsonl")
+
+
+class GLMClient:
+    def __init__(self, url=GLM_URL, model=GLM_MODEL, caller="", idle_timeout=90,
+                 connect_retries=2, metrics_log=METRICS_LOG):
+        self.url = url
+        self.model = model
+        self.caller = caller
+        self.idle_timeout = idle_timeout          # max seconds between streamed chunks
+        self.connect_retries = connect_retries    # retries only when the server is unreachable
+        self.metrics_log = metrics_log
+        self.last = {}
+
+    # --- Public API ---
+
+    def complete(self, prompt, system=None, max_tokens=800, temperature=0.1,
+                 schema=None, grammar=None, on_token=None, max_time=None, prefill=None):
+        """
+        Stream a completion and return the full text (None on failure).
+        prefill: start of the assistant reply (e.g. a partial generation being
+        resumed); only the continuation is streamed and returned.
+        """
+        body = {
+            "model": self.model,
+            "messages": self._messages(prompt, system, prefill),
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+            "cache_prompt": True,
+        }
+        if schema is not None:
+            body["response_format"] = {"type": "json_schema",
+                                       "json_schema": {"name": "reply", "schema": schema, "strict": True}}
+        if grammar is not None:
+            body["grammar"] = grammar
+
+        for attempt in range(self.connect_retries + 1):
+            parts = []   # filled by _stream as tokens arrive
+            try:
+                return self._stream(body, prompt, system, on_token, max_time, parts)
+            except urllib.error.HTTPError as e:
+                # 4xx (bad schema, prompt too long) fails the same way every time; 5xx may not
+                self._record(prompt, system, ok=False, error=str(e))
+                if e.code < 500:
+                    return None
+                if attempt < self.connect_retries:
+                    time.sleep(10 * (attempt + 1))
+            except (urllib.error.URLError, ConnectionError) as e:
+                # Server down / refusing — worth a retry. A drop after tokens went out is
+                # not: on_token has already seen them and a re-send would repeat the prefix.
+                self._record(prompt, system, ok=False, error=str(e))
+                if parts:
+                    return None
+                if attempt < self.connect_retries:
+                    time.sleep(10 * (attempt + 1))
+            except Exception as e:
+                self._record(prompt, system, ok=False, error=str(e))
+                return None
+        return None
+
+    def complete_json(self, prompt, schema, system=None, max_tokens=800, temperature=0.1, **kw):
+        """Schema-constrained completion, parsed. Returns the object or None."""
+        text = self.complete(prompt, system=system, max_tokens=max_tokens,
+                             temperature=temperature, schema=schema, **kw)
+        return parse_json(text)
+
+    # --- Internals ---
+
+    @staticmethod
+    def _messages(prompt, system, prefill=None):
+        # Shared instructions first and byte-identical across calls → reusable KV prefix
+        msgs = []
+        if system:
+            msgs.append({"role": "system", "content": system})
+        msgs.append({"role": "user", "content": prompt})
+        if prefill:
+            # llama-server continues a trailing assistant message instead of starting a new turn
+            msgs.append({"role": "assistant", "content": prefill})
+        return msgs
+
+    def _stream(self, body, prompt, system, on_token, max_time, parts):
+        """parts: caller's list, appended to per token so a failure shows whether any were delivered."""
+        req = urllib.request.Request(self.url, data=json.dumps(body).encode(),
+                                     headers={"Content-Type": "application/json",
+                                              "Accept": "text/event-stream"},
+                                     method="POST")
+        t0 = time.perf_counter()
+        t_first = None
+        usage, timings, n_chunks, finish = {}, {}, 0, None
+
+        with urllib.request.urlopen(req, timeout=self.idle_timeout) as r:
+            for raw in r:
+                line = raw.decode("utf-8", "replace").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    continue
+                usage = chunk.get("usage") or usage
+                timings = chunk.get("timings") or timings
+                for choice in chunk.get("choices", []):
+                    finish = choice.get("finish_reason") or finish
+                    piece = (choice.get("delta") or {}).get("content")
+                    if piece:
+                        if t_first is None:
+                            t_first = time.perf_counter()
+                        n_chunks += 1
+                        parts.append(piece)
+                        if on_token:
+                            on_token(piece)
+                if max_time and time.perf_counter() - t0 > max_time:
+                    finish = "max_time"
+                    break
+
+        t_end = time.perf_counter()
+        text = "".join(parts)
+        out_tokens = usage.get("completion_tokens") or timings.get("predicted_n") or n_chunks
+        gen_s = (t_end - t_first) if t_first else 0
+        self._record(prompt, system, ok=bool(text), metrics={
+            "ttft_ms": round((t_first - t0) * 1000) if t_first else None,
+            "total_ms": round((t_end - t0) * 1000),
+            "prompt_tokens": usage.get("prompt_tokens") or timings.get("prompt_n"),
+            # llama-server reports only the non-cached part of the prompt in timings.prompt_n
+            "prompt_evaluated": timings.get("prompt_n"),
+            "completion_tokens": out_tokens,
+            "tokens_per_s": round(timings.get("predicted_per_second") or (out_tokens / gen_s if gen_s else 0), 2),
+            "finish": finish,
+        })
+        return text.strip() or None
+
+    def _record(self, prompt, system, ok, metrics=None, error=None):
+        self.last = {
+            "ts": datetime.datetime.now().isoformat(timespec="seconds"),
+            "caller": self.caller,
+            "ok": ok,
+            "prompt_chars": len(prompt) + len(system or ""),
+            **(metrics or {}),
+        }
+        if error:
+            self.last["error"] = error[:200]
+        try:
+            self.metrics_log.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.metrics_log, "a") as f:
+                f.write(json.dumps(self.last) + "\n")
+        except OSError:
+            pass
+
+    def describe_last(self):
+        m = self.last
+        if not m.get("ok"):
+            return f"failed ({m.get('error', 'empty reply')})"
+        return (f"{m.get('completion_tokens')} tok, ttft {m.get('ttft_ms')}ms, "
+                f"{m.get('tokens_per_s')} tok/s, {m.get('total_ms') / 1000:.1f}s")
+
+
+def parse_json(text):
+    """Parse a (normally schema-constrained) reply; tolerates stray fences/prose."""
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    m = re.search(r'(\[.*\]|\{.*\})', text, re.DOTALL)
+    if m:
+        try:
+            return json.loads(m.group(1))
+        except ValueError:
+            pass
+    return None
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+glm_queue.py — Persistent generation queue in front of the local llama-server.
+
+Long generations (Piper blogs, social posts) go through here instead of being
+launched blind every dispatcher cycle:
+
+  - Jobs are keyed by kind + topic. Submitting a key that is already queued,
+    running, or done is a no-op, and at most MAX_QUEUED jobs wait per kind.
+  - One runner at a time (flock on LOCK_FILE). It runs as many jobs at once
+    as llama-server has slots (/props total_slots), and starts a job only
+    when /slots shows one idle, so scouts sharing the server are not starved.
+  - Tokens are appended to SPOOL_DIR/<id>.part as they stream, with a
+    checkpoint (tokens, bytes, heartbeat) in the queue every few seconds.
+    A job that dies mid-stream is retried from its partial output (sent back
+    as an assistant prefill) instead of starting over.
+  - Every job's tokens/sec and time-to-first-token is recorded and logged.
+
+Usage:
+    from glm_queue import GenerationQueue
+    q = GenerationQueue()
+    q.submit("blog", "coworking-spaces", prompt, max_tokens=12000, temperature=0.7)
+    summary = q.run({"blog": save_blog}, caller="piper-run", log=log)   # None if a runner is active
+
+    python3 glm_queue.py            # queue status + recent jobs
+"""
+
+import json, sys, time, fcntl, sqlite3, threading, urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+sys.path.insert(0, "/Users/kurtishon/clawd/scripts")
+from glm_client import GLMClient, GLM_URL, GLM_MODEL
+
+QUEUE_DB  = Path("/Users/kurtishon/clawd/logs/glm-queue.db")
+SPOOL_DIR = Path("/Users/kurtishon/clawd/logs/glm-queue")
+LOCK_FILE = Path("/Users/kurtishon/clawd/logs/glm-queue.lock")
+
+MAX_QUEUED       = 6      # per kind; further submits are refused until the backlog drains
+MAX_ATTEMPTS     = 3
+CHECKPOINT_EVERY = 5      # seconds between flush + progress write while streaming
+SLOT_POLL        = 10     # seconds between /slots checks while the server is busy
+SLOT_WAIT_MAX    = 600    # after this long with nothing idle, start one job anyway
+
+
+class JobRejected(Exception):
+    """Raised by a handler when the generated output is unusable (counts as a failed attempt)."""
+
+
+# --- llama-server slots ---
+
+def _server_get(path, url=GLM_URL, timeout=5):
+    base = url.split("/v1/")[0]
+    try:
+        with urllib.request.urlopen(f"{base}{path}", timeout=timeout) as r:
+            return json.loads(r.read())
+    except (OSError, ValueError):
+        return None
+
+
+def server_slots(url=GLM_URL):
+    """Parallel slots llama-server was started with (-np); 1 if it can't be asked."""
+    props = _server_get("/props", url)
+    try:
+        return max(1, int(props.get("total_slots") or 1))
+    except (AttributeError, TypeError, ValueError):
+        return 1
+
+
+def idle_slots(url=GLM_URL):
+    """Slots not processing right now, or None when /slots is disabled."""
+    slots = _server_get("/slots", url)
+    if not isinstance(slots, list):
+        return None
+    # Newer builds report is_processing; older ones state (0 = idle)
+    return sum(1 for s in slots if not s.get("is_processing", s.get("state", 0)))
+
+
+# --- Queue ---
+
+class GenerationQueue:
+    def __init__(self, path=QUEUE_DB, spool=SPOOL_DIR, lock_file=LOCK_FILE, url=GLM_URL, model=GLM_MODEL):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.spool = Path(spool)
+        self.lock_file = Path(lock_file)
+        self.url = url
+        self.model = model
+        self.db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL, key TEXT NOT NULL, payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',   -- queued | running | done | failed
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created INTEGER, started INTEGER, finished INTEGER, heartbeat INTEGER,
+            tokens INTEGER NOT NULL DEFAULT 0, bytes INTEGER NOT NULL DEFAULT 0,
+            tok_s REAL, ttft_ms INTEGER, result TEXT, error TEXT)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS jobs_key_idx ON jobs (kind, key)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, id)")
+        self.lock = threading.Lock()   # jobs checkpoint from worker threads
+        self._runner_fd = None
+
+    # --- Submitting ---
+
+    def submit(self, kind, key, prompt, system=None, max_tokens=800, temperature=0.1, **meta):
+        """Queue a generation. Returns the job id, or None if the key is taken or the kind is backlogged."""
+        payload = json.dumps({"prompt": prompt, "system": system, "max_tokens": max_tokens,
+                              "temperature": temperature, **meta})
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                if self.db.execute("SELECT 1 FROM jobs WHERE kind = ? AND key = ? AND status != 'failed'",
+                                   (kind, key)).fetchone():
+                    return None
+                queued = self.db.execute("SELECT COUNT(*) FROM jobs WHERE kind = ? AND status = 'queued'",
+                                         (kind,)).fetchone()[0]
+                if queued >= MAX_QUEUED:
+                    return None
+                return self.db.execute(
+                    "INSERT INTO jobs (kind, key, payload, created) VALUES (?, ?, ?, ?)",
+                    (kind, key, payload, int(time.time()))).lastrowid
+            finally:
+                self.db.execute("COMMIT")
+
+    def known(self, kind):
+        """Keys of this kind that are queued, running or done (failed keys may be resubmitted)."""
+        with self.lock:
+            rows = self.db.execute("SELECT key FROM jobs WHERE kind = ? AND status != 'failed'", (kind,))
+            return {r[0] for r in rows}
+
+    def backlog(self, kind):
+        """Jobs of this kind queued or running."""
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM jobs WHERE kind = ? AND status IN ('queued', 'running')",
+                                   (kind,)).fetchone()[0]
+
+    def counts(self):
+        with self.lock:
+            return dict(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def recent(self, limit=20):
+        with self.lock:
+            return self.db.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+    # --- Runner lock ---
+
+    def runner_active(self):
+        """True while some process holds the runner lock."""
+        self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_file, "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(f, fcntl.LOCK_UN)
+            return False
+
+    def _acquire_runner(self):
+        self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+        fd = open(self.lock_file, "a")
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            fd.close()
+            return False
+        self._runner_fd = fd
+        return True
+
+    def _release_runner(self):
+        if self._runner_fd:
+            fcntl.flock(self._runner_fd, fcntl.LOCK_UN)
+            self._runner_fd.close()
+            self._runner_fd = None
+
+    # --- Running ---
+
+    def run(self, handlers, caller="", log=print, slots=None, idle_timeout=180):
+        """
+        Work the queue until nothing runnable is left. handlers: {kind: fn(job, text) -> note},
+        fn raises JobRejected for unusable output. Returns {"done": [...], "failed": [...],
+        "retry": [...]} of (job id, kind, key) by each job's final outcome in this run
+        ("retry" = still queued), or None if another runner holds the lock.
+        """
+        if not self._acquire_runner():
+            return None
+        outcomes = {}
+        try:
+            while True:
+                self._drain(handlers, caller, log, slots, idle_timeout, outcomes)
+                # A submit that landed after the last claim but before the lock
+                # is released must not wait for the next dispatcher cycle
+                self._release_runner()
+                if not self._claimable(handlers) or not self._acquire_runner():
+                    break
+        finally:
+            self._release_runner()
+        summary = {"done": [], "failed": [], "retry": []}
+        for job, outcome in outcomes.values():
+            summary[outcome].append((job["id"], job["kind"], job["key"]))
+        return summary
+
+    def _drain(self, handlers, caller, log, slots, idle_timeout, outcomes):
+        with self.lock:
+            orphans = self.db.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+        if orphans:
+            log(f"Queue: {orphans} job(s) from an interrupted runner re-queued (will resume)")
+        slots = slots or server_slots(self.url)
+        log(f"Queue: {self.counts().get('queued', 0)} queued, {slots} llama-server slot(s)")
+        self.spool.mkdir(parents=True, exist_ok=True)
+
+        active, waited_since = {}, None
+        with ThreadPoolExecutor(max_workers=slots) as pool:
+            while True:
+                free = slots - len(active)
+                if free > 0:
+                    idle = idle_slots(self.url)
+                    if idle is not None:
+                        free = min(free, idle)
+                    if free <= 0 and not active:
+                        waited_since = waited_since or time.time()
+                        if time.time() - waited_since >= SLOT_WAIT_MAX:
+                            log(f"Queue: no idle slot for {SLOT_WAIT_MAX}s, starting one job anyway")
+                            free = 1
+                    else:
+                        waited_since = None
+                    for _ in range(max(0, free)):
+                        job = self._claim(handlers)
+                        if not job:
+                            break
+                        active[pool.submit(self._run_job, job, handlers[job["kind"]], caller, log,
+                                           idle_timeout)] = job
+                if not active:
+                    if waited_since and self._claimable(handlers):
+                        time.sleep(SLOT_POLL)
+                        continue
+                    return
+                done, _ = wait(active, timeout=SLOT_POLL, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    job = active.pop(fut)
+                    outcomes[job["id"]] = (job, fut.result())
+
+    def _claimable(self, handlers):
+        kinds = list(handlers)
+        with self.lock:
+            return bool(self.db.execute(
+                f"SELECT 1 FROM jobs WHERE status = 'queued' AND kind IN ({','.join('?' * len(kinds))}) LIMIT 1",
+                kinds).fetchone())
+
+    def _claim(self, handlers):
+        kinds = list(handlers)
+        now = int(time.time())
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                job = self.db.execute(
+                    f"SELECT * FROM jobs WHERE status = 'queued' AND kind IN ({','.join('?' * len(kinds))}) "
+                    "ORDER BY id LIMIT 1", kinds).fetchone()
+                if job:
+                    self.db.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                                    "started = ?, heartbeat = ? WHERE id = ?", (now, now, job["id"]))
+            finally:
+                self.db.execute("COMMIT")
+        return dict(job) if job else None
+
+    def _update(self, job_id, **fields):
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self.lock:
+            self.db.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+    def _run_job(self, job, handler, caller, log, idle_timeout):
+        """Stream one job to its spool file. Returns 'done', 'retry' or 'failed'."""
+        label = f"#{job['id']} {job['kind']} '{job['key']}'"
+        try:
+            return self._attempt(job, label, handler, caller, log, idle_timeout)
+        except Exception as e:
+            return self._failed(job, label, log, f"{type(e).__name__}: {e}", keep_partial=True)
+
+    def _attempt(self, job, label, handler, caller, log, idle_timeout):
+        p = json.loads(job["payload"])
+        part = self.spool / f"{job['id']}.part"
+        prefill = part.read_text(errors="ignore") if part.exists() else ""
+        tokens_before = job["tokens"] if prefill else 0
+        log(f"▶ {label} (attempt {job['attempts'] + 1}/{MAX_ATTEMPTS}"
+            + (f", resuming after {tokens_before} tok / {len(prefill)} chars)" if prefill else ")"))
+
+        # No client-side connect retries: a retry after a partial stream would
+        # append a second copy to the spool file. The queue retries (and resumes) instead.
+        glm = GLMClient(self.url, self.model, caller=caller or job["kind"],
+                        idle_timeout=idle_timeout, connect_retries=0)
+        streamed = [0]
+        last_cp = [time.time()]
+
+        with open(part, "a", encoding="utf-8") as out:
+            def on_token(piece):
+                out.write(piece)
+                streamed[0] += 1
+                if time.time() - last_cp[0] >= CHECKPOINT_EVERY:
+                    out.flush()
+                    self._update(job["id"], tokens=tokens_before + streamed[0], bytes=out.tell(),
+                                 heartbeat=int(time.time()))
+                    last_cp[0] = time.time()
+
+            reply = glm.complete(p["prompt"], system=p.get("system"),
+                                 max_tokens=max(256, p["max_tokens"] - tokens_before),
+                                 temperature=p.get("temperature", 0.1), on_token=on_token,
+                                 prefill=prefill or None)
+            out.flush()
+            size = out.tell()
+
+        m = glm.last
+        tokens = tokens_before + (m.get("completion_tokens") or streamed[0])
+        self._update(job["id"], tokens=tokens, bytes=size, heartbeat=int(time.time()),
+                     tok_s=m.get("tokens_per_s"), ttft_ms=m.get("ttft_ms"))
+        # No finish_reason means the stream was cut off; an empty continuation
+        # of a resumed job just means the partial output was already complete
+        cut_off = not m.get("error") and not m.get("finish")
+        if m.get("error") or cut_off or (reply is None and not prefill):
+            error = m.get("error") or ("stream ended before finish" if cut_off else "empty reply")
+            return self._failed(job, label, log, error, keep_partial=True)
+
+        try:
+            note = handler(job, part.read_text(errors="ignore").strip())
+        except JobRejected as e:
+            return self._failed(job, label, log, str(e), keep_partial=False)
+        part.unlink(missing_ok=True)
+        self._update(job["id"], status="done", finished=int(time.time()), result=note, error=None)
+        log(f"✅ {label}: {tokens} tok @ {m.get('tokens_per_s')} tok/s, ttft {m.get('ttft_ms')}ms, "
+            f"{m.get('total_ms', 0) / 1000:.1f}s, finish={m.get('finish')} — {note}")
+        return "done"
+
+    def _failed(self, job, label, log, error, keep_partial):
+        part = self.spool / f"{job['id']}.part"
+        if not keep_partial:
+            part.unlink(missing_ok=True)
+            self._update(job["id"], tokens=0, bytes=0)
+        final = job["attempts"] + 1 >= MAX_ATTEMPTS
+        self._update(job["id"], status="failed" if final else "queued", error=error[:200],
+                     finished=int(time.time()) if final else None)
+        log(f"❌ {label}: {error[:200]}" + (" — giving up" if final else " — will retry"))
+        return "failed" if final else "retry"
+
+
+def main():
+    q = GenerationQueue()
+    counts = q.counts()
+    print(f"Queue: {', '.join(f'{v} {k}' for k, v in sorted(counts.items())) or 'empty'}"
+          + (" — runner active" if q.runner_active() else ""))
+    for j in q.recent():
+        tok_s = f"{j['tok_s']} tok/s" if j["tok_s"] else ""
+        print(f"  #{j['id']:<4} {j['status']:<7} {j['kind']:<7} {j['key'][:48]:<48} "
+              f"{j['tokens']:>6} tok {tok_s:>12}  {j['result'] or j['error'] or ''}"[:160])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
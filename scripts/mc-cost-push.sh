@@ -6,7 +6,7 @@ export PATH="/opt/homebrew/bin:/usr/local/bin:/usr/bin:/bin:$PATH"
 MC_URL="https://kande-mission-control-production.up.railway.app"
 SYNC_KEY="kmc-sync-2026"
 COST_DIR="/Users/kurtishon/clawd/agent-output/costs"
-HISTORY="$COST_DIR/cost-history.json"
+HISTORY="$COST_DIR/cost-history.jsonl"   # closed days, appended by push-costs.py
 TODAY=$(date +%Y-%m-%d)
 TODAY_FILE="$COST_DIR/api-costs-$TODAY.json"
 
@@ -82,15 +82,24 @@ if [ -f "$TODAY_FILE" ]; then
     -d @"$TODAY_FILE" > /dev/null 2>&1
 fi
 
-# Also push week total from history
+# Also push week total from history (closed days) plus today's running report
 if [ -f "$HISTORY" ]; then
   WEEK_TOTAL=$(python3 -c "
 import json
 from datetime import datetime, timedelta, timezone
 now = datetime.now(timezone.utc)
+today = now.strftime('%Y-%m-%d')
 week_ago = (now - timedelta(days=7)).strftime('%Y-%m-%d')
-h = json.load(open('$HISTORY'))
-total = sum(d['total'] for d in h if d['date'] >= week_ago)
+days = {}
+for line in open('$HISTORY'):
+    if line.strip():
+        d = json.loads(line)
+        days[d['date']] = d['total']
+try:
+    days[today] = json.load(open('$TODAY_FILE'))['total']
+except Exception:
+    pass
+total = sum(t for d, t in days.items() if d >= week_ago)
 print(f'{total:.2f}')
 " 2>/dev/null || echo "0")
   
@@ -5,15 +5,37 @@ Merge duplicate prospects in CRM.
 - Merges missing fields from duplicate into primary
 - Moves contacts and activities to primary (skipping exact duplicates)
 - Deletes the duplicate after merge
+
+Each duplicate group is merged with one POST /api/prospects/:id/merge
+(see crm_merge.py): the server re-parents contacts, activities, photos,
+pipeline cards and outreach sends and deletes the duplicates in one step, so
+a failure never leaves a half-merged record. --dry-run prints the server's
+diff for every group without writing.
+
+Servers without the merge endpoint fall back to the client-side plan:
+activities and contacts are indexed by prospect_id once, every merge is
+planned up front, and the plan runs in two phases with MAX_CONCURRENCY
+requests in flight:
+  1. field updates (one PUT per primary), contact moves, activity moves
+  2. prospect deletes — only for duplicates whose phase-1 steps all landed,
+     since deleting a prospect also deletes whatever is still attached to it
+
+Usage: python3 merge-duplicates.py [--dry-run]
 """
 
-import json, urllib.request
-from collections import Counter
+import json, sys, time, urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, '/Users/kurtishon/clawd/scripts')
+from crm_merge import MergeClient, MergeError, format_diff
 
 API = 'https://sales.kandedash.com'
 KEY = 'kande2026'
 
-DRY_RUN = False  # Set True to preview without making changes
+DRY_RUN = '--dry-run' in sys.argv  # preview without making changes
+MAX_CONCURRENCY = 8
+PAGE_SIZE = 1000
 
 # API blocks default Python User-Agent; use a browser-like one
 _UA = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
@@ -48,6 +70,31 @@ def api_delete(path):
         return json.loads(resp.read())
 
 
+CALLS = {'GET': lambda p, _b: api_get(p), 'PUT': api_put, 'POST': api_post,
+         'DELETE': lambda p, _b: api_delete(p)}
+
+
+def fetch_all_activities():
+    """Every activity, paged by id (the old ?limit=2000 silently dropped older ones)."""
+    out, after = {}, 0
+    while True:
+        page = api_get(f'/api/activities?page_size={PAGE_SIZE}&after_id={after}')
+        out.update((a['id'], a) for a in page)
+        # A server without paging returns the whole list every time
+        last = max((int(a['id']) for a in page), default=after)
+        if len(page) != PAGE_SIZE or last <= after:
+            break
+        after = last
+    return list(out.values())
+
+
+def by_prospect(items):
+    index = defaultdict(list)
+    for item in items:
+        index[item.get('prospect_id')].append(item)
+    return index
+
+
 def pick_best_value(v1, v2):
     """Pick the more informative value."""
     if not v1 and v2:
@@ -62,145 +109,170 @@ def pick_best_value(v1, v2):
     return v1
 
 
-def merge_pair(primary, duplicate, all_activities, all_contacts):
-    """Merge duplicate into primary."""
+def op(method, path, body=None, label='', fallback=None):
+    return {'method': method, 'path': path, 'body': body, 'label': label, 'fallback': fallback or []}
+
+
+def plan_merge(primary, duplicate, acts_by_pid, contacts_by_pid, updates):
+    """
+    Plan merging duplicate into primary. Field changes accumulate in updates
+    (and in primary itself) so several duplicates fold into one PUT; moved
+    children join the primary's index so later duplicates dedupe against
+    them. Returns the contact/activity move ops.
+    """
     pid = primary['id']
     did = duplicate['id']
     name = primary.get('name', '?')
-    
+    ops = []
+
     print(f"\n{'='*60}")
     print(f"MERGING: {name}")
     print(f"  Primary: #{pid} (created {primary.get('created_at','?')[:10]})")
     print(f"  Duplicate: #{did} (created {duplicate.get('created_at','?')[:10]})")
-    
+
     # 1. Merge prospect fields
     merge_fields = ['address', 'type', 'property_type', 'units', 'notes', 'source',
                     'lat', 'lng', 'hours', 'phone', 'website', 'contact_name',
                     'contact_email', 'contact_phone']
-    
-    updates = {}
+
     for field in merge_fields:
         pval = primary.get(field)
         dval = duplicate.get(field)
         best = pick_best_value(pval, dval)
         if best != pval and best is not None:
-            updates[field] = best
+            updates[field] = primary[field] = best
             print(f"  📝 Field '{field}': '{str(pval)[:40]}' → '{str(best)[:40]}'")
-    
+
     # Merge notes (append if different)
     pnotes = (primary.get('notes') or '').strip()
     dnotes = (duplicate.get('notes') or '').strip()
     if dnotes and dnotes != pnotes and dnotes not in pnotes:
         combined = f"{pnotes}\n---\n{dnotes}" if pnotes else dnotes
-        updates['notes'] = combined
+        updates['notes'] = primary['notes'] = combined
         print(f"  📝 Notes merged (appended duplicate's notes)")
-    
-    if updates and not DRY_RUN:
-        api_put(f'/api/prospects/{pid}', updates)
-        print(f"  ✅ Prospect #{pid} updated with {len(updates)} fields")
-    elif updates:
-        print(f"  [DRY RUN] Would update {len(updates)} fields")
-    
-    # 2. Move contacts (skip duplicates by email)
-    primary_contacts = [c for c in all_contacts if c.get('prospect_id') == pid]
-    dupe_contacts = [c for c in all_contacts if c.get('prospect_id') == did]
-    
+
+    # 2. Move contacts (skip duplicates by email/name — those go with the duplicate's delete)
+    primary_contacts = contacts_by_pid[pid]
     primary_emails = set((c.get('email') or '').lower() for c in primary_contacts)
     primary_names = set((c.get('name') or '').lower() for c in primary_contacts)
-    
-    for dc in dupe_contacts:
+
+    for dc in contacts_by_pid.pop(did, []):
         dc_email = (dc.get('email') or '').lower()
         dc_name = (dc.get('name') or '').lower()
-        
+
         if dc_email and dc_email in primary_emails:
             print(f"  ⏭️ Contact '{dc.get('name')}' already exists (same email), skipping")
-            if not DRY_RUN:
-                try:
-                    api_delete(f'/api/directory/contacts/{dc["id"]}')
-                except:
-                    pass
             continue
-        
         if dc_name and dc_name in primary_names:
             print(f"  ⏭️ Contact '{dc.get('name')}' already exists (same name), skipping")
-            if not DRY_RUN:
-                try:
-                    api_delete(f'/api/directory/contacts/{dc["id"]}')
-                except:
-                    pass
             continue
-        
-        # Move contact to primary
+
         print(f"  📇 Moving contact '{dc.get('name')}' ({dc.get('email')}) → #{pid}")
-        if not DRY_RUN:
-            try:
-                api_put(f'/api/directory/contacts/{dc["id"]}', {'prospect_id': pid})
-            except:
-                # If can't update, create new + delete old
-                try:
-                    api_post(f'/api/prospects/{pid}/contacts', {
-                        'name': dc.get('name'), 'role': dc.get('role'),
-                        'email': dc.get('email'), 'phone': dc.get('phone')
-                    })
-                    api_delete(f'/api/directory/contacts/{dc["id"]}')
-                except Exception as e:
-                    print(f"    ❌ Failed: {e}")
-    
+        # If it can't be re-parented, create new + delete old
+        ops.append(op('PUT', f'/api/directory/contacts/{dc["id"]}', {'prospect_id': pid},
+                      f"contact {dc['id']} → #{pid}", fallback=[
+                          op('POST', f'/api/prospects/{pid}/contacts', {
+                              'name': dc.get('name'), 'role': dc.get('role'),
+                              'email': dc.get('email'), 'phone': dc.get('phone')}),
+                          op('DELETE', f'/api/directory/contacts/{dc["id"]}')]))
+        primary_contacts.append(dc)
+        primary_emails.add(dc_email)
+        primary_names.add(dc_name)
+
     # 3. Move activities (skip exact duplicates by type+description)
-    primary_acts = [a for a in all_activities if a.get('prospect_id') == pid]
-    dupe_acts = [a for a in all_activities if a.get('prospect_id') == did]
-    
-    primary_act_sigs = set()
-    for a in primary_acts:
-        sig = f"{a.get('type','')}__{a.get('description','')}"
-        primary_act_sigs.add(sig)
-    
-    for da in dupe_acts:
+    primary_acts = acts_by_pid[pid]
+    primary_act_sigs = set(f"{a.get('type','')}__{a.get('description','')}" for a in primary_acts)
+
+    for da in acts_by_pid.pop(did, []):
         sig = f"{da.get('type','')}__{da.get('description','')}"
-        
         if sig in primary_act_sigs:
-            print(f"  ⏭️ Activity '{da.get('type')}: {da.get('description','')[:50]}' already exists, deleting dupe")
-            if not DRY_RUN:
-                try:
-                    api_delete(f'/api/activities/{da["id"]}')
-                except:
-                    pass
+            print(f"  ⏭️ Activity '{da.get('type')}: {da.get('description','')[:50]}' already exists, dropping dupe")
             continue
-        
-        # Move activity to primary
+
         print(f"  📋 Moving activity '{da.get('type')}: {da.get('description','')[:50]}' → #{pid}")
-        if not DRY_RUN:
-            try:
-                api_put(f'/api/activities/{da["id"]}', {'prospect_id': pid})
-            except:
-                try:
-                    api_post(f'/api/activities', {
-                        'prospect_id': pid,
-                        'type': da.get('type'),
-                        'description': da.get('description')
-                    })
-                    api_delete(f'/api/activities/{da["id"]}')
-                except Exception as e:
-                    print(f"    ❌ Failed: {e}")
-    
-    # 4. Delete the duplicate prospect
-    print(f"  🗑️ Deleting duplicate #{did}")
-    if not DRY_RUN:
+        ops.append(op('PUT', f'/api/activities/{da["id"]}', {'prospect_id': pid},
+                      f"activity {da['id']} → #{pid}", fallback=[
+                          op('POST', '/api/activities', {
+                              'prospect_id': pid, 'type': da.get('type'),
+                              'description': da.get('description')}),
+                          op('DELETE', f'/api/activities/{da["id"]}')]))
+        primary_acts.append(da)
+
+    print(f"  🗑️ Will delete duplicate #{did}")
+    return ops
+
+
+def run_op(o):
+    """Run one op (and its fallback chain if it fails). Returns an error string or None."""
+    try:
+        CALLS[o['method']](o['path'], o['body'])
+        return None
+    except Exception as e:
+        if not o['fallback']:
+            return f"{o['method']} {o['path']}: {e}"
+        try:
+            for fb in o['fallback']:
+                CALLS[fb['method']](fb['path'], fb['body'])
+            return None
+        except Exception as e2:
+            return f"{o['method']} {o['path']}: {e}; fallback: {e2}"
+
+
+def run_plan(tagged_ops, pool):
+    """Run [(ids, op)] concurrently. Returns {id: [errors]} for every id tagged on a failed op."""
+    failed = defaultdict(list)
+    for (ids, o), err in zip(tagged_ops, pool.map(lambda t: run_op(t[1]), tagged_ops)):
+        if err:
+            for i in ids:
+                failed[i].append(err)
+            print(f"    ❌ {o['label'] or o['path']}: {err}")
+    return failed
+
+
+def server_merge(groups, pool):
+    """
+    One merge request per (primary, duplicates) group. Returns the set of
+    merged duplicate ids, or None when the server has no merge endpoint.
+    """
+    client = MergeClient(API, KEY)
+
+    def one(group):
+        primary, dups = group
         try:
-            api_delete(f'/api/prospects/{did}')
-            print(f"  ✅ Duplicate #{did} deleted")
-        except Exception as e:
-            print(f"  ❌ Failed to delete: {e}")
-    else:
-        print(f"  [DRY RUN] Would delete #{did}")
+            return client.merge(primary['id'], [d['id'] for d in dups], dry_run=DRY_RUN), None
+        except MergeError as e:
+            return None, e
+
+    if not groups:
+        return set()
+    # Probe with the first group so an old server is detected before fanning out
+    first = one(groups[0])
+    if first[1] and first[1].status == 404 and not first[1].detail:
+        return None
+    merged = set()
+    for (primary, dups), (diff, err) in zip(groups, [first] + list(pool.map(one, groups[1:]))):
+        print(f"\n{primary.get('name', '?')}")
+        if err:
+            print(f"  ❌ {err} — duplicates kept, re-run to retry")
+            continue
+        print(format_diff(diff))
+        merged.update(d['id'] for d in dups)
+    return merged
 
 
 def main():
+    t0 = time.time()
     print("🔄 Fetching all data...")
-    prospects = api_get('/api/prospects')
-    activities = api_get('/api/activities?limit=2000')
-    contacts = api_get('/api/directory/contacts')
-    
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        f_prospects = pool.submit(api_get, '/api/prospects')
+        f_activities = pool.submit(fetch_all_activities)
+        f_contacts = pool.submit(api_get, '/api/directory/contacts')
+        prospects, activities, contacts = f_prospects.result(), f_activities.result(), f_contacts.result()
+    acts_by_pid = by_prospect(activities)
+    contacts_by_pid = by_prospect(contacts)
+    print(f"  {len(prospects)} prospects, {len(activities)} activities, {len(contacts)} contacts "
+          f"({time.time() - t0:.1f}s)")
+
     # Find duplicates by name
     names = {}
     for p in prospects:
@@ -208,16 +280,16 @@ def main():
         if n not in names:
             names[n] = []
         names[n].append(p)
-    
+
     dupes = {n: ps for n, ps in names.items() if len(ps) > 1}
-    
+
     # Exclude names where "duplicates" are actually different locations
     DIFFERENT_LOCATIONS = {'FedEx', 'FedEx Ground', 'USPS', 'Amazon', 'US Foods'}
     for skip_name in DIFFERENT_LOCATIONS:
         if skip_name in dupes:
             print(f"⏭️ Skipping '{skip_name}' — different physical locations, not duplicates")
             del dupes[skip_name]
-    
+
     # Manually add near-duplicates with slightly different names
     prospect_map = {p['id']: p for p in prospects}
     MANUAL_MERGES = [
@@ -229,45 +301,88 @@ def main():
             dname = prospect_map[dupe_id].get('name', '?')
             key = f"MANUAL: {pname} + {dname}"
             dupes[key] = [prospect_map[primary_id], prospect_map[dupe_id]]
-    
+
     print(f"Found {len(dupes)} duplicate groups ({sum(len(ps) for ps in dupes.values())} total records)")
-    
-    merged = 0
+
+    # Sort by: most activities > most contacts > oldest created
+    def score(p):
+        return (len(acts_by_pid.get(p['id'], ())), len(contacts_by_pid.get(p['id'], ())),
+                -len(p.get('created_at', '')))
+
+    groups = []        # [(primary, [duplicates])] for the server merge
+    placeholders = set()
     for name, group in sorted(dupes.items()):
         if name == 'Unknown (check management)':
             # These are placeholder records, just delete them
             print(f"\n🗑️ Deleting {len(group)} 'Unknown' placeholder records...")
             for p in group:
-                p_acts = [a for a in activities if a.get('prospect_id') == p['id']]
-                p_contacts = [c for c in contacts if c.get('prospect_id') == p['id']]
-                if not p_acts and not p_contacts:
-                    if not DRY_RUN:
-                        try:
-                            api_delete(f'/api/prospects/{p["id"]}')
-                            print(f"  Deleted #{p['id']}")
-                        except:
-                            pass
+                if not acts_by_pid.get(p['id']) and not contacts_by_pid.get(p['id']):
+                    placeholders.add(p['id'])
                 else:
                     print(f"  #{p['id']} has data, keeping")
             continue
-        
-        # Sort by: most activities > most contacts > oldest created
-        def score(p):
-            p_acts = len([a for a in activities if a.get('prospect_id') == p['id']])
-            p_contacts = len([c for c in contacts if c.get('prospect_id') == p['id']])
-            return (p_acts, p_contacts, -len(p.get('created_at', '')))
-        
         group.sort(key=score, reverse=True)
-        primary = group[0]
-        
-        for duplicate in group[1:]:
-            merge_pair(primary, duplicate, activities, contacts)
-            merged += 1
-    
+        groups.append((group[0], group[1:]))
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as pool:
+        merged = server_merge(groups, pool)
+        if merged is not None:
+            deletes = [((pid,), op('DELETE', f'/api/prospects/{pid}', label=f"delete #{pid}"))
+                       for pid in sorted(placeholders)]
+            print(f"\n{'='*60}")
+            if DRY_RUN:
+                print(f"⚠️ DRY RUN — no changes were made ({len(deletes)} placeholders would be deleted)")
+                return
+            failed = run_plan(deletes, pool)
+            print(f"✅ Merged {len(merged)} duplicates in {len(groups)} groups, "
+                  f"deleted {len(placeholders) - len(failed)} placeholders in {time.time() - t0:.1f}s")
+            return
+
+    print("\n⚠️ Server has no merge endpoint — falling back to client-side plan")
+    legacy_merge(groups, placeholders, acts_by_pid, contacts_by_pid, t0)
+
+
+def legacy_merge(groups, placeholders, acts_by_pid, contacts_by_pid, t0):
+    """Client-side merge for servers without POST /api/prospects/:id/merge."""
+    # Every op is tagged with the duplicate ids it blocks: a duplicate is only
+    # deleted once all of its moves and its primary's field patch have landed
+    phase1 = []        # [(blocked duplicate ids, op)]
+    deletes = [((pid,), op('DELETE', f'/api/prospects/{pid}', label=f"delete #{pid}"))
+               for pid in sorted(placeholders)]
+    for primary, dups in groups:
+        updates = {}
+        for duplicate in dups:
+            did = duplicate['id']
+            phase1 += [((did,), o) for o in
+                       plan_merge(primary, duplicate, acts_by_pid, contacts_by_pid, updates)]
+            deletes.append(((did,), op('DELETE', f'/api/prospects/{did}', label=f"delete duplicate #{did}")))
+        if updates:
+            # One PUT per primary, however many duplicates folded into it
+            phase1.append((tuple(d['id'] for d in dups),
+                           op('PUT', f'/api/prospects/{primary["id"]}', updates,
+                              f"update #{primary['id']} ({len(updates)} fields)")))
+
     print(f"\n{'='*60}")
-    print(f"✅ Merged {merged} duplicate pairs")
+    print(f"📋 Plan: {len(phase1)} updates/moves, {len(deletes)} deletes "
+          f"({len(phase1) + len(deletes)} requests, {MAX_CONCURRENCY} at a time)")
     if DRY_RUN:
         print("⚠️ DRY RUN — no changes were made")
+        return
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as pool:
+        blocked = run_plan(phase1, pool)
+        safe = []
+        for tag, o in deletes:
+            if tag[0] in blocked:
+                print(f"  ⚠️ Keeping #{tag[0]}: {len(blocked[tag[0]])} step(s) failed, re-run to retry")
+            else:
+                safe.append((tag, o))
+        failed_deletes = run_plan(safe, pool)
+
+    deleted = {tag[0] for tag, _ in safe} - set(failed_deletes)
+    print(f"\n{'='*60}")
+    print(f"✅ Merged {len(deleted - placeholders)} duplicate pairs, "
+          f"deleted {len(deleted & placeholders)} placeholders in {time.time() - t0:.1f}s")
 
 
 if __name__ == '__main__':
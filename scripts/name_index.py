@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+name_index.py — Indexed fuzzy name-membership check for scout dedup.
+
+Replaces the per-candidate linear scan
+    any(name_norm in ex or ex in name_norm for ex in existing if len(ex) > 5)
+with lookups that don't touch every CRM name:
+
+  contains(q)      → indexed names that contain q      (trigram inverted index)
+  contained_by(q)  → indexed names that are inside q   (substring probe on a hash set)
+  overlapping(q)   → indexed names sharing most tokens (token inverted index)
+  matches(q)       → contains or contained_by — same answer as the old scan
+
+Built from the CRM prospect list (/api/prospects or a crm-export.py JSON file)
+and persisted to logs/crm-name-index.json so names queued by a scout stay
+deduped on the next run even before Jordan adds them to the CRM.
+
+Usage:
+  python3 name_index.py [snapshot.json]    # rebuild index from snapshot (or live CRM)
+  python3 name_index.py --query "Name"     # show what a candidate matches
+"""
+
+import json, os, re, sys, time, datetime, urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+INDEX_FILE = Path("/Users/kurtishon/clawd/logs/crm-name-index.json")
+CRM_BASE   = "https://vend.kandedash.com"
+CRM_KEY    = "kande2026"
+
+MIN_LEN = 6   # same floor as the old `len(ex) > 5` filter
+GRAM    = 3
+
+
+def normalize(name):
+    return re.sub(r'\s+', ' ', (name or "").lower().strip())
+
+
+def _grams(s):
+    return {s[i:i + GRAM] for i in range(len(s) - GRAM + 1)}
+
+
+def _tokens(s):
+    return set(re.findall(r'[a-z0-9]+', s))
+
+
+class NameIndex:
+    """Normalized-name set with trigram, length and token indexes."""
+
+    def __init__(self, names=()):
+        self.names = set()
+        self.grams = defaultdict(set)    # trigram → names containing it
+        self.tokens = defaultdict(set)   # token → names containing it
+        self.lengths = set()             # distinct lengths of indexed names
+        for n in names:
+            self.add(n)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return normalize(name) in self.names
+
+    def add(self, name):
+        n = normalize(name)
+        if not n or n in self.names:
+            return
+        self.names.add(n)
+        if len(n) < MIN_LEN:
+            return  # stored for exact lookups only, like the old filter
+        self.lengths.add(len(n))
+        for g in _grams(n):
+            self.grams[g].add(n)
+        for t in _tokens(n):
+            self.tokens[t].add(n)
+
+    # --- Queries ---
+
+    def contains(self, query):
+        """Indexed names (len >= MIN_LEN) that contain query as a substring."""
+        q = normalize(query)
+        if len(q) < GRAM:
+            return {ex for ex in self.names if len(ex) >= MIN_LEN and q in ex}
+        postings = sorted((self.grams.get(g, ()) for g in _grams(q)), key=len)
+        if not postings or not postings[0]:
+            return set()
+        hits = set(postings[0])
+        for p in postings[1:]:
+            hits &= p
+            if not hits:
+                return hits
+        return {ex for ex in hits if q in ex}
+
+    def contained_by(self, query):
+        """Indexed names (len >= MIN_LEN) that appear as a substring of query."""
+        q = normalize(query)
+        hits = set()
+        for size in self.lengths:
+            if size > len(q):
+                continue
+            for i in range(len(q) - size + 1):
+                sub = q[i:i + size]
+                if sub in self.names:
+                    hits.add(sub)
+        return hits
+
+    def matches(self, query):
+        """True if query is already covered — equivalent to the old linear scan."""
+        q = normalize(query)
+        return bool(self.contains(q)) or bool(self.contained_by(q))
+
+    def overlapping(self, query, min_jaccard=0.6):
+        """Indexed names whose token sets overlap query's by at least min_jaccard."""
+        qt = _tokens(normalize(query))
+        if not qt:
+            return []
+        shared = defaultdict(int)
+        for t in qt:
+            for ex in self.tokens.get(t, ()):
+                shared[ex] += 1
+        out = []
+        for ex, n in shared.items():
+            score = n / len(qt | _tokens(ex))
+            if score >= min_jaccard:
+                out.append((round(score, 3), ex))
+        return sorted(out, reverse=True)
+
+    # --- Persistence ---
+
+    def save(self, path=INDEX_FILE):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "version": 1,
+            "saved_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "names": sorted(self.names),
+        }))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        try:
+            data = json.loads(Path(path).read_text())
+            return cls(data.get("names", []))
+        except (OSError, ValueError):
+            return cls()
+
+    @classmethod
+    def from_prospects(cls, prospects):
+        if isinstance(prospects, dict):
+            prospects = prospects.get("prospects") or prospects.get("data") or []
+        return cls(p.get("name", "") for p in prospects)
+
+    @classmethod
+    def from_snapshot(cls, path):
+        """Build from a saved prospect list or crm-export.py JSON file."""
+        return cls.from_prospects(json.loads(Path(path).read_text()))
+
+
+def fetch_prospects(base=CRM_BASE, key=CRM_KEY, timeout=15):
+    req = urllib.request.Request(f"{base}/api/prospects?limit=1000",
+                                 headers={"x-api-key": key, "User-Agent": "Mozilla/5.0"})
+    with urllib.request.urlopen(req, timeout=timeout) as r:
+        leads = json.loads(r.read())
+    if isinstance(leads, dict):
+        leads = leads.get("data", [])
+    return leads
+
+
+def load_index(prospects=None, path=INDEX_FILE):
+    """
+    Persisted index merged with the current CRM snapshot.
+    Names queued in earlier runs are kept; if the CRM fetch failed (prospects is
+    None) the persisted index is used on its own instead of an empty set.
+    """
+    index = NameIndex.load(path)
+    if prospects:
+        fresh = NameIndex.from_prospects(prospects)
+        for n in fresh.names:
+            index.add(n)
+    return index
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if "--query" in sys.argv:
+        index = NameIndex.load()
+        q = " ".join(args)
+        t0 = time.perf_counter()
+        hit = index.matches(q)
+        dt = (time.perf_counter() - t0) * 1e6
+        print(f"{len(index)} names indexed | match={hit} ({dt:.0f}µs)")
+        print(f"  contains:     {sorted(index.contains(q))[:10]}")
+        print(f"  contained_by: {sorted(index.contained_by(q))[:10]}")
+        print(f"  overlapping:  {index.overlapping(q)[:10]}")
+        return 0
+
+    t0 = time.perf_counter()
+    if args:
+        index = NameIndex.from_snapshot(args[0])
+    else:
+        index = load_index(fetch_prospects())
+    index.save()
+    print(f"Indexed {len(index)} names in {time.perf_counter() - t0:.2f}s → {INDEX_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
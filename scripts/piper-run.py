@@ -2,6 +2,16 @@
 """
 piper-run.py — Content generation for VendTech + Jumpgate.
 Gathers all context, calls GLM directly for pure text output (no tool calls).
+
+Generations go through the GLM queue (glm_queue.py): today's blog topic and
+social posts are submitted (deduplicated by topic / day, and a new blog only
+once the previous one has drained), then this process works the queue at
+llama-server's slot count, streaming each job to disk. If another piper-run
+is already working the queue it only submits and exits.
+
+Blog topics that an existing post already covers are skipped before any
+inference is spent on them, and a finished draft that turns out to be a
+near-duplicate of a post is not saved (blog_index.py).
 Exits 0 on success, 1 on failure.
 """
 
@@ -16,8 +26,25 @@ STYLE_GUIDE = Path("/Users/kurtishon/clawd/agent-output/piper/SEO-STYLE-GUIDE.md
 LEARNINGS   = Path("/Users/kurtishon/clawd/agent-output/shared/learnings.md")
 LOG         = Path("/Users/kurtishon/clawd/logs/piper.log")
 
+sys.path.insert(0, "/Users/kurtishon/clawd/scripts")
+from glm_queue import GenerationQueue, JobRejected
+from blog_index import BlogIndex
+
 TODAY = datetime.date.today().isoformat()
 
+BLOG_TOPICS = [
+    "car dealerships las vegas vending machines",
+    "auto repair shops vending machines las vegas",
+    "trade schools vocational colleges vending las vegas",
+    "bowling alleys vending machines las vegas",
+    "urgent care clinics vending machines las vegas",
+    "clark county government buildings vending las vegas",
+    "corporate campuses vending machines las vegas",
+    "movie production studios vending las vegas",
+    "nevada dmv offices vending machines",
+    "coworking spaces vending machines las vegas",
+]
+
 def log(msg):
     ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     line = f"[{ts}] {msg}"
@@ -32,65 +59,14 @@ def read_file(path, max_chars=8000):
     except:
         return ""
 
-def glm_generate(prompt, max_tokens=8192):
-    """Call GLM directly — pure text generation, no tool calls."""
-    payload = json.dumps({
-        "model": GLM_MODEL,
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": max_tokens,
-        "temperature": 0.7,
-        "stream": False,
-    }).encode()
-    req = urllib.request.Request(
-        GLM_URL,
-        data=payload,
-        headers={"Content-Type": "application/json"},
-        method="POST"
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=600) as r:  # 10 min max — if GLM hasn't responded, it's hung
-            data = json.loads(r.read())
-            return data["choices"][0]["message"]["content"]
-    except Exception as e:
-        log(f"GLM error: {e}")
-        return None
-
-def get_existing_blog_slugs():
-    """List existing blog filenames to avoid topic duplication."""
-    try:
-        return [f.stem for f in sorted(BLOG_DIR.glob("*.html"))]
-    except:
-        return []
-
 def slug_from_title(title):
     title = title.lower().strip()
     title = re.sub(r'[^a-z0-9\s-]', '', title)
     title = re.sub(r'\s+', '-', title)
     return title[:80]
 
-def write_vendtech_blog():
-    """Generate one VendTech SEO blog post."""
-    log("Generating VendTech blog...")
-
-    existing    = get_existing_blog_slugs()
-    # Pick a topic not already covered
-    covered = set(existing[-20:]) if existing else set()
-    topics = [
-        "car dealerships las vegas vending machines",
-        "auto repair shops vending machines las vegas",
-        "trade schools vocational colleges vending las vegas",
-        "bowling alleys vending machines las vegas",
-        "urgent care clinics vending machines las vegas",
-        "clark county government buildings vending las vegas",
-        "corporate campuses vending machines las vegas",
-        "movie production studios vending las vegas",
-        "nevada dmv offices vending machines",
-        "coworking spaces vending machines las vegas",
-    ]
-    import random
-    topic = random.choice([t for t in topics if t not in covered] or topics)
-
-    prompt = f"""Write a complete SEO blog post as a full HTML file for KandeVendTech.com, a Las Vegas vending machine company.
+def blog_prompt(topic):
+    return f"""Write a complete SEO blog post as a full HTML file for KandeVendTech.com, a Las Vegas vending machine company.
 
 TOPIC: {topic}
 
@@ -109,68 +85,95 @@ RULES:
 
 Output the full HTML now:"""
 
-    html = glm_generate(prompt, max_tokens=12000)
-    if not html:
-        log("ERROR: GLM returned nothing for blog")
-        return False
+SOCIAL_PROMPT = """Write social media posts for KandeVendTech.com, a Las Vegas vending machine company.
 
+Output exactly this format:
+
+## LINKEDIN POST
+(150-200 words, first person from owner Kurtis, specific insight about Las Vegas vending, real stat, no buzzwords, no em dashes)
+
+## TWITTER POSTS
+Tweet 1: (under 250 chars, specific and punchy)
+Tweet 2: (under 250 chars, Las Vegas specific)
+Tweet 3: (under 250 chars, real insight)
+
+Output only the posts:"""
+
+def enqueue_content(queue, index):
+    """Submit one new VendTech blog topic and today's social posts. Returns the number queued."""
+    added = 0
+    if queue.backlog("blog"):
+        log(f"Blog: {queue.backlog('blog')} still queued/running — not adding another")
+    else:
+        # Pick a topic not already generated, queued, or covered by an existing post
+        taken = queue.known("blog")
+        topics = []
+        for t in BLOG_TOPICS:
+            if slug_from_title(t) in taken:
+                continue
+            dup = index.duplicates(t, corpus="vendtech")
+            if dup:
+                log(f"Blog: skipping '{t}' — already covered by {dup[0].slug} ({dup[0].score:.2f})")
+            else:
+                topics.append(t)
+        if not topics:
+            log("Blog: every topic has been generated or is covered — add topics to BLOG_TOPICS")
+        else:
+            topic = random.choice(topics)
+            if queue.submit("blog", slug_from_title(topic), blog_prompt(topic),
+                            max_tokens=12000, temperature=0.7, topic=topic, day=TODAY):
+                log(f"Blog queued: {topic}")
+                added += 1
+
+    if queue.submit("social", f"vendtech-{TODAY}", SOCIAL_PROMPT,
+                    max_tokens=2000, temperature=0.7, day=TODAY):
+        log("Social posts queued")
+        added += 1
+    return added
+
+def save_blog(job, html, index=None):
+    """Queue handler: clean up and save one generated VendTech blog post."""
     # Strip any accidental markdown fences
     html = re.sub(r'^```html\s*', '', html, flags=re.MULTILINE)
     html = re.sub(r'^```\s*$', '', html, flags=re.MULTILINE)
     html = html.strip()
 
     if not html.startswith("<!DOCTYPE") and not html.startswith("<html"):
-        log(f"ERROR: Output doesn't look like HTML. First 200 chars: {html[:200]}")
-        return False
+        raise JobRejected(f"Output doesn't look like HTML. First 200 chars: {html[:200]}")
+
+    # A retry would write the same post again, so a duplicate draft is a
+    # finished job that just isn't saved
+    index = index or BlogIndex()
+    dup = index.duplicates(html, corpus="vendtech")
+    if dup:
+        return f"blog not saved: near-duplicate of {dup[0].slug} ({dup[0].score:.2f})"
 
     # Extract title for slug
+    day = json.loads(job["payload"]).get("day", TODAY)
     title_match = re.search(r'<title>(.*?)</title>', html, re.IGNORECASE)
-    title = title_match.group(1) if title_match else f"vendtech-blog-{TODAY}"
+    title = title_match.group(1) if title_match else f"vendtech-blog-{day}"
     slug = slug_from_title(title)
     if not slug:
-        slug = f"vendtech-blog-{TODAY}"
+        slug = f"vendtech-blog-{day}"
 
     out_path = BLOG_DIR / f"{slug}.html"
     BLOG_DIR.mkdir(parents=True, exist_ok=True)
     out_path.write_text(html)
-    log(f"Blog saved: {out_path.name} ({len(html)} bytes)")
-    return True
-
-def write_social_posts():
-    """Generate LinkedIn + Twitter posts for VendTech."""
-    log("Generating social posts...")
-
-    learnings = read_file(LEARNINGS, 1500)
-
-    prompt = """Write social media posts for KandeVendTech.com, a Las Vegas vending machine company.
-
-Output exactly this format:
-
-## LINKEDIN POST
-(150-200 words, first person from owner Kurtis, specific insight about Las Vegas vending, real stat, no buzzwords, no em dashes)
-
-## TWITTER POSTS
-Tweet 1: (under 250 chars, specific and punchy)
-Tweet 2: (under 250 chars, Las Vegas specific)
-Tweet 3: (under 250 chars, real insight)
-
-Output only the posts:"""
-
-    output = glm_generate(prompt, max_tokens=2000)
-    if not output:
-        log("ERROR: GLM returned nothing for social")
-        return False
+    index.add(out_path, corpus="vendtech")
+    return f"blog saved: {out_path.name} ({len(html)} bytes)"
 
+def save_social(job, output):
+    """Queue handler: save the day's LinkedIn + Twitter posts."""
     # Check it's not DSML garbage
     if "<｜DSML｜" in output or "<tool_call>" in output:
-        log("ERROR: GLM output is DSML markup")
-        return False
+        raise JobRejected("GLM output is DSML markup")
 
+    day = json.loads(job["payload"]).get("day", TODAY)
     SOCIAL_DIR.mkdir(parents=True, exist_ok=True)
-    out_path = SOCIAL_DIR / f"{TODAY}.md"
+    out_path = SOCIAL_DIR / f"{day}.md"
     out_path.write_text(output)
-    log(f"Social saved: {out_path.name} ({len(output)} bytes)")
-    return True
+    return f"social saved: {out_path.name} ({len(output)} bytes)"
+
 
 def push_activity(message, duration_ms, exit_code):
     try:
@@ -190,20 +193,32 @@ def main():
     import time as _time
     log("=== Piper Run ===")
     _t0 = _time.time()
-    blog_ok   = write_vendtech_blog()
-    social_ok = write_social_posts()
+    queue = GenerationQueue(url=GLM_URL, model=GLM_MODEL)
+    index = BlogIndex()
+    index.refresh()
+    added = enqueue_content(queue, index)
+    handlers = {"blog": lambda job, html: save_blog(job, html, index), "social": save_social}
+    summary = queue.run(handlers, caller="piper-run", log=log)
+    if summary is None:
+        log(f"Queue already being worked by another piper-run — {added} job(s) left for it.")
+        sys.exit(0)
     _dur = int((_time.time() - _t0) * 1000)
 
-    if blog_ok and social_ok:
+    done = len(summary["done"])
+    failed = len(summary["failed"]) + len(summary["retry"])
+    if done and not failed:
         log("All done.")
         push_activity("Writing: blog content — done [GLM]", _dur, 0)
         sys.exit(0)
-    elif blog_ok or social_ok:
+    elif done:
         log("Partial success.")
         push_activity("Writing: blog content — partial [GLM]", _dur, 0)
         sys.exit(0)
+    elif not failed:
+        log("Nothing to generate.")
+        sys.exit(0)
     else:
-        log("Both tasks failed.")
+        log("All jobs failed.")
         push_activity("Writing: blog content — failed [GLM]", _dur, 1)
         sys.exit(1)
 
@@ -1,78 +1,117 @@
 #!/usr/bin/env python3
-import json, glob, os, subprocess
-from datetime import datetime, timezone
+import json, os, subprocess, sys
+from datetime import datetime, timedelta, timezone
 
-now = datetime.now(timezone.utc)
-today = now.strftime('%Y-%m-%d')
-costs = {'anthropic': 0, 'exo': 0, 'other': 0}
-turns = {'anthropic': 0, 'exo': 0, 'other': 0}
-models = {}
+sys.path.insert(0, '/Users/kurtishon/clawd/scripts')
+from session_index import SessionIndex
 
-for f in glob.glob('/Users/kurtishon/.openclaw/agents/main/sessions/*.jsonl'):
+COST_DIR       = '/Users/kurtishon/clawd/agent-output/costs'
+HISTORY_FILE   = f'{COST_DIR}/cost-history.jsonl'   # one closed UTC day per line, append-only
+LEGACY_HISTORY = f'{COST_DIR}/cost-history.json'    # old full-rewrite list, read once to seed
+HISTORY_GRACE  = timedelta(hours=1)                 # late-flushed turns still land before a day closes
+
+
+def day_report(idx, day, now):
+    """api-costs report for one UTC day, from the hourly rollup."""
+    costs = {'anthropic': 0, 'exo': 0, 'other': 0}
+    turns = {'anthropic': 0, 'exo': 0, 'other': 0}
+    models = {}
+    start = int(datetime.fromisoformat(day).replace(tzinfo=timezone.utc).timestamp() * 1000)
+    for (_, p, mod), v in idx.rollup(start, start + 86400000, 'day', by=('provider', 'model')).items():
+        if not v['billed']:
+            continue
+        b = 'anthropic' if 'anthropic' in p else ('exo' if 'exo' in p else 'other')
+        costs[b] += v['cost']
+        turns[b] += v['billed']
+        if mod not in models:
+            models[mod] = {'cost': 0, 'turns': 0}
+        models[mod]['cost'] += v['cost']
+        models[mod]['turns'] += v['billed']
+
+    total = sum(costs.values())
+    return {
+        'date': day,
+        'total': round(total, 4),
+        'providers': {k: round(v, 4) for k, v in costs.items() if v > 0},
+        'turns': {k: v for k, v in turns.items() if v > 0},
+        'models': {m: {'cost': round(d['cost'], 4), 'turns': d['turns']} for m, d in models.items()},
+        'updatedAt': now.isoformat()
+    }
+
+
+def last_history_date():
     try:
-        for line in open(f):
-            try:
-                m = json.loads(line.strip())
-            except:
-                continue
-            ts = m.get('timestamp', 0)
-            if isinstance(ts, (int, float)):
-                ts_str = datetime.fromtimestamp(ts/1000 if ts > 1e12 else ts, timezone.utc).strftime('%Y-%m-%d')
-            elif isinstance(ts, str):
-                ts_str = ts[:10]
-            else:
-                continue
-            if ts_str != today:
-                continue
-            inn = m.get('message', {})
-            p = inn.get('provider', '')
-            mod = inn.get('model', '')
-            c = inn.get('usage', {}).get('cost', {})
-            v = c.get('total', 0) if isinstance(c, dict) else 0
-            if not v:
-                continue
-            b = 'anthropic' if 'anthropic' in p else ('exo' if 'exo' in p else 'other')
-            costs[b] += v
-            turns[b] += 1
-            if mod not in models:
-                models[mod] = {'cost': 0, 'turns': 0}
-            models[mod]['cost'] += v
-            models[mod]['turns'] += 1
-    except:
-        pass
-
-total = sum(costs.values())
-rpt = {
-    'date': today,
-    'total': round(total, 4),
-    'providers': {k: round(v, 4) for k, v in costs.items() if v > 0},
-    'turns': {k: v for k, v in turns.items() if v > 0},
-    'models': {m: {'cost': round(d['cost'], 4), 'turns': d['turns']} for m, d in models.items()},
-    'updatedAt': now.isoformat()
-}
-
-os.makedirs('/Users/kurtishon/clawd/agent-output/costs', exist_ok=True)
-with open(f'/Users/kurtishon/clawd/agent-output/costs/api-costs-{today}.json', 'w') as f:
-    json.dump(rpt, f)
-
-history_file = '/Users/kurtishon/clawd/agent-output/costs/cost-history.json'
-try:
-    with open(history_file) as f:
-        h = json.load(f)
-except:
-    h = []
-h = [x for x in h if x.get('date') != today]
-h.append(rpt)
-h.sort(key=lambda x: x['date'])
-with open(history_file, 'w') as f:
-    json.dump(h, f)
-
-subprocess.run([
-    'curl', '-s', '-X', 'POST',
-    'https://kande-mission-control-production.up.railway.app/api/sync/costs',
-    '-H', 'x-sync-key: kmc-sync-2026',
-    '-H', 'Content-Type: application/json',
-    '-d', json.dumps(rpt)
-], capture_output=True)
-
-print(f'Pushed: today=${total:.2f}')
+        with open(HISTORY_FILE, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 65536))
+            tail = [l for l in f.read().splitlines() if l.strip()]
+        return json.loads(tail[-1])['date'] if tail else None
+    except (OSError, ValueError, KeyError, IndexError):
+        return None
+
+
+def seed_history(before):
+    """First run: carry the closed days over from cost-history.json."""
+    try:
+        with open(LEGACY_HISTORY) as f:
+            legacy = [x for x in json.load(f) if x.get('date', before) < before]
+    except (OSError, ValueError):
+        legacy = []
+    tmp = HISTORY_FILE + '.tmp'
+    with open(tmp, 'w') as f:
+        for x in sorted(legacy, key=lambda x: x['date']):
+            f.write(json.dumps(x) + '\n')
+    os.replace(tmp, HISTORY_FILE)
+
+
+def append_history(idx, now):
+    """Append a report for every day that has closed since the last history line."""
+    closed_before = (now - HISTORY_GRACE).strftime('%Y-%m-%d')
+    if not os.path.exists(HISTORY_FILE):
+        seed_history(closed_before)
+    last = last_history_date()
+    if last:
+        day = datetime.fromisoformat(last).date() + timedelta(days=1)
+    else:
+        first = idx.db.execute('SELECT MIN(hour) FROM hourly').fetchone()[0]
+        if first is None:
+            return 0
+        day = datetime.fromtimestamp(first * 3600, timezone.utc).date()
+    added = 0
+    with open(HISTORY_FILE, 'a') as f:
+        while day.isoformat() < closed_before:
+            f.write(json.dumps(day_report(idx, day.isoformat(), now)) + '\n')
+            day += timedelta(days=1)
+            added += 1
+    return added
+
+
+def main():
+    now = datetime.now(timezone.utc)
+    today = now.strftime('%Y-%m-%d')
+
+    idx = SessionIndex()
+    idx.update(log=print)
+    rpt = day_report(idx, today, now)
+
+    os.makedirs(COST_DIR, exist_ok=True)
+    with open(f'{COST_DIR}/api-costs-{today}.json', 'w') as f:
+        json.dump(rpt, f)
+    added = append_history(idx, now)
+    if added:
+        print(f'History: appended {added} closed day(s)')
+
+    subprocess.run([
+        'curl', '-s', '-X', 'POST',
+        'https://kande-mission-control-production.up.railway.app/api/sync/costs',
+        '-H', 'x-sync-key: kmc-sync-2026',
+        '-H', 'Content-Type: application/json',
+        '-d', json.dumps(rpt)
+    ], capture_output=True)
+
+    print(f"Pushed: today=${rpt['total']:.2f}")
+
+
+# Guarded: the session index may parse in a process pool, whose workers re-import this module
+if __name__ == '__main__':
+    main()
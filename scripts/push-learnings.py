@@ -7,11 +7,27 @@ Reads:
   - feedback/lessons.md                   (if present — per-agent lessons in markdown)
   - feedback/feedback-log.jsonl           (if present — structured {agent, type, text} entries)
 
-Posts merged, deduplicated result to API. Safe to run multiple times (idempotent).
+Only what changed since the last run is parsed and sent:
+  - feedback-log.jsonl is append-only: a byte offset (plus a hash of the
+    bytes just before it, to notice a rewrite) marks where parsing resumes
+  - the markdown files are split at headings and only sections whose hash
+    is new are parsed
+  - every item already sent is remembered by a hash of its normalized text,
+    so re-worded whitespace/case/punctuation doesn't re-send it
+New items go to POST /api/team/learnings/delta, chunked well under the
+route's 500 KB body cap, instead of the whole merged state. State lives in
+logs/push-learnings-state.json and only advances once the server accepts.
+If the server's state changed underneath (409: restored DB, full push) the
+sources are re-read from zero and re-sent; the server dedupes. Servers
+without the delta route get the old fetch-merge-post of the full state.
+Safe to run multiple times (idempotent).
+
+Usage: python3 push-learnings.py [--full]    # --full: legacy whole-state push
 
 Cron: push-learnings (10:30 AM + 9:30 PM daily)
 """
 
+import hashlib
 import json
 import os
 import re
@@ -27,6 +43,10 @@ BASE  = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # /Users/ku
 LEARNINGS_MD   = os.path.join(BASE, 'agent-output', 'shared', 'learnings.md')
 LESSONS_MD     = os.path.join(BASE, 'feedback', 'lessons.md')
 FEEDBACK_JSONL = os.path.join(BASE, 'feedback', 'feedback-log.jsonl')
+STATE_FILE     = os.path.join(BASE, 'logs', 'push-learnings-state.json')
+
+MAX_DELTA_BYTES = 256 * 1024   # per POST; the delta route caps bodies at 500 KB
+TAIL_BYTES      = 4096         # bytes before a stored offset that must still hash the same
 
 KNOWN_AGENTS = {'scout', 'relay', 'ralph', 'mary', 'shared'}
 
@@ -68,17 +88,18 @@ def read_file(path):
         return f.read()
 
 
-def parse_feedback_jsonl(path):
+def parse_feedback_jsonl(path, content=None, first_line=1):
     """
-    Parse feedback-log.jsonl.
+    Parse feedback-log.jsonl (or just the new lines of it, passed as content).
     Each line: {"agent": "ralph", "type": "mistake"|"learning", "text": "..."}
     Returns dict: { agent_name -> [{text, type}] }
     """
     result = {}
-    content = read_file(path)
+    if content is None:
+        content = read_file(path)
     if not content:
         return result
-    for i, line in enumerate(content.splitlines(), 1):
+    for i, line in enumerate(content.splitlines(), first_line):
         line = line.strip()
         if not line:
             continue
@@ -203,13 +224,236 @@ def ensure_shared(state):
     return shared
 
 
-# ── Main ──────────────────────────────────────────────────────────────────────
+# ── Incremental state ─────────────────────────────────────────────────────────
 
-def main():
-    now = datetime.now(timezone.utc)
-    print(f"📚 Push Learnings  [{now.strftime('%Y-%m-%dT%H:%M:%SZ')}]")
-    print(f"   Base directory: {BASE}")
+def load_state():
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    return {
+        'rev': state.get('rev', 0),
+        'sources': state.get('sources', {}),
+        'seen': {bucket: set(keys) for bucket, keys in state.get('seen', {}).items()},
+    }
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp = STATE_FILE + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'rev': state['rev'], 'sources': state['sources'],
+                   'seen': {b: sorted(keys) for b, keys in state['seen'].items()}}, f)
+    os.replace(tmp, STATE_FILE)
+
+
+def text_key(text):
+    """Hash of the text with case, whitespace and punctuation normalized away (matches the server)."""
+    norm = ' '.join(re.sub(r'[^a-z0-9]+', ' ', text.lower()).split())
+    return hashlib.sha1(norm.encode('utf-8')).hexdigest()[:16]
+
+
+def _stat_key(st):
+    return {'inode': st.st_ino, 'size': st.st_size, 'mtime': st.st_mtime}
+
+
+def _unchanged(src, st):
+    return src.get('inode') == st.st_ino and src.get('size') == st.st_size and src.get('mtime') == st.st_mtime
+
+
+def _tail_hash(f, offset):
+    start = max(0, offset - TAIL_BYTES)
+    f.seek(start)
+    return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+
+def scan_appended(path, src):
+    """
+    New complete lines of an append-only file since src's offset.
+    Returns (text or None if unchanged, first line number, new src). A file
+    that was replaced, shrunk or edited before the offset is read from zero.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None, 1, {}
+    if _unchanged(src, st):
+        return None, 1, src
+    offset, line = src.get('offset', 0), src.get('line', 1)
+    with open(path, 'rb') as f:
+        if not (src.get('inode') == st.st_ino and 0 < offset <= st.st_size
+                and _tail_hash(f, offset) == src.get('tail')):
+            offset, line = 0, 1
+        f.seek(offset)
+        data = f.read()
+        data = data[:data.rfind(b'\n') + 1]   # whole lines only; a half-written one waits
+        end = offset + len(data)
+        tail = _tail_hash(f, end)
+    new_src = dict(_stat_key(st), offset=end, line=line + data.count(b'\n'), tail=tail)
+    return data.decode('utf-8', errors='replace'), line, new_src
+
+
+def scan_sections(path, src):
+    """
+    Sections (split at #/##/### headings) of a markdown file whose content is
+    new since the last run. Returns (changed sections or None if the file is
+    untouched, total chars, new src).
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None, 0, {}
+    if _unchanged(src, st):
+        return None, src.get('chars', 0), src
+    md = read_file(path) or ''
+    sections = re.split(r'(?m)^(?=#{1,3}\s)', md)
+    hashes = [hashlib.sha1(sec.encode('utf-8')).hexdigest()[:16] for sec in sections]
+    known = set(src.get('sections', ()))
+    changed = [sec for sec, h in zip(sections, hashes) if h not in known]
+    return changed, len(md), dict(_stat_key(st), sections=sorted(set(hashes)), chars=len(md))
+
+
+def collect(state, now):
+    """
+    Parse only new/changed source content and drop anything already sent
+    (or already picked up this run). Nothing is marked sent here.
+    Returns (agents {agent: [items]}, patterns [text], shared_meta or None, new sources).
+    """
+    sources = state['sources']
+    picked = {bucket: set(keys) for bucket, keys in state['seen'].items()}
+    new_sources = {}
+    agents, patterns, shared_meta = {}, [], None
+
+    def add_items(data):
+        for agent, items in data.items():
+            bucket = picked.setdefault(f'agent:{agent}', set())
+            for item in items:
+                k = text_key(item['text'])
+                if k not in bucket:
+                    bucket.add(k)
+                    agents.setdefault(agent, []).append(item)
+
+    print("\n1️⃣  Reading feedback/feedback-log.jsonl...")
+    text, first_line, new_sources['feedback'] = scan_appended(FEEDBACK_JSONL, sources.get('feedback', {}))
+    if text is None:
+        print("   — Not found or unchanged since last run")
+    else:
+        if first_line == 1 and sources.get('feedback', {}).get('offset'):
+            print("   ↺ File was rewritten — re-reading from the start")
+        print(f"   ✅ {len(text.encode('utf-8')):,} new bytes from line {first_line}")
+        add_items(parse_feedback_jsonl(FEEDBACK_JSONL, text, first_line))
+
+    print("\n2️⃣  Reading feedback/lessons.md...")
+    changed, _, new_sources['lessons'] = scan_sections(LESSONS_MD, sources.get('lessons', {}))
+    if changed is None:
+        print("   — Not found or unchanged since last run")
+    else:
+        print(f"   ✅ {len(changed)} new/changed section(s)")
+        for section in changed:
+            add_items(parse_lessons_md(section))
+
+    print("\n3️⃣  Reading agent-output/shared/learnings.md...")
+    changed, chars, new_sources['learnings'] = scan_sections(LEARNINGS_MD, sources.get('learnings', {}))
+    if changed is None:
+        print("   — Not found or unchanged since last run")
+    else:
+        print(f"   ✅ {chars:,} chars, {len(changed)} new/changed section(s)")
+        shared_meta = {'learnings_md_chars': chars, 'learnings_md_updated': now.isoformat()}
+        bucket = picked.setdefault('patterns', set())
+        for section in changed:
+            for text in extract_patterns_from_markdown(section):
+                k = text_key(text)
+                if k not in bucket:
+                    bucket.add(k)
+                    patterns.append(text)
+
+    return agents, patterns, shared_meta, new_sources
+
+
+def delta_chunks(agents, patterns, shared_meta):
+    """Split the additions into delta bodies (minus base_rev) under MAX_DELTA_BYTES each; at least one."""
+    entries = [('agent', agent, item) for agent, items in agents.items() for item in items]
+    entries += [('pattern', None, text) for text in patterns]
+    chunk, size = {'agents': {}, 'patterns': [], 'shared_meta': shared_meta}, 0
+    for kind, agent, value in entries:
+        n = len(json.dumps(value, ensure_ascii=False).encode('utf-8')) + 8
+        if size and size + n > MAX_DELTA_BYTES:
+            yield chunk
+            chunk, size = {'agents': {}, 'patterns': []}, 0
+        if kind == 'agent':
+            chunk['agents'].setdefault(agent, []).append(value)
+        else:
+            chunk['patterns'].append(value)
+        size += n
+    yield chunk
+
+
+def mark_sent(state, chunk):
+    seen = state['seen']
+    for agent, items in chunk['agents'].items():
+        seen.setdefault(f'agent:{agent}', set()).update(text_key(i['text']) for i in items)
+    seen.setdefault('patterns', set()).update(text_key(t) for t in chunk['patterns'])
+
+
+def _http_body(e):
+    try:
+        return json.loads(e.read())
+    except (OSError, ValueError):
+        return {}
+
+
+def push_delta(state, now):
+    """
+    Send what's new. Returns 0/1, or None if the server has no delta route.
+    State is saved after every accepted chunk (rev + sent hashes); source
+    offsets only advance once everything has been sent.
+    """
+    for attempt in (1, 2):
+        agents, patterns, shared_meta, new_sources = collect(state, now)
+        total = sum(len(v) for v in agents.values()) + len(patterns)
+        if total or shared_meta:
+            print(f"\n4️⃣  Pushing {total} new item(s) to /api/team/learnings/delta...")
+        else:
+            # Still send an empty delta: it's how a replaced server state is noticed
+            print("\n4️⃣  Nothing new — checking the server is still at rev", state['rev'])
+        try:
+            for n, chunk in enumerate(delta_chunks(agents, patterns, shared_meta), 1):
+                result = api_post('/api/team/learnings/delta', dict(chunk, base_rev=state['rev']))
+                state['rev'] = result.get('rev', state['rev'])
+                mark_sent(state, chunk)
+                save_state(state)
+                sent = sum(len(v) for v in chunk['agents'].values()) + len(chunk['patterns'])
+                print(f"   ✅ Chunk {n}: {sent} sent, {result.get('added', 0)} new on server (rev {state['rev']})")
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            if e.code == 409 and attempt == 1:
+                rev = _http_body(e).get('rev', 0)
+                print(f"   ↺ Server learnings changed underneath (rev {rev}, ours {state['rev']}) — re-sending everything")
+                state.update(rev=rev, sources={}, seen={})
+                continue
+            print(f"   ❌ Push failed: {e}")
+            return 1
+        except urllib.error.URLError as e:
+            print(f"   ❌ Push failed: {e}")
+            return 1
+
+        state['sources'] = new_sources
+        save_state(state)
+        if not total and not shared_meta:
+            return 0
+        print(f"\n{'='*50}")
+        print(f"✅ push-learnings complete")
+        print(f"   New items pushed: {total}")
+        return 0
+    return 1
+
+
+# ── Main ──────────────────────────────────────────────────────────────────────
 
+def push_full(now):
+    """Legacy path: fetch the whole state, merge every source into it, post it all back."""
     # ── 1. Fetch current state ──────────────────────────────────────────────
     print("\n1️⃣  Fetching current teamLearnings from API...")
     try:
@@ -302,5 +546,17 @@ def main():
     return 0
 
 
+def main():
+    now = datetime.now(timezone.utc)
+    print(f"📚 Push Learnings  [{now.strftime('%Y-%m-%dT%H:%M:%SZ')}]")
+    print(f"   Base directory: {BASE}")
+
+    if '--full' not in sys.argv[1:]:
+        result = push_delta(load_state(), now)
+        if result is not None:
+            return result
+        print("   ⚠️  Server has no delta route — falling back to a full push")
+    return push_full(now)
+
 if __name__ == '__main__':
     sys.exit(main())
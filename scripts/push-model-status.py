@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
-"""push-model-status.py — Scan session files, extract model+cost per cron agent, push to VendTech API."""
-import glob, json, os, sys
+"""push-model-status.py — Read model+cost per cron agent from the session index, push to VendTech API."""
+import json, sys
 from datetime import datetime, timedelta, timezone
 
-SESSIONS_DIR = os.path.expanduser('~/.openclaw/agents/main/sessions/')
+sys.path.insert(0, '/Users/kurtishon/clawd/scripts')
+from session_index import SessionIndex
+
 API_URL = 'https://vend.kandedash.com/api/agents/model-sync'
 HOURS = 24
 
@@ -32,56 +34,14 @@ def scan_sessions():
     cutoff = datetime.now(timezone.utc) - timedelta(hours=HOURS)
     jobs = {}  # job_name -> {model, cost, lastRun, tier}
 
-    for fpath in sorted(glob.glob(SESSIONS_DIR + '*.jsonl'), key=os.path.getmtime, reverse=True)[:200]:
-        try:
-            mtime = datetime.fromtimestamp(os.path.getmtime(fpath), timezone.utc)
-            if mtime < cutoff:
-                continue
-        except:
-            continue
-
-        model_id = None
-        job_name = None
-        total_cost = 0.0
-        last_ts = None
-
-        try:
-            with open(fpath) as fh:
-                for line in fh:
-                    line = line.strip()
-                    if not line: continue
-                    try:
-                        obj = json.loads(line)
-                    except:
-                        continue
-
-                    ts = obj.get('timestamp')
-                    if ts:
-                        last_ts = ts
-
-                    if obj.get('type') == 'model_change':
-                        model_id = obj.get('modelId', model_id)
-
-                    if obj.get('type') == 'message':
-                        msg = obj.get('message', {})
-                        # Extract job name from first user message
-                        if msg.get('role') == 'user' and not job_name:
-                            content = msg.get('content', '')
-                            if isinstance(content, list):
-                                content = content[0].get('text', '') if content else ''
-                            if content.startswith('[cron:'):
-                                parts = content.split(']')
-                                if len(parts) >= 2:
-                                    job_name = parts[0].split()[-1] if ' ' in parts[0] else parts[0].split(':')[-1]
-
-                        # Extract cost
-                        usage = msg.get('usage', {})
-                        if usage and isinstance(usage, dict) and 'cost' in usage:
-                            c = usage['cost']
-                            if isinstance(c, dict):
-                                total_cost += c.get('total', 0)
-        except:
-            continue
+    idx = SessionIndex()
+    idx.update()
+    for row in idx.files(min_mtime=cutoff.timestamp(), limit=200):
+        mtime = datetime.fromtimestamp(row['mtime'], timezone.utc)
+        model_id = row['model_id']
+        job_name = row['job']
+        total_cost = row['total_cost']
+        last_ts = row['last_ts']
 
         if not job_name:
             continue
@@ -2,14 +2,19 @@
 """
 scout-maps-rotate.py
 Runs a batch of Google Maps category searches against the VendTech maps/discover API.
-Rotates through the full category list automatically using a state file.
-Each run covers 3 category groups. At 6 runs/day, full cycle takes ~4 days.
+Each run covers 3 category groups, chosen by a yield-aware bandit (scout_bandit.py)
+from found / new / rejected history kept per group in the state file — groups
+that stopped producing new leads run less often, with an exploration floor so
+every group still gets revisited.
 
 Usage: python3 scout-maps-rotate.py [--dry-run]
 """
 
 import json, sys, urllib.request, datetime, os
 
+sys.path.insert(0, "/Users/kurtishon/clawd/scripts")
+from scout_bandit import BanditScheduler, arm_ids
+
 STATE_FILE  = "/Users/kurtishon/clawd/logs/scout-rotate-state.json"
 OUTPUT_DIR  = "/Users/kurtishon/clawd/agent-output/scout"
 CRM_BASE    = "https://vend.kandedash.com"
@@ -107,7 +112,7 @@ def load_state():
     try:
         return json.load(open(STATE_FILE))
     except:
-        return {"index": 0, "total_runs": 0, "total_new": 0}
+        return {"total_runs": 0, "total_new": 0, "arms": {}}
 
 def save_state(state):
     os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
@@ -126,12 +131,11 @@ def main():
     today   = datetime.date.today().isoformat()
     now     = datetime.datetime.now().strftime("%H:%M")
 
-    # Pick next batch of category groups
-    start_idx = state["index"]
-    batch     = []
-    for i in range(BATCH_SIZE):
-        idx = (start_idx + i) % len(CATEGORY_GROUPS)
-        batch.append((idx, CATEGORY_GROUPS[idx]))
+    # Pick next batch of category groups by expected new leads per API call
+    ids   = arm_ids(CATEGORY_GROUPS)
+    sched = BanditScheduler(state.setdefault("arms", {}))
+    picks = sched.pick(ids, BATCH_SIZE)
+    batch = [(ids.index(arm), CATEGORY_GROUPS[ids.index(arm)]) for arm in picks]
 
     print(f"\n🗺️  Scout Maps Rotate — {today} {now}")
     print(f"   Batch: groups {[b[0] for b in batch]} of {len(CATEGORY_GROUPS)} total")
@@ -189,13 +193,14 @@ def main():
             total_new   += added
             total_found += found
             results.append({"group": group["name"], "new": added, "found": found})
+            # One maps/discover search per category
+            sched.record(ids[idx], found=found, new=added, rejected=rejected, cost=len(cats))
         except Exception as e:
             print(f"     ⚠️ Error: {e}")
             results.append({"group": group["name"], "error": str(e)})
 
     # Update state
-    next_idx = (start_idx + BATCH_SIZE) % len(CATEGORY_GROUPS)
-    state["index"]      = next_idx
+    state.pop("index", None)  # round-robin cursor from before the bandit
     state["total_runs"] += 1
     state["total_new"]  += total_new
     state["last_run"]   = f"{today} {now}"
@@ -212,7 +217,7 @@ def main():
         f.write(f"- **Total new this run: {total_new}**\n")
 
     print(f"\n✅ Done. {total_new} new leads added this run.")
-    print(f"   Next run starts at group index {next_idx} ({CATEGORY_GROUPS[next_idx]['name']})")
+    print(f"   Yield: {sched.report(ids, top=3)}")
     print(f"   Total new leads all-time: {state['total_new']}")
 
     # Exit code: 0 if new leads found (cron agent should report), 1 if nothing new
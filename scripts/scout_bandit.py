@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+scout_bandit.py — Yield-aware scheduling for scout search rotations.
+
+Replaces round-robin over CATEGORY_GROUPS (scout-maps-rotate.py) and
+SEARCH_QUERIES (glm-scout.py) with a multi-armed bandit. Every group/query is
+an arm; each run records found / new / rejected counts and the cost spent
+(API calls, plus GLM minutes where the scout uses GLM) into the caller's state
+file under state["arms"].
+
+Picking a batch:
+  - Thompson sampling on a Gamma-Poisson model of new leads per unit cost, so
+    productive arms run more often while uncertain ones still get tried.
+  - Evidence decays with a HALF_LIFE_DAYS half-life: a group that saturated
+    months ago isn't written off forever, and a group that just saturated stops
+    looking good quickly.
+  - Exploration floor: each slot has an EXPLORE chance of going to the arm
+    that has waited longest (never-run arms first), and any arm idle longer
+    than MAX_IDLE_DAYS is forced in — nothing starves.
+
+Usage:
+    sched = BanditScheduler(state.setdefault("arms", {}))
+    picks = sched.pick(arm_ids, k=3)
+    sched.record(arm, found=12, new=2, rejected=1, cost=4)
+    print(sched.report())
+"""
+
+import random, time
+
+HALF_LIFE_DAYS = 21
+EXPLORE        = 0.15
+MAX_IDLE_DAYS  = 30
+PRIOR_NEW      = 1.0    # pseudo-count of new leads ...
+PRIOR_COST     = 2.0    # ... per this much cost — optimistic for untried arms
+GLM_MIN_COST   = 1.0    # one GLM minute costs as much as one API call
+
+
+def arm_ids(items, key="name"):
+    """Stable arm id per item; repeated names get an '#n' suffix so their stats stay separate."""
+    ids, seen = [], {}
+    for item in items:
+        base = item[key] if isinstance(item, dict) else str(item)
+        n = seen.get(base, 0)
+        seen[base] = n + 1
+        ids.append(base if n == 0 else f"{base}#{n + 1}")
+    return ids
+
+
+def run_cost(api_calls, glm_seconds=0.0):
+    return api_calls + GLM_MIN_COST * glm_seconds / 60.0
+
+
+class BanditScheduler:
+    def __init__(self, arms, rng=None, now=None):
+        self.arms = arms              # the state-file dict, mutated in place
+        self.rng = rng or random.Random()
+        self.now = now or time.time()
+
+    def _arm(self, arm):
+        return self.arms.setdefault(arm, {
+            "pulls": 0, "found": 0, "new": 0, "rejected": 0, "cost": 0.0,
+            "d_new": 0.0, "d_cost": 0.0, "updated": self.now, "last_pulled": 0,
+        })
+
+    def _decayed(self, a):
+        f = 0.5 ** (max(0.0, self.now - a.get("updated", self.now)) / 86400 / HALF_LIFE_DAYS)
+        return a.get("d_new", 0.0) * f, a.get("d_cost", 0.0) * f
+
+    def sample(self, arm):
+        """Draw a plausible new-leads-per-cost rate for this arm."""
+        d_new, d_cost = self._decayed(self.arms.get(arm, {}))
+        return self.rng.gammavariate(PRIOR_NEW + d_new, 1.0) / (PRIOR_COST + d_cost)
+
+    def expected(self, arm):
+        d_new, d_cost = self._decayed(self.arms.get(arm, {}))
+        return (PRIOR_NEW + d_new) / (PRIOR_COST + d_cost)
+
+    def pick(self, arms, k):
+        """Choose k distinct arms from the candidate ids."""
+        pool = list(dict.fromkeys(arms))
+        k = min(k, len(pool))
+
+        def idle_s(arm):
+            return self.now - self.arms.get(arm, {}).get("last_pulled", 0)
+
+        chosen = [a for a in sorted(pool, key=idle_s, reverse=True)
+                  if idle_s(a) > MAX_IDLE_DAYS * 86400][:k]
+        while len(chosen) < k:
+            rest = [a for a in pool if a not in chosen]
+            if self.rng.random() < EXPLORE:
+                chosen.append(max(rest, key=idle_s))
+            else:
+                chosen.append(max(rest, key=self.sample))
+        return chosen
+
+    def record(self, arm, found=0, new=0, rejected=0, cost=1.0):
+        a = self._arm(arm)
+        d_new, d_cost = self._decayed(a)
+        a["pulls"] += 1
+        a["found"] += found
+        a["new"] += new
+        a["rejected"] += rejected
+        a["cost"] = round(a["cost"] + cost, 3)
+        a["d_new"] = round(d_new + new, 4)
+        a["d_cost"] = round(d_cost + cost, 4)
+        a["updated"] = self.now
+        a["last_pulled"] = self.now
+
+    def report(self, arms=None, top=5):
+        """One-line summary: best and worst arms by current expected yield."""
+        ids = [a for a in (arms or self.arms) if a in self.arms]
+        if not ids:
+            return "no arm history yet"
+        ranked = sorted(ids, key=self.expected, reverse=True)
+        fmt = lambda a: f"{a} {self.expected(a):.2f}"
+        total_new = sum(self.arms[a]["new"] for a in ids)
+        total_cost = sum(self.arms[a]["cost"] for a in ids)
+        return (f"{total_new} new / {total_cost:.0f} cost over {len(ids)} arms "
+                f"({total_new / max(1e-9, total_cost):.3f} per unit) | "
+                f"best: {', '.join(map(fmt, ranked[:top]))} | "
+                f"worst: {', '.join(map(fmt, ranked[-top:]))}")
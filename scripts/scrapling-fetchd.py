@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+scrapling-fetchd.py — Long-lived warm-browser fetch service for scrapling-scout.
+
+Keeps a small pool of StealthyFetcher browser sessions open and serves fetch
+requests over a local socket, so each target pays page-load time only instead of
+uv env resolution + interpreter start + cold browser launch.
+
+Protocol (one JSON object per line, 127.0.0.1:52790):
+  → {"url": "https://...", "timeout": 45}
+  ← {"ok": true, "status": 200, "text": "...", "timing": {"queue_ms", "launch_ms", "fetch_ms", "extract_ms", "total_ms"}}
+  ← {"ok": false, "status": 403, "error": "SCRAPLING_BLOCKED:403", "timing": {...}}
+  → {"op": "stats"}   ← pool size, fetch count, uptime
+
+Each worker thread owns its browser session (Playwright sync objects are
+thread-bound). Sessions are recycled every RECYCLE_AFTER fetches or after an
+error. The service exits on its own after IDLE_EXIT seconds without requests.
+
+Run (scrapling-scout.py spawns this automatically if it isn't up):
+  uv run --python 3.12 --with "scrapling[all]" --with curl_cffi python3 scrapling-fetchd.py
+"""
+
+import json, os, sys, time, queue, threading, datetime, socketserver
+from pathlib import Path
+
+HOST          = "127.0.0.1"
+PORT          = 52790
+POOL_SIZE     = int(os.environ.get("FETCHD_POOL", "2"))
+RECYCLE_AFTER = 25      # fetches per browser session before relaunch
+IDLE_EXIT     = 1800    # seconds without a request before shutting down
+MAX_CHARS     = 12000
+LOG           = Path("/Users/kurtishon/clawd/logs/scrapling-fetchd.log")
+
+
+def log(msg):
+    ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    line = f"[{ts}] {msg}"
+    print(line, flush=True)
+    LOG.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOG, "a") as f:
+        f.write(line + "\n")
+
+
+# --- Browser sessions ---
+
+def open_session():
+    """Warm StealthySession if this scrapling has one, else None (per-fetch browser)."""
+    try:
+        from scrapling.fetchers import StealthySession
+    except ImportError:
+        return None
+    session = StealthySession(headless=True, network_idle=True)
+    session.__enter__()
+    return session
+
+
+def close_session(session):
+    if session is None:
+        return
+    try:
+        session.__exit__(None, None, None)
+    except Exception:
+        pass
+
+
+def fetch_page(session, url, timeout_ms):
+    if session is not None:
+        return session.fetch(url, network_idle=True, timeout=timeout_ms)
+    from scrapling.fetchers import StealthyFetcher
+    return StealthyFetcher.fetch(url, headless=True, network_idle=True, timeout=timeout_ms)
+
+
+# --- Worker pool ---
+
+class Job:
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.queued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+
+
+class Pool:
+    def __init__(self, size):
+        self.jobs = queue.Queue()
+        self.fetches = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.last_activity = time.time()
+        self.started = time.time()
+        self.lock = threading.Lock()
+        for wid in range(size):
+            threading.Thread(target=self._worker, args=(wid,), daemon=True).start()
+
+    def submit(self, url, timeout):
+        job = Job(url, timeout)
+        with self.lock:
+            self.in_flight += 1
+            self.last_activity = time.time()
+        self.jobs.put(job)
+        job.done.wait(timeout + 30)
+        with self.lock:
+            self.in_flight -= 1
+            self.last_activity = time.time()
+        return job.result or {"ok": False, "error": "FETCHD_TIMEOUT", "timing": {}}
+
+    def _worker(self, wid):
+        # Launch the browser up front so the first request is already warm
+        session, used, stale = None, 0, True
+        try:
+            session, stale = open_session(), False
+        except Exception as e:
+            log(f"w{wid} warm-up failed: {e}")
+        while True:
+            job = self.jobs.get()
+            t_start = time.perf_counter()
+            timing = {"queue_ms": round((t_start - job.queued_at) * 1000)}
+            try:
+                if stale or used >= RECYCLE_AFTER:
+                    close_session(session)
+                    t0 = time.perf_counter()
+                    session, used, stale = open_session(), 0, False
+                    timing["launch_ms"] = round((time.perf_counter() - t0) * 1000)
+                t0 = time.perf_counter()
+                page = fetch_page(session, job.url, job.timeout * 1000)
+                timing["fetch_ms"] = round((time.perf_counter() - t0) * 1000)
+                used += 1
+                status = page.status if page else None
+                if page and status == 200:
+                    t0 = time.perf_counter()
+                    text = page.get_all_text()[:MAX_CHARS]
+                    timing["extract_ms"] = round((time.perf_counter() - t0) * 1000)
+                    result = {"ok": True, "status": status, "text": text}
+                else:
+                    result = {"ok": False, "status": status,
+                              "error": "SCRAPLING_BLOCKED:" + str(status or "no_response")}
+            except Exception as e:
+                # Browser may be wedged — drop it and relaunch on the next job
+                close_session(session)
+                session, stale = None, True
+                result = {"ok": False, "error": f"SCRAPLING_ERROR:{e}"}
+            timing["total_ms"] = round((time.perf_counter() - job.queued_at) * 1000)
+            result["timing"] = timing
+            with self.lock:
+                self.fetches += 1
+                if not result["ok"]:
+                    self.errors += 1
+            log(f"w{wid} {'OK ' if result['ok'] else 'ERR'} {job.url[:70]} {timing}")
+            job.result = result
+            job.done.set()
+
+    def stats(self):
+        return {"ok": True, "pool": POOL_SIZE, "fetches": self.fetches, "errors": self.errors,
+                "in_flight": self.in_flight, "uptime_s": round(time.time() - self.started)}
+
+
+# --- Socket server ---
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            req = json.loads(self.rfile.readline() or b"{}")
+        except ValueError:
+            req = {}
+        if req.get("op") == "stats":
+            resp = self.server.pool.stats()
+        elif req.get("url"):
+            resp = self.server.pool.submit(req["url"], int(req.get("timeout", 45)))
+        else:
+            resp = {"ok": False, "error": "bad request"}
+        self.wfile.write((json.dumps(resp) + "\n").encode())
+
+
+class Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def idle_watchdog(server):
+    while True:
+        time.sleep(60)
+        pool = server.pool
+        if pool.in_flight == 0 and time.time() - pool.last_activity > IDLE_EXIT:
+            log(f"Idle {IDLE_EXIT}s — shutting down")
+            server.shutdown()
+            return
+
+
+def main():
+    try:
+        server = Server((HOST, PORT), Handler)
+    except OSError as e:
+        print(f"fetchd already running on {HOST}:{PORT} ({e})")
+        return 0
+    server.pool = Pool(POOL_SIZE)
+    threading.Thread(target=idle_watchdog, args=(server,), daemon=True).start()
+    log(f"=== scrapling-fetchd listening on {HOST}:{PORT} (pool {POOL_SIZE}) ===")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
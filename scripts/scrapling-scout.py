@@ -5,17 +5,27 @@ scrapling-scout.py — Multi-source location scout for vending machine leads.
 apartments.com  → apartments-pp-cli (structured JSON, fast, no GLM extraction needed)
 Everything else → Scrapling (StealthyFetcher) + GLM extraction
 
-Fully self-contained — no external module dependencies.
+Local dependencies (same scripts dir): name_index.py (CRM dedup index),
+glm_client.py (streaming GLM client), glm_batch_qualify.py (batched + cached
+tier qualification), tier_classifier.py (local pre-classifier in front of GLM).
+Pages are hashed per target (logs/scrapling-scout-pages.json); GLM extraction
+only runs on text blocks that changed since the last visit.
 Feeds qualified leads into the discovery queue for Jordan.
 """
 
-import json, os, sys, datetime, re, time, subprocess, urllib.request, urllib.error
+import json, os, sys, datetime, re, time, socket, hashlib, subprocess, urllib.request, urllib.error
 from pathlib import Path
 
+sys.path.insert(0, "/Users/kurtishon/clawd/scripts")
+from name_index import load_index
+from glm_batch_qualify import qualify_batch, cache_key
+from glm_client import GLMClient
+
 # --- Config ---
 TODAY      = datetime.date.today().isoformat()
 LOG        = Path("/Users/kurtishon/clawd/logs/scrapling-scout.log")
 STATE_FILE = Path("/Users/kurtishon/clawd/logs/scrapling-scout-state.json")
+PAGE_CACHE = Path("/Users/kurtishon/clawd/logs/scrapling-scout-pages.json")
 QUEUE      = Path("/Users/kurtishon/clawd/agent-output/scout/glm-discovery-queue.jsonl")
 LOCK_FILE  = Path("/tmp/scrapling-scout.lock")
 CRM_KEY    = "kande2026"
@@ -23,6 +33,9 @@ CRM_BASE   = "https://vend.kandedash.com"
 PP_CLI     = Path("/Users/kurtishon/go/bin/apartments-pp-cli")
 GLM_URL    = "http://192.168.1.52:52415/v1/chat/completions"
 GLM_MODEL  = "local"
+UV         = "/opt/homebrew/bin/uv"
+FETCHD     = Path("/Users/kurtishon/clawd/scripts/scrapling-fetchd.py")
+FETCHD_ADDR = ("127.0.0.1", 52790)
 
 # --- apartments.com targets via pp-cli ---
 PP_CLI_TARGETS = [
@@ -145,6 +158,8 @@ def save_state(state):
 # --- CRM ---
 
 def get_existing_names():
+    """Name index over existing CRM leads (merged with the persisted index)."""
+    leads = None
     try:
         req = urllib.request.Request(
             f"{CRM_BASE}/api/prospects?limit=1000",
@@ -154,10 +169,9 @@ def get_existing_names():
             leads = json.loads(r.read())
             if isinstance(leads, dict):
                 leads = leads.get("data", [])
-            return {normalize(l.get("name", "")) for l in leads}
     except Exception as e:
-        log(f"CRM fetch error: {e}")
-        return set()
+        log(f"CRM fetch error: {e} — using persisted name index")
+    return load_index(leads)
 
 def normalize(name):
     return re.sub(r'\s+', ' ', (name or "").lower().strip())
@@ -165,28 +179,7 @@ def normalize(name):
 
 # --- GLM ---
 
-def glm_call(prompt, max_tokens=800, temperature=0.1, timeout=90):
-    payload = json.dumps({
-        "model": GLM_MODEL,
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": max_tokens,
-        "temperature": temperature,
-    }).encode()
-    for attempt in range(3):
-        try:
-            req = urllib.request.Request(
-                GLM_URL, data=payload,
-                headers={"Content-Type": "application/json"},
-                method="POST"
-            )
-            with urllib.request.urlopen(req, timeout=timeout) as r:
-                data = json.loads(r.read())
-                return data["choices"][0]["message"]["content"].strip()
-        except Exception as e:
-            log(f"  GLM attempt {attempt+1} error: {e}")
-            if attempt < 2:
-                time.sleep(15)
-    return None
+glm = GLMClient(GLM_URL, GLM_MODEL, caller="scrapling-scout")
 
 
 # --- pp-cli ---
@@ -212,7 +205,52 @@ def pp_cli_fetch(city, state):
 
 # --- Scrapling ---
 
+def fetchd_fetch(url, timeout=45):
+    """
+    Fetch via the warm scrapling-fetchd.py service.
+    Returns the response dict, or None if the service isn't listening.
+    """
+    try:
+        with socket.create_connection(FETCHD_ADDR, timeout=2) as s:
+            s.settimeout(timeout + 30)
+            s.sendall((json.dumps({"url": url, "timeout": timeout}) + "\n").encode())
+            line = s.makefile("rb").readline()
+    except OSError:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        return {"ok": False, "error": f"bad fetchd reply: {line[:100]!r}"}
+
+
+def start_fetchd():
+    """Launch scrapling-fetchd.py detached so later fetches find a warm browser."""
+    try:
+        subprocess.Popen(
+            [UV, "run", "--python", "3.12", "--with", "scrapling[all]", "--with", "curl_cffi",
+             "python3", str(FETCHD)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+        log("  Started scrapling-fetchd in background")
+    except Exception as e:
+        log(f"  Could not start scrapling-fetchd: {e}")
+
+
 def scrapling_fetch(url, timeout=45):
+    """Warm fetch service first; cold one-shot subprocess if it isn't running yet."""
+    resp = fetchd_fetch(url, timeout)
+    if resp is not None:
+        timing = resp.get("timing", {})
+        if resp.get("ok") and resp.get("text", "").strip():
+            log(f"  fetchd: {timing.get('total_ms', '?')}ms total, {timing.get('fetch_ms', '?')}ms page load")
+            return resp["text"].strip()
+        log(f"  Scrapling error: {str(resp.get('error'))[:200]} ({timing.get('total_ms', '?')}ms)")
+        return None
+    start_fetchd()
+    return scrapling_fetch_cold(url, timeout)
+
+
+def scrapling_fetch_cold(url, timeout=45):
     """Scrapling StealthyFetcher for non-apartments.com sources."""
     script = f"""
 import sys
@@ -230,7 +268,7 @@ except Exception as e:
 """
     try:
         result = subprocess.run(
-            ["/opt/homebrew/bin/uv", "run", "--python", "3.12",
+            [UV, "run", "--python", "3.12",
              "--with", "scrapling[all]", "--with", "curl_cffi", "python3", "-c", script],
             capture_output=True, text=True, timeout=timeout + 30
         )
@@ -248,59 +286,143 @@ except Exception as e:
 
 # --- GLM extraction + qualification ---
 
+EXTRACT_RULES = """Extract vending machine lead candidates from a webpage.
+Return up to 8 specific named locations in Las Vegas, Henderson, or North Las Vegas NV.
+Skip navigation, ads, and filter labels. Only real named properties/businesses.
+If nothing is found, return an empty array."""
+
+LEADS_SCHEMA = {
+    "type": "array",
+    "maxItems": 8,
+    "items": {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "address": {"type": "string"},
+            "type": {"enum": ["apartment", "office", "industrial", "medical", "senior_living", "other"]},
+        },
+        "required": ["name", "address", "type"],
+    },
+}
+
+
 def glm_extract_leads(text_content, context_hint, url):
-    prompt = f"""Extract vending machine lead candidates from this webpage.
-Context: {context_hint}
+    prompt = f"""Context: {context_hint}
 Source: {url}
 
 PAGE CONTENT:
-{text_content[:8000]}
+{text_content[:8000]}"""
 
-Return up to 8 specific named locations in Las Vegas, Henderson, or North Las Vegas NV.
-Skip navigation, ads, and filter labels. Only real named properties/businesses.
+    leads = glm.complete_json(prompt, schema=LEADS_SCHEMA, system=EXTRACT_RULES, max_tokens=800)
+    log(f"  GLM extract: {glm.describe_last()}")
+    return leads if isinstance(leads, list) else None  # None = GLM failed, [] = nothing on page
 
-JSON array only:
-[{{"name": "...", "address": "...", "type": "apartment|office|industrial|medical|senior_living|other"}}]
 
-If nothing found: []"""
+QUAL_RUBRIC = """Are these good vending machine locations in Las Vegas NV?
+HARD REQUIREMENT: 100+ people/day.
+Tiers: A (200+/day) B (100-200/day) C (50-100/day) D (disqualify)"""
 
-    reply = glm_call(prompt, max_tokens=800, temperature=0.1)
-    if not reply:
-        return []
-    try:
-        m = re.search(r'\[.*\]', reply, re.DOTALL)
-        if m:
-            return json.loads(m.group(0))
-    except Exception as e:
-        log(f"  JSON parse error: {e}")
-    return []
 
+def glm_qualify_batch(candidates, sources=None):
+    """Tier many {name, address, type} candidates in one prompt. Returns {cache_key: tier or None}."""
+    return qualify_batch(candidates, QUAL_RUBRIC, glm, log=log, sources=sources)
 
-def glm_qualify(name, address, type_hint):
-    reply = glm_call(
-        f"""Is this a good vending machine location in Las Vegas NV?
-Name: {name}
-Address: {address or 'Las Vegas area'}
-Type: {type_hint}
-HARD REQUIREMENT: 100+ people/day.
-Reply ONE letter: A (200+/day) B (100-200/day) C (50-100/day) D (disqualify)""",
-        max_tokens=5, temperature=0.1, timeout=60
-    )
-    if reply:
-        for tier in ["A", "B", "C", "D"]:
-            if reply.strip().upper().startswith(tier):
-                return tier
-    return "D"
+
+# --- Page change detection ---
+# Per target: normalized content hash, hashes of every text block already sent
+# through extraction, and the candidates extracted so far. Unchanged pages reuse
+# the stored candidates; changed pages only send their new blocks (with a line
+# of context either side) to GLM. Either way every known candidate is returned.
+
+EXTRACT_CHARS = 8000
+MAX_STORED_CANDIDATES = 40
+
+
+def load_page_cache():
+    try:
+        return json.loads(PAGE_CACHE.read_text())
+    except:
+        return {}
+
+def save_page_cache(cache):
+    PAGE_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = PAGE_CACHE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(cache))
+    os.replace(tmp, PAGE_CACHE)
+
+def page_blocks(text):
+    """Whitespace-normalized lines of page text, in page order. Only a line
+    repeating the one before it is dropped: a city or address line that recurs
+    across listings stays with each listing."""
+    blocks = []
+    for line in text.splitlines():
+        b = re.sub(r'\s+', ' ', line).strip()
+        if len(b) < 3 or (blocks and b.lower() == blocks[-1].lower()):
+            continue
+        blocks.append(b)
+    return blocks
+
+def block_hash(block):
+    return hashlib.sha1(block.lower().encode()).hexdigest()[:16]
+
+
+def extract_changed(label, content, context_hint, url):
+    """GLM extraction limited to text that wasn't on the page last visit."""
+    cache = load_page_cache()
+    prev = cache.get(label) or {}
+    blocks = page_blocks(content)
+    hashes = [block_hash(b) for b in blocks]
+    page_hash = hashlib.sha1("\n".join(hashes).encode()).hexdigest()
+
+    seen = set(prev.get("blocks", []))
+    stored = prev.get("candidates", [])
+    new = [i for i, h in enumerate(hashes) if h not in seen]
+    if page_hash == prev.get("hash") or not new:
+        log(f"  Unchanged since {prev.get('updated', '?')} — reusing {len(stored)} extracted candidates")
+        return stored
+
+    # New blocks plus one line of context either side (a listing's name or
+    # address line may be one already seen), as many as fit in one extraction;
+    # new blocks that don't fit stay "new" for next visit
+    wanted = sorted({j for i in new for j in (i - 1, i, i + 1) if 0 <= j < len(blocks)})
+    sent, size = [], 0
+    for j in wanted:
+        if size + len(blocks[j]) > EXTRACT_CHARS and sent:
+            break
+        sent.append(j)
+        size += len(blocks[j]) + 1
+    sent_new = {hashes[j] for j in sent} - seen
+    if prev:
+        log(f"  Changed: {len(new)}/{len(blocks)} new blocks, extracting {len(sent_new)} (+ context)")
+
+    candidates = glm_extract_leads("\n".join(blocks[j] for j in sent), context_hint, url)
+    if candidates is None:
+        return stored  # don't mark blocks seen — retry them next visit
+
+    fresh = {normalize(c.get("name")) for c in candidates}
+    kept = [c for c in stored if normalize(c.get("name")) not in fresh]
+    merged = (candidates + kept)[:MAX_STORED_CANDIDATES]
+    cache[label] = {
+        "url": url,
+        "hash": page_hash if sent_new >= {hashes[i] for i in new} else None,
+        "blocks": sorted((seen & set(hashes)) | sent_new),
+        "candidates": merged,
+        "updated": TODAY,
+    }
+    save_page_cache(cache)
+    return merged
 
 
 # --- Queue ---
 
-def queue_lead(name, address, tier, type_hint, source_url):
+def queue_lead(name, address, tier, type_hint, source_url, tier_source):
+    """tier_source: "glm", "local" (tier_classifier) or "rule" — only "glm" rows train the classifier."""
     try:
         QUEUE.parent.mkdir(parents=True, exist_ok=True)
         entry = {
             "name": name, "address": address or "Las Vegas, NV",
             "source": "scrapling-scout", "glm_tier": tier,
+            "tier_source": tier_source,
             "type": type_hint, "url": source_url, "added": TODAY,
         }
         with open(QUEUE, "a") as f:
@@ -326,15 +448,27 @@ def process_pp_cli(label, city, state, existing):
         if not name or len(name) < 4:
             continue
         name_norm = normalize(name)
-        if any(name_norm in ex or ex in name_norm for ex in existing if len(ex) > 5):
+        if existing.matches(name_norm):
             continue
-        if queue_lead(name, f"{city}, {state}", "B", "apartment", url):
+        if queue_lead(name, f"{city}, {state}", "B", "apartment", url, "rule"):
             log(f"  Queued Tier B: {name[:60]}")
             existing.add(name_norm)
             added += 1
     return added
 
 
+def handle_tier(name, address, tier, type_hint, url, existing, tier_source="glm"):
+    """Queue A/B leads, log the rest. Returns 1 if queued."""
+    if tier in ("A", "B"):
+        if queue_lead(name, address, tier, type_hint, url, tier_source):
+            log(f"  Queued Tier {tier}: {name[:50]}")
+            existing.add(normalize(name))
+            return 1
+    else:
+        log(f"  Tier {tier} skip: {name[:50]}")
+    return 0
+
+
 def process_scrapling(label, url, context_hint, existing):
     log(f"Scraping [{label}]: {url}")
     content = scrapling_fetch(url)
@@ -343,10 +477,11 @@ def process_scrapling(label, url, context_hint, existing):
         return 0
 
     log(f"  Got {len(content)} chars")
-    candidates = glm_extract_leads(content, context_hint, url)
-    log(f"  GLM extracted {len(candidates)} candidates")
+    candidates = extract_changed(label, content, context_hint, url)
+    log(f"  {len(candidates)} candidates to check")
 
     added = 0
+    needs_glm = []
     for c in candidates:
         name = (c.get("name") or "").strip()
         address = (c.get("address") or "").strip()
@@ -354,22 +489,24 @@ def process_scrapling(label, url, context_hint, existing):
         if not name or len(name) < 5:
             continue
         name_norm = normalize(name)
-        if any(name_norm in ex or ex in name_norm for ex in existing if len(ex) > 5):
+        if existing.matches(name_norm):
             log(f"  Already in CRM: {name[:50]}")
             continue
         if type_hint in ("apartment", "senior_living"):
-            tier = "B"
             log(f"  Auto-pass {type_hint}: {name[:50]}")
+            added += handle_tier(name, address, "B", type_hint, url, existing, "rule")
         else:
-            tier = glm_qualify(name, address, type_hint)
-            time.sleep(1)
-        if tier in ("A", "B"):
-            if queue_lead(name, address, tier, type_hint, url):
-                log(f"  Queued Tier {tier}: {name[:50]}")
-                existing.add(name_norm)
-                added += 1
-        else:
-            log(f"  Tier {tier} skip: {name[:50]}")
+            needs_glm.append({"name": name, "address": address, "type": type_hint})
+
+    if needs_glm:
+        sources = {}
+        tiers = glm_qualify_batch(needs_glm, sources)
+        for c in needs_glm:
+            if existing.matches(normalize(c["name"])):
+                continue  # queued earlier in this batch
+            key = cache_key(c["name"], c["address"], c["type"])
+            added += handle_tier(c["name"], c["address"], tiers.get(key) or "D", c["type"], url,
+                                 existing, sources.get(key, "glm"))
 
     time.sleep(3)
     return added
@@ -402,6 +539,7 @@ def main():
         state["total_added"] = state.get("total_added", 0) + added
         state["last_run"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
         save_state(state)
+        existing.save()
 
         log(f"Done. Added {added} leads this run (total: {state['total_added']})")
         sys.exit(0 if added > 0 else 1)
@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+"""
+session_index.py — Incremental index of OpenClaw session JSONL files.
+
+push-costs.py, extract-usage-turns.py and push-model-status.py used to glob
+~/.openclaw/agents/main/sessions/*.jsonl and re-parse every line of every file
+on every run. Long-lived Telegram group sessions only ever grow, so almost all
+of that work was repeated.
+
+This keeps a SQLite store (logs/session-index.db):
+
+  files     one row per session file: inode + byte offset already parsed, and
+            the session-level facts (start time, group, cron job, current
+            model, running cost, last timestamp)
+  messages  one row per assistant or cost-carrying message: timestamp, role,
+            provider, model, cost, tokens, group, job
+  hourly    rollup cube: per UTC hour x provider x model x group x job, the
+            assistant turns, billed messages, cost and tokens. Only hours that
+            received (or lost) rows are recomputed on each update, and
+            rollup() answers any window at hour / 2h / day / week granularity
+            without touching the raw sessions
+
+update() stats every file, and for each one that grew parses only the bytes
+after its stored offset (whole lines only — a half-written last line is left
+for the next run). Lines are pre-filtered on raw bytes, so the large
+tool-result lines that make up most of a session are never JSON-decoded;
+orjson is used when installed. A changed inode or a shrunk file is re-read
+from zero.
+Each file's new rows and its new offset commit in one transaction, so an
+interrupted run never double-counts. A cold start or a big backlog is parsed
+across a process pool; the parent stays the only database writer.
+
+Usage:
+    from session_index import SessionIndex
+    idx = SessionIndex()
+    idx.update()
+    for row in idx.messages(start_ms, end_ms, role="assistant"): ...
+
+CLI:
+    python3 session_index.py            # update and print a summary
+    python3 session_index.py --rebuild  # drop the index and re-read everything
+    python3 session_index.py --jobs 1   # force a serial scan (default: process pool when worth it)
+    python3 session_index.py rollup [--days 7] [--granularity hour|2h|day|week]
+                                    [--by provider,model,grp,job] [--tz -8]
+"""
+
+import json, mmap, os, re, sqlite3, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+try:
+    import orjson                      # optional, ~3-5x faster on big message lines
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+SESSIONS_DIR = Path('/Users/kurtishon/.openclaw/agents/main/sessions')
+INDEX_DB     = Path('/Users/kurtishon/clawd/logs/session-index.db')
+
+MMAP_MIN = 1 << 20     # map instead of read() when at least this many new bytes
+PARALLEL_MIN_BYTES = 32 << 20   # below this much new data a process pool costs more than it saves
+MAX_WORKERS = os.cpu_count() or 4
+REFRESH_FULL_HOURS = 2000       # more touched hours than this: rebuild the whole cube in one statement
+
+# A line is only decoded if it can matter. Short lines get one regex pass over
+# the raw bytes. Long lines (tool results, pasted content) are judged by the
+# message role in their first HEAD_BYTES — role is the first key of "message",
+# so a 200 KB toolResult line is rejected without scanning its body. Until the
+# session is classified any user message is a candidate; after that only user
+# messages that could still name the cron job.
+HEAD_BYTES = 512
+_ALWAYS = rb'"(?:assistant|cost|session|model_change)"'
+PREFILTER_UNCLASSIFIED = re.compile(rb'"(?:assistant|cost|session|model_change|user)"')
+PREFILTER_NO_JOB       = re.compile(_ALWAYS + rb'|\[cron:')
+PREFILTER              = re.compile(_ALWAYS)
+ROLE_RE                = re.compile(rb'"role":\s*"(\w+)"')
+CRON_NEEDLE            = b'[cron:'
+
+CHAT_ID_TO_GROUP = {
+    '-4992441037': 'VendTech Group',
+    '-5137874547': 'Photo Booths Group',
+    '-5208800550': 'Jumpgate Industries',
+    '882436227':   'Main (DM)',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path          TEXT PRIMARY KEY,
+    inode         INTEGER,
+    offset        INTEGER NOT NULL DEFAULT 0,
+    mtime         REAL,
+    session_ts_ms INTEGER,
+    classified    INTEGER NOT NULL DEFAULT 0,   -- first user message seen
+    grp           TEXT,
+    job           TEXT,
+    model_id      TEXT,                         -- latest model_change
+    total_cost    REAL NOT NULL DEFAULT 0,
+    last_ts                                     -- raw timestamp of the last record (ISO or epoch)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    path      TEXT NOT NULL,
+    ts_ms     INTEGER,              -- effective time (message, else session start, else mtime)
+    own_ts    INTEGER NOT NULL,     -- 1 if the message carried its own timestamp
+    role      TEXT,
+    provider  TEXT,
+    model     TEXT,
+    cost      REAL NOT NULL DEFAULT 0,
+    grp       TEXT,
+    job       TEXT,
+    tokens    INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS messages_ts ON messages (ts_ms);
+CREATE INDEX IF NOT EXISTS messages_path ON messages (path);
+CREATE TABLE IF NOT EXISTS hourly (             -- rollup cube, rebuilt per touched UTC hour
+    hour      INTEGER NOT NULL,                 -- epoch hours (ts_ms // 3600000)
+    provider  TEXT NOT NULL,
+    model     TEXT NOT NULL,
+    grp       TEXT NOT NULL,                    -- '' = unclassified
+    job       TEXT NOT NULL,                    -- '' = not a cron session
+    turns     INTEGER NOT NULL,                 -- assistant messages
+    billed    INTEGER NOT NULL,                 -- messages carrying a cost
+    cost      REAL NOT NULL,
+    tokens    INTEGER NOT NULL,
+    PRIMARY KEY (hour, provider, model, grp, job)
+);
+"""
+
+
+ROLLUP_KEYS = ('provider', 'model', 'grp', 'job')
+GRANULARITY_HOURS = {'hour': 1, '2h': 2, 'day': 24, 'week': 168}
+
+
+# ── Record helpers ────────────────────────────────────────────────────────────
+
+def to_epoch_ms(ts):
+    """Epoch ms from epoch s / epoch ms / ISO8601, or None."""
+    if isinstance(ts, bool):
+        return None
+    if isinstance(ts, (int, float)):
+        return int(ts if ts > 1e12 else ts * 1000)
+    if isinstance(ts, str) and ts:
+        try:
+            return int(datetime.fromisoformat(ts.replace('Z', '+00:00')).timestamp() * 1000)
+        except ValueError:
+            return None
+    return None
+
+
+def get_text_content(obj):
+    """Text of a message record (content is a str or a list of {type, text} parts)."""
+    content = obj.get('message', {}).get('content', '')
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return '\n'.join(item.get('text', '') for item in content
+                         if isinstance(item, dict) and item.get('type') == 'text')
+    return ''
+
+
+def classify_text(text):
+    """Telegram group / Cron Jobs / DM for a session, from its first user message."""
+    stripped = text.lstrip()
+    if any(stripped.startswith(p) for p in ('System:', '[cron:', '[Subagent Task]', '[Subagent Context]')):
+        return 'Cron Jobs'
+    # Cron completion notifications like "[Mon 2026-04-20 ...] A cron job..."
+    if re.search(r'\[(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)\s+\d{4}-\d{2}-\d{2}.*?\]\s+A cron job', text):
+        return 'Cron Jobs'
+    # conversation_label (new format) or [Telegram GroupName id:CHATID ...] (old)
+    m = (re.search(r'"conversation_label"\s*:\s*"[^"]*id:(-?\d+)"', text)
+         or re.search(r'\[Telegram\s+.*?\s+id:(-?\d+)\s+', text))
+    if m:
+        return CHAT_ID_TO_GROUP.get(m.group(1), f'Group {m.group(1)}')
+    if text.strip().startswith('Read HEARTBEAT.md'):
+        return 'Main (DM)'
+    m = re.search(r'"sender_id"\s*:\s*"(\d+)"', text)
+    if m:
+        return CHAT_ID_TO_GROUP.get(m.group(1), f'DM {m.group(1)}')
+    return None
+
+
+def job_from_text(text):
+    """Cron job name from a '[cron:<id> <name>] ...' user message, else None."""
+    if not text.startswith('[cron:'):
+        return None
+    head = text.split(']')[0]
+    return head.split()[-1] if ' ' in head else head.split(':')[-1]
+
+
+def message_tokens(msg):
+    usage = msg.get('usage')
+    if not isinstance(usage, dict):
+        return 0
+    total = usage.get('totalTokens')
+    if isinstance(total, (int, float)):
+        return int(total)
+    return int(sum(v for k in ('input', 'output', 'cacheRead', 'cacheWrite')
+                   if isinstance(v := usage.get(k), (int, float))))
+
+
+def message_cost(msg):
+    usage = msg.get('usage')
+    if isinstance(usage, dict):
+        c = usage.get('cost')
+        if isinstance(c, dict):
+            return c.get('total', 0) or 0
+    return 0
+
+
+# ── Per-file parser ───────────────────────────────────────────────────────────
+
+class FileState:
+    """Session-level facts carried across incremental reads of one file."""
+    FIELDS = ('session_ts_ms', 'classified', 'grp', 'job', 'model_id', 'total_cost', 'last_ts')
+
+    def __init__(self, row=None):
+        row = row or {}
+        self.session_ts_ms = row.get('session_ts_ms')
+        self.classified = row.get('classified', 0)
+        self.grp = row.get('grp')
+        self.job = row.get('job')
+        self.model_id = row.get('model_id')
+        self.total_cost = row.get('total_cost', 0) or 0
+        self.last_ts = row.get('last_ts')
+        self.backfill = False          # grp/job newly learned: earlier rows need them too
+
+    def as_dict(self):
+        return {f: getattr(self, f) for f in self.FIELDS}
+
+
+def parse_record(obj, st, mtime_ms, rows):
+    """Fold one decoded JSONL record into file state; append a message row if it's one we keep."""
+    ts = obj.get('timestamp')
+    if ts:
+        st.last_ts = ts
+    rtype = obj.get('type')
+    if rtype == 'session':
+        if st.session_ts_ms is None:
+            st.session_ts_ms = to_epoch_ms(ts)
+        return
+    if rtype == 'model_change':
+        st.model_id = obj.get('modelId', st.model_id)
+        return
+    if rtype != 'message':
+        return
+    msg = obj.get('message') or {}
+    role = msg.get('role')
+    if role == 'user':
+        if not st.classified or not st.job:
+            text = get_text_content(obj)
+            if not st.classified:
+                st.grp = classify_text(text)
+                st.classified = 1
+                st.backfill |= st.grp is not None
+            if not st.job:
+                st.job = job_from_text(text)
+                st.backfill |= st.job is not None
+    cost = message_cost(msg)
+    st.total_cost += cost
+    if role != 'assistant' and not cost:
+        return
+    own = to_epoch_ms(ts)
+    rows.append((own if own is not None else (st.session_ts_ms or mtime_ms), int(own is not None),
+                 role, msg.get('provider', ''), msg.get('model', ''), cost, st.grp, st.job,
+                 message_tokens(msg)))
+
+
+def is_candidate(buf, pos, nl, state):
+    """Byte-level prefilter for the line buf[pos:nl]."""
+    rx = (PREFILTER_UNCLASSIFIED if not state.classified
+          else PREFILTER_NO_JOB if not state.job else PREFILTER)
+    if nl - pos <= HEAD_BYTES * 8:
+        return rx.search(buf, pos, nl) is not None
+    m = ROLE_RE.search(buf, pos, pos + HEAD_BYTES)
+    if m is None:                       # unfamiliar layout: scan the whole line
+        return rx.search(buf, pos, nl) is not None
+    role = m.group(1)
+    if role == b'assistant':
+        return True
+    if role == b'user':
+        return not state.classified or (not state.job and buf.find(CRON_NEEDLE, pos, nl) != -1)
+    return False                        # only assistant messages carry usage
+
+
+def parse_file(path, offset, state, mtime_ms, counts=None):
+    """
+    Parse complete lines after offset. Returns (new_offset, state, rows).
+
+    Lines are located with find() on an mmap (or one read() for small tails)
+    and tested against the byte prefilter in place; only candidates are sliced
+    out and decoded. The final line is always decoded so last_ts stays exact.
+    """
+    rows = []
+    with open(path, 'rb') as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if size <= offset:
+            return offset, state, rows
+        if size - offset >= MMAP_MIN:
+            buf, start = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ), offset
+        else:
+            fh.seek(offset)
+            buf, start = fh.read(), 0
+    try:
+        end = buf.rfind(b'\n', start) + 1     # only whole lines; the tail may still be being written
+        if end <= start:
+            return offset, state, rows
+        last = max(start, buf.rfind(b'\n', start, end - 1) + 1)
+        lines = decoded = 0
+        pos = start
+        while pos < end:
+            nl = buf.find(b'\n', pos, end)
+            lines += 1
+            if pos == last or is_candidate(buf, pos, nl, state):
+                raw = buf[pos:nl].strip()
+                if raw:
+                    decoded += 1
+                    try:
+                        obj = _loads(raw)
+                    except ValueError:
+                        obj = None
+                    if isinstance(obj, dict):
+                        parse_record(obj, state, mtime_ms, rows)
+            pos = nl + 1
+    finally:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+    if counts is not None:
+        counts['lines'] = counts.get('lines', 0) + lines
+        counts['decoded'] = counts.get('decoded', 0) + decoded
+    return offset + end - start, state, rows
+
+
+def _parse_job(job):
+    """Process-pool entry point: parse one file's new bytes. Must stay picklable (top level)."""
+    path, inode, mtime, _size, offset, prev = job
+    counts = {}
+    try:
+        new_offset, state, rows = parse_file(path, offset, FileState(prev), int(mtime * 1000), counts)
+    except OSError:
+        return None
+    return path, inode, mtime, offset, new_offset, state, rows, counts
+
+
+# ── Index ─────────────────────────────────────────────────────────────────────
+
+class SessionIndex:
+    def __init__(self, db_path=INDEX_DB, sessions_dir=SESSIONS_DIR):
+        self.sessions_dir = Path(sessions_dir)
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(db_path), timeout=60, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        cols = {r[1] for r in self.db.execute('PRAGMA table_info(messages)')}
+        if cols and 'tokens' not in cols:   # index built before the rollup cube existed
+            self.db.execute('ALTER TABLE messages ADD COLUMN tokens INTEGER NOT NULL DEFAULT 0')
+        self.db.executescript(SCHEMA)
+        self._touched = set()
+        if (self.db.execute('SELECT 1 FROM messages LIMIT 1').fetchone()
+                and not self.db.execute('SELECT 1 FROM hourly LIMIT 1').fetchone()):
+            self._refresh_hours(None)
+
+    def _known(self):
+        return {r['path']: dict(r) for r in self.db.execute('SELECT * FROM files')}
+
+    def update(self, log=None, workers=None):
+        """
+        Bring the index up to date with the sessions directory. Returns stats.
+
+        One os.scandir pass collects size/inode/mtime for every file. Files
+        with new bytes are parsed in a process pool when there is enough work
+        (PARALLEL_MIN_BYTES across 2+ files); this process is the only SQLite
+        writer and commits each file's result as it arrives. workers=1 forces
+        a serial scan.
+        """
+        t0 = time.perf_counter()
+        known = self._known()
+        stats = {'files': 0, 'parsed': 0, 'reset': 0, 'bytes': 0, 'rows': 0, 'lines': 0, 'decoded': 0,
+                 'workers': 1}
+        on_disk = set()
+        jobs = []
+        with os.scandir(self.sessions_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.jsonl'):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                path = entry.path
+                on_disk.add(path)
+                stats['files'] += 1
+                prev = known.get(path)
+                offset = prev['offset'] if prev else 0
+                if prev and (prev['inode'] != st.st_ino or st.st_size < offset):
+                    offset, prev = 0, None      # replaced or truncated: start over
+                    stats['reset'] += 1
+                if prev and st.st_size == offset:
+                    if prev['mtime'] != st.st_mtime:
+                        self.db.execute('UPDATE files SET mtime = ? WHERE path = ?', (st.st_mtime, path))
+                    continue
+                jobs.append((path, st.st_ino, st.st_mtime, st.st_size, offset, prev))
+
+        pending = sum(size - offset for _, _, _, size, offset, _ in jobs)
+        workers = workers or min(MAX_WORKERS, len(jobs))
+        if workers > 1 and len(jobs) > 1 and pending >= PARALLEL_MIN_BYTES:
+            stats['workers'] = workers
+            jobs.sort(key=lambda j: j[4] - j[3])      # biggest first for better packing
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for result in pool.map(_parse_job, jobs, chunksize=1):
+                    self._merge(result, stats)
+        else:
+            for job in jobs:
+                self._merge(_parse_job(job), stats)
+
+        # Deleted sessions (cleanup-sessions.sh): forget the offset, keep message history
+        gone = set(known) - on_disk
+        if gone:
+            self.db.executemany('DELETE FROM files WHERE path = ?', [(p,) for p in gone])
+        touched, self._touched = self._touched, set()
+        self._refresh_hours(touched)
+        stats['hours'] = len(touched)
+        stats['seconds'] = round(time.perf_counter() - t0, 2)
+        if log:
+            log(f"session index: {stats['parsed']}/{stats['files']} files had new data, "
+                f"{stats['bytes'] / 1e6:.1f} MB scanned, {stats['decoded']}/{stats['lines']} lines decoded, "
+                f"{stats['rows']} rows, {stats['workers']} worker(s), {stats['seconds']}s")
+        return stats
+
+    def _merge(self, result, stats):
+        """Reduce step: fold one worker result into the store and the run stats."""
+        if result is None:
+            return
+        path, inode, mtime, offset, new_offset, state, rows, counts = result
+        self._commit_file(path, inode, mtime, offset, new_offset, state, rows)
+        stats['parsed'] += 1
+        stats['bytes'] += new_offset - offset
+        stats['rows'] += len(rows)
+        stats['lines'] += counts.get('lines', 0)
+        stats['decoded'] += counts.get('decoded', 0)
+
+    def _commit_file(self, path, inode, mtime, old_offset, new_offset, state, rows):
+        s = state.as_dict()
+        hour_sql = 'SELECT DISTINCT ts_ms / 3600000 FROM messages WHERE path = ?'
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            if old_offset == 0:
+                self._touched.update(h for (h,) in self.db.execute(hour_sql, (path,)))
+                self.db.execute('DELETE FROM messages WHERE path = ?', (path,))
+            self.db.executemany(
+                'INSERT INTO messages (path, ts_ms, own_ts, role, provider, model, cost, grp, job, tokens) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', [(path,) + r for r in rows])
+            self._touched.update(r[0] // 3600000 for r in rows)
+            if state.backfill:
+                # Rows written before the first (cron) user message was seen
+                self._touched.update(h for (h,) in self.db.execute(
+                    hour_sql + ' AND (grp IS NULL OR job IS NULL)', (path,)))
+                self.db.execute(
+                    'UPDATE messages SET grp = COALESCE(grp, ?), job = COALESCE(job, ?) '
+                    'WHERE path = ? AND (grp IS NULL OR job IS NULL)', (s['grp'], s['job'], path))
+            self.db.execute(
+                'INSERT OR REPLACE INTO files (path, inode, offset, mtime, session_ts_ms, classified, '
+                'grp, job, model_id, total_cost, last_ts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (path, inode, new_offset, mtime, s['session_ts_ms'], s['classified'], s['grp'],
+                 s['job'], s['model_id'], s['total_cost'], s['last_ts']))
+            self.db.execute('COMMIT')
+        except Exception:
+            self.db.execute('ROLLBACK')
+            raise
+
+    def rebuild(self):
+        self.db.execute('DELETE FROM messages')
+        self.db.execute('DELETE FROM files')
+        self.db.execute('DELETE FROM hourly')
+
+    def _refresh_hours(self, hours):
+        """Recompute cube rows for the given epoch hours from messages (None = everything)."""
+        select = ('INSERT INTO hourly SELECT ts_ms / 3600000, COALESCE(provider, \'\'), '
+                  'COALESCE(model, \'\'), COALESCE(grp, \'\'), COALESCE(job, \'\'), '
+                  'SUM(role = \'assistant\'), SUM(cost != 0), SUM(cost), SUM(tokens) FROM messages ')
+        group = ' GROUP BY 1, 2, 3, 4, 5'
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            if hours is None or len(hours) > REFRESH_FULL_HOURS:
+                self.db.execute('DELETE FROM hourly')
+                self.db.execute(select + 'WHERE ts_ms IS NOT NULL' + group)
+            else:
+                for h in hours:
+                    self.db.execute('DELETE FROM hourly WHERE hour = ?', (h,))
+                    self.db.execute(select + 'WHERE ts_ms >= ? AND ts_ms < ?' + group,
+                                    (h * 3600000, (h + 1) * 3600000))
+            self.db.execute('COMMIT')
+        except Exception:
+            self.db.execute('ROLLBACK')
+            raise
+
+    # ── Queries ───────────────────────────────────────────────────────────────
+
+    def messages(self, start_ms=None, end_ms=None, role=None, own_ts_only=False, with_cost=False):
+        """Message rows in [start_ms, end_ms)."""
+        sql, args = 'SELECT * FROM messages WHERE 1=1', []
+        if start_ms is not None:
+            sql += ' AND ts_ms >= ?'
+            args.append(start_ms)
+        if end_ms is not None:
+            sql += ' AND ts_ms < ?'
+            args.append(end_ms)
+        if role:
+            sql += ' AND role = ?'
+            args.append(role)
+        if own_ts_only:
+            sql += ' AND own_ts = 1'
+        if with_cost:
+            sql += ' AND cost != 0'
+        return self.db.execute(sql, args)
+
+    def files(self, min_mtime=None, limit=None):
+        """Session file rows, most recently modified first."""
+        sql, args = 'SELECT * FROM files', []
+        if min_mtime is not None:
+            sql += ' WHERE mtime >= ?'
+            args.append(min_mtime)
+        sql += ' ORDER BY mtime DESC'
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        return self.db.execute(sql, args)
+
+    def rollup(self, start_ms=None, end_ms=None, granularity='day', by=(), tz_offset=timedelta(0)):
+        """
+        Totals from the hourly cube for hours starting in [start_ms, end_ms).
+
+        Returns {(bucket, *by values): {'turns', 'billed', 'cost', 'tokens'}}
+        where bucket is a bucket_label() in tz_offset local time and by is
+        any subset of ROLLUP_KEYS. Never touches raw session files.
+        """
+        if granularity not in GRANULARITY_HOURS:
+            raise ValueError(f'granularity must be one of {", ".join(GRANULARITY_HOURS)}')
+        by = tuple(by)
+        bad = [k for k in by if k not in ROLLUP_KEYS]
+        if bad:
+            raise ValueError(f'cannot group by {bad}; choose from {ROLLUP_KEYS}')
+        cols = ''.join(f', {k}' for k in by)
+        sql = (f'SELECT hour{cols}, SUM(turns), SUM(billed), SUM(cost), SUM(tokens) '
+               'FROM hourly WHERE 1=1')
+        args = []
+        if start_ms is not None:
+            sql += ' AND hour >= ?'
+            args.append(-(-start_ms // 3600000))
+        if end_ms is not None:
+            sql += ' AND hour < ?'
+            args.append(-(-end_ms // 3600000))
+        out = {}
+        for row in self.db.execute(sql + f' GROUP BY hour{cols}', args):
+            key = (bucket_label(row[0], granularity, tz_offset),) + tuple(row[1:1 + len(by)])
+            turns, billed, cost, tokens = row[1 + len(by):]
+            acc = out.setdefault(key, {'turns': 0, 'billed': 0, 'cost': 0.0, 'tokens': 0})
+            acc['turns'] += turns
+            acc['billed'] += billed
+            acc['cost'] += cost
+            acc['tokens'] += tokens
+        return out
+
+
+def bucket_label(hour, granularity, tz_offset=timedelta(0)):
+    """Label of the bucket an epoch hour falls in, in local time (tz_offset from UTC)."""
+    local = datetime.fromtimestamp(hour * 3600, timezone.utc) + tz_offset
+    if granularity == 'hour':
+        return local.strftime('%Y-%m-%dT%H')
+    if granularity == '2h':
+        return local.strftime('%Y-%m-%dT') + f'{local.hour // 2 * 2:02d}'
+    if granularity == 'day':
+        return local.strftime('%Y-%m-%d')
+    if granularity == 'week':                      # Monday the week starts on
+        return (local - timedelta(days=local.weekday())).strftime('%Y-%m-%d')
+    raise ValueError(f'granularity must be one of {", ".join(GRANULARITY_HOURS)}')
+
+
+def main():
+    args = sys.argv[1:]
+
+    def opt(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    workers = opt('--jobs', None)
+    idx = SessionIndex()
+    if '--rebuild' in args:
+        idx.rebuild()
+    idx.update(log=print, workers=int(workers) if workers else None)
+    if args and args[0] == 'rollup':
+        days = float(opt('--days', 7))
+        by = [k for k in opt('--by', '').split(',') if k]
+        tz = timedelta(hours=float(opt('--tz', 0)))
+        start = int((datetime.now(timezone.utc) - timedelta(days=days)).timestamp() * 1000)
+        cube = idx.rollup(start, granularity=opt('--granularity', 'day'), by=by, tz_offset=tz)
+        for key, v in sorted(cube.items(), key=lambda kv: tuple(str(x) for x in kv[0])):
+            print(f"  {' | '.join(str(k) or '-' for k in key):60s} {v['turns']:6d} turns "
+                  f"{v['billed']:6d} billed  ${v['cost']:9.4f}  {v['tokens']:>12,d} tok")
+        return 0
+    day_ago = int((datetime.now(timezone.utc) - timedelta(days=1)).timestamp() * 1000)
+    n, cost = idx.db.execute('SELECT COUNT(*), COALESCE(SUM(cost), 0) FROM messages WHERE ts_ms >= ?',
+                             (day_ago,)).fetchone()
+    total = idx.db.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+    print(f'{total} indexed messages; last 24h: {n} messages, ${cost:.2f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+glm-scout.py: the batched GLM pass must queue A/B leads and credit the
+bandit arm of the query each candidate came from.
+
+Run: python3 -m pytest scripts/tests   (or python3 -m unittest discover scripts/tests)
+"""
+
+import importlib.util, sys, types, unittest
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS))
+try:
+    import job_lock  # noqa: F401  (lives outside the repo on the scout host)
+except ImportError:
+    sys.modules["job_lock"] = types.SimpleNamespace(acquire_job_lock=lambda name: None)
+
+spec = importlib.util.spec_from_file_location("glm_scout", SCRIPTS / "glm-scout.py")
+glm_scout = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(glm_scout)
+
+from name_index import NameIndex
+
+
+class JudgeGlmBatch(unittest.TestCase):
+    def setUp(self):
+        self.queued = []
+        patches = {
+            "log": lambda msg: None,
+            "queue_for_enrichment": lambda c, tier, source: self.queued.append((c["name"], tier, source)) or True,
+        }
+        for name, fn in patches.items():
+            self.addCleanup(setattr, glm_scout, name, getattr(glm_scout, name))
+            setattr(glm_scout, name, fn)
+
+    def test_bandit_query_candidates_update_yields(self):
+        base = "bowling alley Las Vegas Henderson NV"
+        arm_of = {f"{base} new": base}
+        yields = {base: {"found": 3, "new": 0, "rejected": 0, "glm": 3}}
+        needs_glm = [
+            {"name": "Strike Zone Lanes", "address": "1 Main St", "query": f"{base} new"},
+            {"name": "Tiny Pin Shop", "address": "2 Main St", "query": f"{base} new"},
+            {"name": "Sweep Find Gym", "address": "3 Main St", "query": "nearby sweep"},
+        ]
+        key = lambda c: glm_scout.cache_key(c["name"], c["address"])
+        tiers = {key(needs_glm[0]): "A", key(needs_glm[1]): "D", key(needs_glm[2]): "B"}
+        sources = {key(needs_glm[0]): "glm", key(needs_glm[1]): "glm", key(needs_glm[2]): "local"}
+
+        added = glm_scout.judge_glm_batch(needs_glm, tiers, sources, NameIndex(), yields, arm_of)
+
+        self.assertEqual(added, 2)
+        self.assertEqual(yields[base], {"found": 3, "new": 1, "rejected": 1, "glm": 3})
+        self.assertEqual(self.queued, [("Strike Zone Lanes", "A", "glm"), ("Sweep Find Gym", "B", "local")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+tier_classifier.py — Local A/B/C/D pre-classifier for scout candidates.
+
+A hashed n-gram linear model (multinomial logistic regression, pure Python,
+CPU only) trained offline on tiers GLM has already assigned:
+
+  - logs/glm-qual-cache.json          every batched GLM verdict (all tiers)
+  - glm-discovery-queue.jsonl         A/B candidates the scouts queued
+  - CRM prospects                     glm_tier on records imported from the queue
+
+Queue entries and CRM records carry tier_source ("glm", "local" or "rule");
+only "glm" rows are used. Local answers, hard-rule passes and auto-B listings
+are never trained on, so the model never learns from its own predictions.
+
+qualify_batch() asks this model first. Candidates it is confident about are
+resolved locally in microseconds; only the uncertain ones go to GLM.
+
+Usage:
+  python3 tier_classifier.py train [--no-crm]     # rebuild logs/tier-classifier.json
+  python3 tier_classifier.py stats                # LLM-avoided rate from scout runs
+  python3 tier_classifier.py "Name" "Address" [type]
+"""
+
+import json, math, os, re, sys, time, random, datetime, zlib
+from collections import Counter
+from pathlib import Path
+
+MODEL_FILE = Path("/Users/kurtishon/clawd/logs/tier-classifier.json")
+STATS_LOG  = Path("/Users/kurtishon/clawd/logs/tier-classifier-stats.jsonl")
+QUAL_CACHE = Path("/Users/kurtishon/clawd/logs/glm-qual-cache.json")
+QUEUE      = Path("/Users/kurtishon/clawd/agent-output/scout/glm-discovery-queue.jsonl")
+
+LABELS     = ("A", "B", "C", "D")
+N_BUCKETS  = 1 << 18
+CONFIDENCE = 0.90     # min probability to skip GLM
+MIN_TRAIN  = 200      # below this many labels the model never answers
+MIN_PRECISION = 0.90  # holdout precision at CONFIDENCE required to enable the model
+EPOCHS     = 12
+LR         = 0.3
+L2         = 1e-5
+
+
+# --- Features ---
+
+def _norm(s):
+    return re.sub(r'[^a-z0-9 ]', ' ', (s or "").lower())
+
+def features(name, address="", type_hint=""):
+    """Hashed feature ids: name words/bigrams/char-trigrams, type and address words."""
+    name = _norm(name)
+    words = name.split()
+    feats = [f"w:{w}" for w in words]
+    feats += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+    padded = f" {name.strip()} "
+    feats += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    if type_hint:
+        feats.append(f"t:{_norm(type_hint).strip()}")
+    feats += [f"a:{w}" for w in _norm(address).split() if not w.isdigit()]
+    feats.append("bias")
+    return sorted({zlib.crc32(f.encode()) % N_BUCKETS for f in feats})
+
+
+# --- Model ---
+
+class TierClassifier:
+    def __init__(self, weights=None, meta=None):
+        # weights: {bucket: [wA, wB, wC, wD]} — sparse, only buckets seen in training
+        self.weights = weights or {}
+        self.meta = meta or {}
+
+    @property
+    def enabled(self):
+        m = self.meta
+        return (m.get("n_train", 0) >= MIN_TRAIN
+                and m.get("holdout_precision", 0) >= MIN_PRECISION)
+
+    def proba(self, feats):
+        scores = [0.0] * len(LABELS)
+        for f in feats:
+            w = self.weights.get(f)
+            if w:
+                for k in range(len(LABELS)):
+                    scores[k] += w[k]
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        z = sum(exps)
+        return [e / z for e in exps]
+
+    def predict(self, name, address="", type_hint=""):
+        """(tier, probability). tier is None when not confident enough to skip GLM."""
+        if not self.enabled:
+            return None, 0.0
+        p = self.proba(features(name, address, type_hint))
+        k = max(range(len(LABELS)), key=p.__getitem__)
+        threshold = self.meta.get("confidence", CONFIDENCE)
+        return (LABELS[k] if p[k] >= threshold else None), p[k]
+
+    # --- Training ---
+
+    def fit(self, rows, epochs=EPOCHS, lr=LR, l2=L2, seed=7):
+        """rows: [(feats, label_index)]. Plain SGD on softmax cross-entropy."""
+        rng = random.Random(seed)
+        rows = list(rows)
+        W = self.weights
+        n = len(LABELS)
+        for epoch in range(epochs):
+            rng.shuffle(rows)
+            step = lr / (1 + epoch)
+            for feats, y in rows:
+                p = self.proba(feats)
+                for k in range(n):
+                    g = p[k] - (1.0 if k == y else 0.0)
+                    if g == 0.0:
+                        continue
+                    for f in feats:
+                        w = W.get(f)
+                        if w is None:
+                            w = W[f] = [0.0] * n
+                        w[k] -= step * (g + l2 * w[k])
+        return self
+
+    # --- Persistence ---
+
+    def save(self, path=MODEL_FILE):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "meta": self.meta,
+            "weights": {str(f): [round(x, 5) for x in w] for f, w in self.weights.items()},
+        }))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        try:
+            data = json.loads(Path(path).read_text())
+        except (OSError, ValueError):
+            return cls()
+        return cls({int(f): w for f, w in data.get("weights", {}).items()}, data.get("meta", {}))
+
+
+_model = None
+
+def get_model():
+    global _model
+    if _model is None:
+        _model = TierClassifier.load()
+    return _model
+
+
+# --- Pre-classification hook used by glm_batch_qualify ---
+
+def preclassify(candidates, log=print, caller=""):
+    """
+    Split candidates into (resolved {index: tier}, uncertain [index]).
+    Appends one line per call to the stats log for the LLM-avoided report.
+    """
+    model = get_model()
+    resolved, uncertain = {}, []
+    t0 = time.perf_counter()
+    for i, c in enumerate(candidates):
+        tier, _p = model.predict(c.get("name", ""), c.get("address", ""), c.get("type", ""))
+        if tier:
+            resolved[i] = tier
+        else:
+            uncertain.append(i)
+    us = (time.perf_counter() - t0) * 1e6
+    if candidates and model.enabled:
+        rate = len(resolved) / len(candidates)
+        log(f"  Local classifier: {len(resolved)}/{len(candidates)} resolved "
+            f"({rate:.0%} LLM avoided, {us / len(candidates):.0f}µs each)")
+        try:
+            STATS_LOG.parent.mkdir(parents=True, exist_ok=True)
+            with open(STATS_LOG, "a") as f:
+                f.write(json.dumps({
+                    "ts": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "caller": caller, "seen": len(candidates), "local": len(resolved),
+                    "tiers": dict(Counter(resolved.values())),
+                }) + "\n")
+        except OSError:
+            pass
+    return resolved, uncertain
+
+
+# --- Training data ---
+
+def _label(t):
+    t = str(t or "").strip().upper()
+    return LABELS.index(t) if t in LABELS else None
+
+def load_examples(use_crm=True):
+    """
+    {dedupe key: (name, address, type, label)} — later sources override earlier ones.
+    Queue and CRM rows count only when tier_source == "glm": rule passes and
+    local predictions would otherwise train the model on its own output.
+    """
+    ex = {}
+
+    def put(name, address, type_hint, tier):
+        y = _label(tier)
+        if name and y is not None:
+            ex[(_norm(name).strip(), _norm(address).strip())] = (name, address, type_hint, y)
+
+    if use_crm:
+        try:
+            from name_index import fetch_prospects
+            for p in fetch_prospects():
+                if p.get("tier_source") == "glm":
+                    put(p.get("name"), p.get("address", ""), p.get("type", ""), p.get("glm_tier"))
+        except Exception as e:
+            print(f"CRM fetch failed, training without it: {e}")
+
+    try:
+        with open(QUEUE) as f:
+            for line in f:
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    continue
+                if e.get("tier_source") == "glm":
+                    put(e.get("name"), e.get("address", ""), e.get("type", ""), e.get("glm_tier"))
+    except OSError:
+        pass
+
+    # GLM's own verdicts are the most direct labels and the only source of C/D
+    try:
+        for key, e in json.loads(QUAL_CACHE.read_text()).items():
+            name, address, type_hint = (key.split("|") + ["", ""])[:3]
+            put(name, address, type_hint, e.get("tier"))
+    except (OSError, ValueError):
+        pass
+    return ex
+
+
+def evaluate(model, rows, confidence=CONFIDENCE):
+    covered = correct = 0
+    for feats, y in rows:
+        p = model.proba(feats)
+        k = max(range(len(LABELS)), key=p.__getitem__)
+        if p[k] >= confidence:
+            covered += 1
+            correct += k == y
+    return covered, correct
+
+
+def train(use_crm=True):
+    examples = list(load_examples(use_crm).values())
+    rows = [(features(n, a, t), y) for n, a, t, y in examples]
+    print(f"{len(rows)} labelled candidates: "
+          f"{dict(Counter(LABELS[y] for _, y in rows))}")
+
+    # Holdout check decides whether the model is allowed to answer at all
+    random.Random(1).shuffle(rows)
+    cut = max(1, len(rows) // 5)
+    held, fit_rows = rows[:cut], rows[cut:]
+    covered, correct = evaluate(TierClassifier().fit(fit_rows), held)
+    precision = correct / covered if covered else 0.0
+    print(f"Holdout @ p>={CONFIDENCE}: covers {covered}/{len(held)} "
+          f"({covered / max(1, len(held)):.0%}), precision {precision:.1%}")
+
+    t0 = time.perf_counter()
+    model = TierClassifier().fit(rows)
+    model.meta = {
+        "trained_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "n_train": len(rows),
+        "confidence": CONFIDENCE,
+        "holdout_coverage": round(covered / max(1, len(held)), 3),
+        "holdout_precision": round(precision, 3),
+    }
+    model.save()
+    state = "enabled" if model.enabled else f"disabled (needs {MIN_TRAIN}+ labels, {MIN_PRECISION:.0%} precision)"
+    print(f"Trained in {time.perf_counter() - t0:.1f}s, {len(model.weights)} weights → {MODEL_FILE} [{state}]")
+
+
+def stats():
+    seen = local = 0
+    by_caller = Counter()
+    try:
+        with open(STATS_LOG) as f:
+            for line in f:
+                e = json.loads(line)
+                seen += e["seen"]
+                local += e["local"]
+                by_caller[e.get("caller") or "?"] += e["local"]
+    except (OSError, ValueError):
+        pass
+    meta = get_model().meta
+    print(f"Model: {meta.get('n_train', 0)} labels, trained {meta.get('trained_at', 'never')}, "
+          f"holdout precision {meta.get('holdout_precision', 0):.1%}")
+    print(f"LLM avoided: {local}/{seen} candidates ({local / max(1, seen):.1%}) {dict(by_caller)}")
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] == "stats":
+        stats()
+    elif args[0] == "train":
+        train(use_crm="--no-crm" not in args)
+    else:
+        model = get_model()
+        name, address, type_hint = (args + ["", ""])[:3]
+        p = model.proba(features(name, address, type_hint))
+        tier, conf = model.predict(name, address, type_hint)
+        print(f"{dict(zip(LABELS, (round(x, 3) for x in p)))} → {tier or 'ask GLM'} ({conf:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -923,6 +923,17 @@ app.post('/api/prospects/bulk-update', (req, res) => {
   res.json({ updated });
 });
 
+// Prospect status → timeline label and → pipeline stage. Shared by PUT /api/prospects/:id
+// and POST /api/activities/batch so both log and sync a status change the same way.
+const PROSPECT_STATUS_LABELS = { new: '🆕 New', active: '🔵 Active', opening_soon: '🏗️ Opening Soon', proposal_sent: '📨 Proposal Sent', signed: '✅ Signed', closed: '⛔ Stale' };
+const PROSPECT_STATUS_TO_STAGE = {
+  'new': 'new_lead', 'contacted': 'contacted', 'outreach': 'pop_in_done',
+  'interested': 'interested', 'qualified': 'site_survey', 'warm': 'interested',
+  'hot': 'proposal_sent', 'proposal': 'proposal_sent', 'negotiating': 'negotiating',
+  'contract': 'contract_sent', 'signed': 'signed', 'onboarding': 'onboarding',
+  'active': 'active_client', 'closed': null, 'lost': null
+};
+
 app.put('/api/prospects/:id', (req, res) => {
   const id = parseInt(req.params.id);
   const index = db.prospects.findIndex(p => p.id === id);
@@ -933,7 +944,7 @@ app.put('/api/prospects/:id', (req, res) => {
   // Auto-log significant changes as system activities
   const changes = [];
   if (req.body.status && req.body.status !== old.status) {
-    const labels = { new: '🆕 New', active: '🔵 Active', opening_soon: '🏗️ Opening Soon', proposal_sent: '📨 Proposal Sent', signed: '✅ Signed', closed: '⛔ Stale' };
+    const labels = PROSPECT_STATUS_LABELS;
     changes.push(`Status: ${labels[old.status] || old.status} → ${labels[req.body.status] || req.body.status}${req.body.stale_reason ? ' (' + req.body.stale_reason + ')' : ''}`);
   }
   if (req.body.priority && req.body.priority !== old.priority) {
@@ -992,14 +1003,7 @@ app.put('/api/prospects/:id', (req, res) => {
     pipeCard.updated_at = new Date().toISOString();
     // Sync status → pipeline stage
     if (req.body.status && req.body.status !== old.status) {
-      const statusToStage = {
-        'new': 'new_lead', 'contacted': 'contacted', 'outreach': 'pop_in_done',
-        'interested': 'interested', 'qualified': 'site_survey', 'warm': 'interested',
-        'hot': 'proposal_sent', 'proposal': 'proposal_sent', 'negotiating': 'negotiating',
-        'contract': 'contract_sent', 'signed': 'signed', 'onboarding': 'onboarding',
-        'active': 'active_client', 'closed': null, 'lost': null
-      };
-      const newStage = statusToStage[req.body.status];
+      const newStage = PROSPECT_STATUS_TO_STAGE[req.body.status];
       if (newStage && pipeCard.stage !== newStage) {
         const oldStage = pipeCard.stage;
         pipeCard.stage = newStage;
@@ -1120,6 +1124,142 @@ app.delete('/api/prospects/:id', (req, res) => {
   res.json({ success: true });
 });
 
+// ===== PROSPECT MERGE =====
+// Merge one or more duplicates into a primary prospect in a single request.
+// Body: { duplicate_ids: [id, ...] (or duplicate_id), policy?, dry_run? }
+// policy decides how prospect fields combine:
+//   prefer_longer (default) — fill gaps; for two strings keep the longer one
+//   fill                    — only fill fields the primary is missing
+//   prefer_duplicate        — the duplicate's non-empty values win
+// Notes are appended when they differ. Children are re-parented: contacts
+// (dropped when the primary already has the same email or name), activities
+// (dropped when type + description already exist), pipeline cards (dropped if
+// the primary has one), and photos, outreach sends, tasks, pop-ins, proposals,
+// contracts and campaigns as-is. The whole merge is computed first, then swapped
+// in with one saveDB — nothing is half-merged. dry_run returns the same diff
+// without writing.
+const MERGE_FIELDS = ['address', 'type', 'property_type', 'units', 'source', 'lat', 'lng', 'hours',
+  'phone', 'website', 'contact_name', 'contact_email', 'contact_phone'];
+const MERGE_POLICIES = ['prefer_longer', 'fill', 'prefer_duplicate'];
+const MERGE_REPARENT = ['prospect_photos', 'emailSends', 'pipelineTasks', 'crmTasks', 'popInVisits',
+  'proposals', 'contracts', 'campaigns'];
+
+function mergeFieldValue(policy, pval, dval) {
+  const empty = v => v === undefined || v === null || v === '';
+  if (empty(dval)) return pval;
+  if (empty(pval)) return dval;
+  if (policy === 'prefer_duplicate') return dval;
+  if (policy === 'prefer_longer' && typeof pval === 'string' && typeof dval === 'string') {
+    return pval.length >= dval.length ? pval : dval;
+  }
+  return pval;
+}
+
+app.post('/api/prospects/:id/merge', (req, res) => {
+  const primaryId = parseInt(req.params.id);
+  const dupIds = (Array.isArray(req.body.duplicate_ids) ? req.body.duplicate_ids : [req.body.duplicate_id])
+    .map(x => parseInt(x)).filter(x => !isNaN(x));
+  const policy = req.body.policy || 'prefer_longer';
+  const dryRun = !!req.body.dry_run;
+  if (!MERGE_POLICIES.includes(policy)) return res.status(400).json({ error: `policy must be one of ${MERGE_POLICIES.join(', ')}` });
+  if (!dupIds.length) return res.status(400).json({ error: 'duplicate_ids required' });
+  if (dupIds.includes(primaryId)) return res.status(400).json({ error: 'cannot merge a prospect into itself' });
+  const primary = db.prospects.find(p => p.id === primaryId);
+  if (!primary) return res.status(404).json({ error: 'primary prospect not found' });
+  const dups = dupIds.map(id => db.prospects.find(p => p.id === id));
+  const missing = dupIds.filter((id, i) => !dups[i]);
+  if (missing.length) return res.status(404).json({ error: 'duplicate prospect not found', missing });
+
+  // 1. Fields
+  const merged = { ...primary };
+  const fields = {};
+  dups.forEach(d => {
+    MERGE_FIELDS.forEach(f => {
+      const best = mergeFieldValue(policy, merged[f], d[f]);
+      if (best !== merged[f]) {
+        merged[f] = best;
+        fields[f] = { from: primary[f] ?? null, to: best };
+      }
+    });
+    const pn = (merged.notes || '').trim();
+    const dn = (d.notes || '').trim();
+    if (dn && dn !== pn && !pn.includes(dn)) {
+      merged.notes = pn ? `${pn}\n---\n${dn}` : dn;
+      fields.notes = { from: primary.notes ?? null, to: merged.notes };
+    }
+  });
+
+  // 2. Children, in duplicate order so later duplicates dedupe against earlier moves
+  const dupSet = new Set(dupIds);
+  const lower = v => (v || '').toLowerCase();
+  const contacts = db.contacts || [];
+  const primaryContacts = contacts.filter(c => c.prospect_id === primaryId);
+  const emails = new Set(primaryContacts.map(c => lower(c.email)).filter(Boolean));
+  const names = new Set(primaryContacts.map(c => lower(c.name)).filter(Boolean));
+  const hasPrimaryContact = primaryContacts.some(c => c.is_primary);
+  const contactMoves = new Set(), contactDrops = new Set();
+  const activities = db.activities || [];
+  const sigs = new Set(activities.filter(a => a.prospect_id === primaryId).map(a => `${a.type || ''}__${a.description || ''}`));
+  const activityMoves = new Set(), activityDrops = new Set();
+  const cards = db.pipelineCards || [];
+  let hasCard = cards.some(c => c.prospect_id === primaryId);
+  const cardMoves = new Set(), cardDrops = new Set();
+
+  dupIds.forEach(did => {
+    contacts.filter(c => c.prospect_id === did).forEach(c => {
+      const e = lower(c.email), n = lower(c.name);
+      if ((e && emails.has(e)) || (n && names.has(n))) return contactDrops.add(c.id);
+      contactMoves.add(c.id);
+      if (e) emails.add(e);
+      if (n) names.add(n);
+    });
+    activities.filter(a => a.prospect_id === did).forEach(a => {
+      const sig = `${a.type || ''}__${a.description || ''}`;
+      if (sigs.has(sig)) return activityDrops.add(a.id);
+      activityMoves.add(a.id);
+    });
+    cards.filter(c => c.prospect_id === did).forEach(c => {
+      if (hasCard) return cardDrops.add(c.id);
+      cardMoves.add(c.id);
+      hasCard = true;
+    });
+  });
+
+  const moved = { contacts: contactMoves.size, activities: activityMoves.size, pipelineCards: cardMoves.size };
+  MERGE_REPARENT.forEach(k => { moved[k] = (db[k] || []).filter(x => dupSet.has(x.prospect_id)).length; });
+  const diff = {
+    primary_id: primaryId, duplicate_ids: dupIds, policy, fields, moved,
+    dropped: { contacts: contactDrops.size, activities: activityDrops.size, pipelineCards: cardDrops.size }
+  };
+  if (dryRun) return res.json({ success: true, dry_run: true, ...diff });
+
+  // 3. Build every replacement array, then swap them in together
+  const now = new Date().toISOString();
+  const reparent = (x, extra) => ({ ...x, prospect_id: primaryId, ...extra, updated_at: now });
+  const next = {
+    contacts: contacts.filter(c => !contactDrops.has(c.id))
+      .map(c => contactMoves.has(c.id) ? reparent(c, hasPrimaryContact ? { is_primary: false } : {}) : c),
+    activities: activities.filter(a => !activityDrops.has(a.id))
+      .map(a => activityMoves.has(a.id) ? reparent(a) : a),
+    pipelineCards: cards.filter(c => !cardDrops.has(c.id))
+      .map(c => cardMoves.has(c.id) ? reparent(c) : c),
+    prospects: db.prospects.filter(p => !dupSet.has(p.id))
+      .map(p => p.id === primaryId ? { ...merged, updated_at: now } : p)
+  };
+  MERGE_REPARENT.forEach(k => {
+    if (db[k]) next[k] = db[k].map(x => dupSet.has(x.prospect_id) ? reparent(x) : x);
+  });
+  next.activities.push({
+    id: nextId(), prospect_id: primaryId, type: 'merge',
+    description: `Merged duplicate${dupIds.length > 1 ? 's' : ''} #${dupIds.join(', #')} (${Object.keys(fields).length} fields, ${moved.contacts} contacts, ${moved.activities} activities)`,
+    created_at: now
+  });
+  Object.assign(db, next);
+  saveDB(db);
+  console.log(`🔀 Merged ${dupIds.join(', ')} → prospect ${primaryId}`);
+  res.json({ success: true, dry_run: false, ...diff });
+});
+
 // ===== PROSPECT PHOTOS API =====
 // GET /api/photos — all prospect photos (for activity log thumbnails)
 app.get('/api/photos', (req, res) => {
@@ -1180,145 +1320,134 @@ app.delete('/api/contacts/:id', (req, res) => {
 });
 
 // ===== ACTIVITIES API =====
-app.post('/api/prospects/:id/activities', (req, res) => {
-  const prospect_id = parseInt(req.params.id);
-  // Auto-inject rep from session if not provided by client
-  let sessionRep = req.body.rep || null;
-  if (!sessionRep) {
-    const cookies = parseCookies(req);
-    const sessionToken = cookies['vendtech_session'];
-    const sessions = getActiveSessions();
-    const entry = sessionToken ? sessions[sessionToken] : null;
-    const rawRep = entry && typeof entry === 'object' ? entry.rep : null;
-    sessionRep = rawRep ? rawRep.charAt(0).toUpperCase() + rawRep.slice(1) : null;
-  }
-  // Also capitalize rep if passed directly in body (normalize case)
-  const bodyRep = req.body.rep ? req.body.rep.charAt(0).toUpperCase() + req.body.rep.slice(1) : null;
-  const activity = { id: nextId(), prospect_id, ...req.body, rep: sessionRep || bodyRep || null, created_at: new Date().toISOString() };
-  db.activities.push(activity);
-  const prospect = db.prospects.find(p => p.id === prospect_id);
-  if (prospect) {
-    if (req.body.outcome === 'interested') prospect.priority = 'hot';
-    else if (req.body.outcome === 'not_interested') prospect.status = 'closed';
-
-    // ── Smart note parsing ──────────────────────────────────────────────────
-    const noteText = (req.body.description || req.body.notes || '').toLowerCase();
-    if (noteText) {
-      // 1. Detect "not interested" → stale unless a follow-up date is also set
-      const notInterestedPhrases = ['not interested', 'no interest', 'not interested at this time', 'not a good fit', 'passed', 'no thanks', 'declined', 'not looking', 'happy with current', 'has a vendor', 'already has a vendor', 'under contract'];
-      const isNotInterested = notInterestedPhrases.some(ph => noteText.includes(ph));
-
-      // 2. Try to extract a follow-up date from the note text
-      let parsedFollowUpDate = null;
-      let parsedFollowUpAction = null;
-
-      // Pattern: "follow up in X days/weeks/months"
-      const relMatch = noteText.match(/follow\s*(?:up)?\s*(?:in|after)\s*(\d+)\s*(day|week|month|year)s?/i);
-      if (relMatch) {
-        const num = parseInt(relMatch[1]);
-        const unit = relMatch[2].toLowerCase();
+// Side effects of logging an activity against a prospect: outcome → priority/status and
+// the free-text note rules below. Run by POST /api/prospects/:id/activities and for every
+// POST /api/activities/batch item, so synced emails get the same treatment either way.
+function applyActivityNoteRules(prospect, body) {
+  const prospect_id = prospect.id;
+  if (body.outcome === 'interested') prospect.priority = 'hot';
+  else if (body.outcome === 'not_interested') prospect.status = 'closed';
+
+  // ── Smart note parsing ──────────────────────────────────────────────────
+  const noteText = (body.description || body.notes || '').toLowerCase();
+  if (noteText) {
+    // 1. Detect "not interested" → stale unless a follow-up date is also set
+    const notInterestedPhrases = ['not interested', 'no interest', 'not interested at this time', 'not a good fit', 'passed', 'no thanks', 'declined', 'not looking', 'happy with current', 'has a vendor', 'already has a vendor', 'under contract'];
+    const isNotInterested = notInterestedPhrases.some(ph => noteText.includes(ph));
+
+    // 2. Try to extract a follow-up date from the note text
+    let parsedFollowUpDate = null;
+    let parsedFollowUpAction = null;
+
+    // Pattern: "follow up in X days/weeks/months"
+    const relMatch = noteText.match(/follow\s*(?:up)?\s*(?:in|after)\s*(\d+)\s*(day|week|month|year)s?/i);
+    if (relMatch) {
+      const num = parseInt(relMatch[1]);
+      const unit = relMatch[2].toLowerCase();
+      const d = new Date();
+      if (unit === 'day') d.setDate(d.getDate() + num);
+      else if (unit === 'week') d.setDate(d.getDate() + num * 7);
+      else if (unit === 'month') d.setMonth(d.getMonth() + num);
+      else if (unit === 'year') d.setFullYear(d.getFullYear() + num);
+      parsedFollowUpDate = d.toISOString().split('T')[0];
+      parsedFollowUpAction = 'Follow up';
+    }
+
+    // Pattern: "follow up on/by/around [date]" or "call/email back [date]"
+    if (!parsedFollowUpDate) {
+      const months = { january:0,february:1,march:2,april:3,may:4,june:5,july:6,august:7,september:8,october:9,november:10,december:11,jan:0,feb:1,mar:2,apr:3,jun:5,jul:6,aug:7,sep:8,oct:9,nov:10,dec:11 };
+      const absMatch = noteText.match(/(?:follow\s*up|call\s*back|reach\s*out|check\s*back|try\s*again|contact)\s*(?:on|by|around|in|after|next)?\s*([a-z]+)\s*(\d{1,2})(?:st|nd|rd|th)?(?:[,\s]*(\d{4}))?/i);
+      if (absMatch) {
+        const mon = months[absMatch[1].toLowerCase()];
+        const day = parseInt(absMatch[2]);
+        const year = absMatch[3] ? parseInt(absMatch[3]) : new Date().getFullYear();
+        if (mon !== undefined && day >= 1 && day <= 31) {
+          const d = new Date(year, mon, day);
+          // If date already passed this year, bump to next year
+          if (d < new Date() && !absMatch[3]) d.setFullYear(d.getFullYear() + 1);
+          parsedFollowUpDate = d.toISOString().split('T')[0];
+          parsedFollowUpAction = 'Follow up';
+        }
+      }
+    }
+
+    // Pattern: "next [month name]" or "in [month name]"
+    if (!parsedFollowUpDate) {
+      const months = { january:0,february:1,march:2,april:3,may:4,june:5,july:6,august:7,september:8,october:9,november:10,december:11,jan:0,feb:1,mar:2,apr:3,jun:5,jul:6,aug:7,sep:8,oct:9,nov:10,dec:11 };
+      const nextMonthMatch = noteText.match(/(?:next|in)\s+(january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|jun|jul|aug|sep|oct|nov|dec)\b/i);
+      if (nextMonthMatch) {
+        const mon = months[nextMonthMatch[1].toLowerCase()];
         const d = new Date();
-        if (unit === 'day') d.setDate(d.getDate() + num);
-        else if (unit === 'week') d.setDate(d.getDate() + num * 7);
-        else if (unit === 'month') d.setMonth(d.getMonth() + num);
-        else if (unit === 'year') d.setFullYear(d.getFullYear() + num);
+        d.setDate(1);
+        d.setMonth(mon);
+        if (d <= new Date()) d.setFullYear(d.getFullYear() + 1);
         parsedFollowUpDate = d.toISOString().split('T')[0];
         parsedFollowUpAction = 'Follow up';
       }
+    }
 
-      // Pattern: "follow up on/by/around [date]" or "call/email back [date]"
-      if (!parsedFollowUpDate) {
-        const months = { january:0,february:1,march:2,april:3,may:4,june:5,july:6,august:7,september:8,october:9,november:10,december:11,jan:0,feb:1,mar:2,apr:3,jun:5,jul:6,aug:7,sep:8,oct:9,nov:10,dec:11 };
-        const absMatch = noteText.match(/(?:follow\s*up|call\s*back|reach\s*out|check\s*back|try\s*again|contact)\s*(?:on|by|around|in|after|next)?\s*([a-z]+)\s*(\d{1,2})(?:st|nd|rd|th)?(?:[,\s]*(\d{4}))?/i);
-        if (absMatch) {
-          const mon = months[absMatch[1].toLowerCase()];
-          const day = parseInt(absMatch[2]);
-          const year = absMatch[3] ? parseInt(absMatch[3]) : new Date().getFullYear();
-          if (mon !== undefined && day >= 1 && day <= 31) {
-            const d = new Date(year, mon, day);
-            // If date already passed this year, bump to next year
-            if (d < new Date() && !absMatch[3]) d.setFullYear(d.getFullYear() + 1);
-            parsedFollowUpDate = d.toISOString().split('T')[0];
-            parsedFollowUpAction = 'Follow up';
-          }
-        }
-      }
+    // Apply parsed follow-up date to prospect
+    if (parsedFollowUpDate) {
+      prospect.next_action_date = parsedFollowUpDate;
+      prospect.next_action = parsedFollowUpAction || prospect.next_action || 'Follow up';
+      // Log it as a system activity so it's visible in the timeline
+      db.activities.push({
+        id: nextId(), prospect_id,
+        type: 'status-change',
+        description: `📅 Follow-up auto-set to ${parsedFollowUpDate} (detected from note)`,
+        created_at: new Date().toISOString()
+      });
+    }
 
-      // Pattern: "next [month name]" or "in [month name]"
-      if (!parsedFollowUpDate) {
-        const months = { january:0,february:1,march:2,april:3,may:4,june:5,july:6,august:7,september:8,october:9,november:10,december:11,jan:0,feb:1,mar:2,apr:3,jun:5,jul:6,aug:7,sep:8,oct:9,nov:10,dec:11 };
-        const nextMonthMatch = noteText.match(/(?:next|in)\s+(january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|jun|jul|aug|sep|oct|nov|dec)\b/i);
-        if (nextMonthMatch) {
-          const mon = months[nextMonthMatch[1].toLowerCase()];
-          const d = new Date();
-          d.setDate(1);
-          d.setMonth(mon);
-          if (d <= new Date()) d.setFullYear(d.getFullYear() + 1);
-          parsedFollowUpDate = d.toISOString().split('T')[0];
-          parsedFollowUpAction = 'Follow up';
-        }
+    // 3. Auto-assign hot/warm priority based on pop-in note sentiment
+    const isPopIn = (body.type || '').toLowerCase().includes('pop') || (body.type || '').toLowerCase().includes('visit');
+    if (isPopIn && prospect.status !== 'signed' && prospect.status !== 'closed') {
+      const hotPhrases = ['interested', 'very interested', 'wants to move forward', 'loves it', 'let\'s do it', 'send contract', 'send proposal', 'wants a proposal', 'ready to sign', 'sign up', 'sounds good', 'great fit', 'yes', 'on board'];
+      const warmPhrases = ['maybe', 'possibly', 'might be interested', 'come back', 'check back', 'follow up', 'think about it', 'considering', 'needs to think', 'not sure yet', 'get back to us', 'will let us know', 'later', 'not now', 'busy right now', 'talk to management', 'needs approval'];
+      const isHot = hotPhrases.some(ph => noteText.includes(ph));
+      const isWarm = !isHot && warmPhrases.some(ph => noteText.includes(ph));
+      if (isHot && prospect.priority !== 'intalks') {
+        prospect.priority = 'hot';
+        db.activities.push({ id: nextId(), prospect_id, type: 'status-change', description: '🔥 Auto-marked Hot — pop-in note indicates interest', created_at: new Date().toISOString() });
+      } else if (isWarm && !['hot','intalks'].includes(prospect.priority)) {
+        prospect.priority = 'warm';
+        db.activities.push({ id: nextId(), prospect_id, type: 'status-change', description: '🟠 Auto-marked Warm — pop-in note indicates possible interest', created_at: new Date().toISOString() });
       }
+    }
 
-      // Apply parsed follow-up date to prospect
-      if (parsedFollowUpDate) {
-        prospect.next_action_date = parsedFollowUpDate;
-        prospect.next_action = parsedFollowUpAction || prospect.next_action || 'Follow up';
-        // Log it as a system activity so it's visible in the timeline
+    // 4. Apply not-interested → stale (only if no follow-up date was set or already exists)
+    if (isNotInterested && prospect.status !== 'signed') {
+      const hasFollowUp = parsedFollowUpDate || prospect.next_action_date;
+      if (hasFollowUp) {
+        // Has a follow-up — mark cold but don't stale
+        prospect.priority = 'normal';
         db.activities.push({
           id: nextId(), prospect_id,
           type: 'status-change',
-          description: `📅 Follow-up auto-set to ${parsedFollowUpDate} (detected from note)`,
+          description: '🧊 Marked cold — not interested but follow-up date set',
+          created_at: new Date().toISOString()
+        });
+      } else {
+        // No follow-up — mark stale
+        prospect.status = 'closed';
+        prospect.stale_reason = 'Not interested';
+        db.activities.push({
+          id: nextId(), prospect_id,
+          type: 'status-change',
+          description: '⛔ Auto-marked stale — note indicated not interested',
           created_at: new Date().toISOString()
         });
-      }
-
-      // 3. Auto-assign hot/warm priority based on pop-in note sentiment
-      const isPopIn = (req.body.type || '').toLowerCase().includes('pop') || (req.body.type || '').toLowerCase().includes('visit');
-      if (isPopIn && prospect.status !== 'signed' && prospect.status !== 'closed') {
-        const hotPhrases = ['interested', 'very interested', 'wants to move forward', 'loves it', 'let\'s do it', 'send contract', 'send proposal', 'wants a proposal', 'ready to sign', 'sign up', 'sounds good', 'great fit', 'yes', 'on board'];
-        const warmPhrases = ['maybe', 'possibly', 'might be interested', 'come back', 'check back', 'follow up', 'think about it', 'considering', 'needs to think', 'not sure yet', 'get back to us', 'will let us know', 'later', 'not now', 'busy right now', 'talk to management', 'needs approval'];
-        const isHot = hotPhrases.some(ph => noteText.includes(ph));
-        const isWarm = !isHot && warmPhrases.some(ph => noteText.includes(ph));
-        if (isHot && prospect.priority !== 'intalks') {
-          prospect.priority = 'hot';
-          db.activities.push({ id: nextId(), prospect_id, type: 'status-change', description: '🔥 Auto-marked Hot — pop-in note indicates interest', created_at: new Date().toISOString() });
-        } else if (isWarm && !['hot','intalks'].includes(prospect.priority)) {
-          prospect.priority = 'warm';
-          db.activities.push({ id: nextId(), prospect_id, type: 'status-change', description: '🟠 Auto-marked Warm — pop-in note indicates possible interest', created_at: new Date().toISOString() });
-        }
-      }
-
-      // 4. Apply not-interested → stale (only if no follow-up date was set or already exists)
-      if (isNotInterested && prospect.status !== 'signed') {
-        const hasFollowUp = parsedFollowUpDate || prospect.next_action_date;
-        if (hasFollowUp) {
-          // Has a follow-up — mark cold but don't stale
-          prospect.priority = 'normal';
-          db.activities.push({
-            id: nextId(), prospect_id,
-            type: 'status-change',
-            description: '🧊 Marked cold — not interested but follow-up date set',
-            created_at: new Date().toISOString()
-          });
-        } else {
-          // No follow-up — mark stale
-          prospect.status = 'closed';
-          prospect.stale_reason = 'Not interested';
-          db.activities.push({
-            id: nextId(), prospect_id,
-            type: 'status-change',
-            description: '⛔ Auto-marked stale — note indicated not interested',
-            created_at: new Date().toISOString()
-          });
-        }
       }
     }
-    // ── End smart note parsing ──────────────────────────────────────────────
-
-    prospect.updated_at = new Date().toISOString();
   }
-  // Auto-complete any active todos for this prospect when a pop-in is logged
-  const actType = (req.body.type || '').toLowerCase();
+  // ── End smart note parsing ──────────────────────────────────────────────
+
+  prospect.updated_at = new Date().toISOString();
+}
+
+// Auto-complete any active todos for this prospect when a pop-in is logged
+function autoCompletePopInTodos(prospect_id, type) {
+  const actType = (type || '').toLowerCase();
   const isPopIn = actType.includes('pop') || actType.includes('visit') || actType.includes('pop in') || actType.includes('pop-in');
   if (isPopIn && db.todos) {
     const now = new Date().toISOString();
@@ -1331,13 +1460,111 @@ app.post('/api/prospects/:id/activities', (req, res) => {
       }
     });
   }
+}
+
+app.post('/api/prospects/:id/activities', (req, res) => {
+  const prospect_id = parseInt(req.params.id);
+  // Auto-inject rep from session if not provided by client
+  let sessionRep = req.body.rep || null;
+  if (!sessionRep) {
+    const cookies = parseCookies(req);
+    const sessionToken = cookies['vendtech_session'];
+    const sessions = getActiveSessions();
+    const entry = sessionToken ? sessions[sessionToken] : null;
+    const rawRep = entry && typeof entry === 'object' ? entry.rep : null;
+    sessionRep = rawRep ? rawRep.charAt(0).toUpperCase() + rawRep.slice(1) : null;
+  }
+  // Also capitalize rep if passed directly in body (normalize case)
+  const bodyRep = req.body.rep ? req.body.rep.charAt(0).toUpperCase() + req.body.rep.slice(1) : null;
+  const activity = { id: nextId(), prospect_id, ...req.body, rep: sessionRep || bodyRep || null, created_at: new Date().toISOString() };
+  db.activities.push(activity);
+  const prospect = db.prospects.find(p => p.id === prospect_id);
+  if (prospect) applyActivityNoteRules(prospect, req.body);
+  autoCompletePopInTodos(prospect_id, req.body.type);
 
   saveDB(db);
   res.json(activity);
 });
 
+// ===== BATCH ACTIVITY INGEST =====
+// One round trip for a whole sync cycle (email-crm-sync).
+// Body: { items: [{ prospect_id, type, notes, direction?, date?, status?, source?, external_id? }] }
+// Each item gets the same note rules as POST /api/prospects/:id/activities (an inbound
+// "not interested" still marks the prospect stale), then status applies the same
+// status-change log + pipeline stage sync as PUT /api/prospects/:id.
+// external_id makes retries idempotent: an item whose external_id is already logged is skipped.
+app.post('/api/activities/batch', (req, res) => {
+  const items = Array.isArray(req.body.items) ? req.body.items : null;
+  if (!items) return res.status(400).json({ error: 'items array required' });
+  if (items.length > 1000) return res.status(413).json({ error: 'max 1000 items per batch' });
+
+  const prospectsById = new Map(db.prospects.map(p => [p.id, p]));
+  const seenExternal = new Set(db.activities.filter(a => a.external_id).map(a => a.external_id));
+  const statusLabels = PROSPECT_STATUS_LABELS;
+  const now = new Date().toISOString();
+  const results = [];
+  let created = 0, statusChanges = 0;
+
+  items.forEach((item, i) => {
+    const prospect_id = parseInt(item.prospect_id);
+    const prospect = prospectsById.get(prospect_id);
+    if (!prospect) return results.push({ i, ok: false, error: 'prospect not found' });
+    if (!item.type) return results.push({ i, ok: false, error: 'type required' });
+    if (item.external_id && seenExternal.has(item.external_id)) {
+      return results.push({ i, ok: true, duplicate: true });
+    }
+
+    const activity = {
+      id: nextId(), prospect_id, type: item.type, notes: item.notes || '',
+      date: item.date || now.split('T')[0], direction: item.direction || null,
+      source: item.source || null, external_id: item.external_id || null,
+      rep: null, created_at: now
+    };
+    db.activities.push(activity);
+    if (item.external_id) seenExternal.add(item.external_id);
+    created++;
+    applyActivityNoteRules(prospect, item);
+    autoCompletePopInTodos(prospect_id, item.type);
+
+    if (item.status && item.status !== prospect.status) {
+      db.activities.push({
+        id: nextId(), prospect_id, type: 'status-change',
+        description: `Status: ${statusLabels[prospect.status] || prospect.status} → ${statusLabels[item.status] || item.status}`,
+        created_at: now
+      });
+      const oldStatus = prospect.status;
+      prospect.status = item.status;
+      statusChanges++;
+      const pipeCard = (db.pipelineCards || []).find(c => c.prospect_id === prospect_id);
+      const newStage = PROSPECT_STATUS_TO_STAGE[item.status];
+      if (pipeCard && newStage && pipeCard.stage !== newStage) {
+        const oldStage = pipeCard.stage;
+        pipeCard.stage = newStage;
+        pipeCard.entered_stage_at = now;
+        pipeCard.updated_at = now;
+        runWorkflowRules && runWorkflowRules('stage_change', { prospect_id, old_stage: oldStage, new_stage: newStage });
+      }
+      console.log(`📥 Batch status: prospect ${prospect_id} ${oldStatus} → ${item.status}`);
+    }
+    prospect.updated_at = now;
+    results.push({ i, ok: true, id: activity.id });
+  });
+
+  if (created > 0 || statusChanges > 0) saveDB(db);
+  res.json({ success: true, created, status_changes: statusChanges, results });
+});
+
 app.get('/api/activities', (req, res) => {
-  res.json(db.activities || []);
+  // Optional keyset paging: ?page_size=N[&after_id=X] → next N activities by id.
+  // Without page_size the full list is returned, as before.
+  const pageSize = parseInt(req.query.page_size);
+  if (!pageSize) return res.json(db.activities || []);
+  const afterId = Number(req.query.after_id) || 0;
+  const page = (db.activities || [])
+    .filter(a => Number(a.id) > afterId)
+    .sort((a, b) => Number(a.id) - Number(b.id))
+    .slice(0, Math.min(pageSize, 5000));
+  res.json(page);
 });
 
 app.put('/api/activities/:id', (req, res) => {
@@ -16346,13 +16573,32 @@ app.get('/settings', (req, res) => {
 });
 
 // ===== EXPORT API =====
+// Large exports are written once to a snapshot file and streamed with sendFile,
+// which honours Range/If-Range: a download that drops mid-transfer resumes
+// against the same bytes instead of restarting. A request without a Range
+// header always rebuilds the snapshot; resumes reuse it for SNAPSHOT_TTL_MS.
+const SNAPSHOT_DIR = path.join(path.dirname(DB_FILE), 'snapshots');
+const SNAPSHOT_TTL_MS = 30 * 60 * 1000;
+
+function sendSnapshot(req, res, name, filename, build) {
+  const file = path.join(SNAPSHOT_DIR, `${name}.json`);
+  let stat = null;
+  try { stat = fs.statSync(file); } catch (e) { /* not built yet */ }
+  if (!stat || !req.headers.range || Date.now() - stat.mtimeMs > SNAPSHOT_TTL_MS) {
+    fs.mkdirSync(SNAPSHOT_DIR, { recursive: true });
+    const tmpFile = file + '.tmp';
+    fs.writeFileSync(tmpFile, JSON.stringify(build(), null, 2));
+    fs.renameSync(tmpFile, file);
+  }
+  res.setHeader('Content-Disposition', `attachment; filename=${filename}`);
+  res.sendFile(file, { cacheControl: false });
+}
+
 // Raw DB dump — full data.json for disaster recovery (admin only)
 app.get('/api/backup/raw-db', (req, res) => {
   const apiKey = req.headers['x-api-key'];
   if (apiKey !== 'kande2026') return res.status(401).json({ error: 'Unauthorized' });
-  res.setHeader('Content-Type', 'application/json');
-  res.setHeader('Content-Disposition', `attachment; filename=data-${new Date().toISOString().split('T')[0]}.json`);
-  res.send(JSON.stringify(db, null, 2));
+  sendSnapshot(req, res, 'raw-db', `data-${new Date().toISOString().split('T')[0]}.json`, () => db);
 });
 
 app.get('/api/export/:type', (req, res) => {
@@ -16360,7 +16606,7 @@ app.get('/api/export/:type', (req, res) => {
   
   if (type === 'json') {
     // Full database export
-    const exportData = {
+    return sendSnapshot(req, res, 'export', `vendtech-backup-${new Date().toISOString().split('T')[0]}.json`, () => ({
       exported_at: new Date().toISOString(),
       version: '2.0.0',
       settings: loadSettings(),
@@ -16434,10 +16680,7 @@ app.get('/api/export/:type', (req, res) => {
       content: db.content || [],
       // Photos (base64 stored in DB) — critical for pop-in recovery
       prospect_photos: db.prospect_photos || []
-    };
-    res.setHeader('Content-Type', 'application/json');
-    res.setHeader('Content-Disposition', `attachment; filename=vendtech-backup-${new Date().toISOString().split('T')[0]}.json`);
-    return res.send(JSON.stringify(exportData, null, 2));
+    }));
   }
 
   if (type === 'raw') {
@@ -24997,10 +25240,80 @@ app.get('/api/team/learnings', (req, res) => {
 
 // POST /api/team/learnings — Push agent learnings from local machine
 app.post('/api/team/learnings', express.json({ limit: '500kb' }), (req, res) => {
+  const rev = (db.teamLearnings && db.teamLearnings._rev) || 0;
   db.teamLearnings = req.body;
   db.teamLearnings._updatedAt = new Date().toISOString();
+  db.teamLearnings._rev = rev + 1;  // a full replace invalidates every delta client's base
   saveDB(db);
-  res.json({ ok: true });
+  res.json({ ok: true, rev: db.teamLearnings._rev });
+});
+
+// POST /api/team/learnings/delta — Append only the new learnings (push-learnings.py)
+// Body: { base_rev, agents: { <agent>: [{ text, type }] }, patterns: [text], shared_meta?: { learnings_md_chars, learnings_md_updated } }
+// base_rev must equal the stored _rev, else 409 { rev } and the client re-sends everything it has.
+// Items are deduplicated against what is stored by normalized text, so a re-send is harmless.
+app.post('/api/team/learnings/delta', express.json({ limit: '500kb' }), (req, res) => {
+  const tl = db.teamLearnings || (db.teamLearnings = {});
+  const rev = tl._rev || 0;
+  const { base_rev, agents = {}, patterns = [], shared_meta } = req.body || {};
+  if (base_rev !== rev) return res.status(409).json({ error: 'rev mismatch', rev });
+  if (typeof agents !== 'object' || !Array.isArray(patterns)) {
+    return res.status(400).json({ error: 'agents object and patterns array required' });
+  }
+
+  const norm = s => String(s).toLowerCase().replace(/[^a-z0-9]+/g, ' ').trim();
+  const now = new Date().toISOString();
+  let added = 0;
+
+  for (const [agent, items] of Object.entries(agents)) {
+    if (!Array.isArray(items)) continue;
+    if (!tl[agent] || typeof tl[agent] !== 'object') {
+      tl[agent] = { items: [], mistakeCount: 0, learningCount: 0, updated: now };
+    }
+    const obj = tl[agent];
+    if (!Array.isArray(obj.items)) obj.items = [];
+    const seen = new Set(obj.items.map(i => norm(i.text)));
+    for (const item of items) {
+      if (!item || !item.text) continue;
+      const key = norm(item.text);
+      if (seen.has(key)) continue;
+      seen.add(key);
+      obj.items.push({ text: item.text, type: item.type || 'learning' });
+      added++;
+    }
+    obj.mistakeCount = obj.items.filter(i => i.type === 'mistake').length;
+    obj.learningCount = obj.items.length - obj.mistakeCount;
+    obj.updated = now;
+  }
+
+  if (patterns.length || shared_meta) {
+    if (!tl.shared || typeof tl.shared !== 'object') tl.shared = {};
+    const shared = tl.shared;
+    for (const key of ['what_works', 'what_fails', 'patterns', 'strategies']) {
+      if (!Array.isArray(shared[key])) shared[key] = [];
+    }
+    const seen = new Set(shared.patterns.map(norm));
+    for (const text of patterns) {
+      if (!text) continue;
+      const key = norm(text);
+      if (seen.has(key)) continue;
+      seen.add(key);
+      shared.patterns.push(text);
+      added++;
+    }
+    if (shared_meta) {
+      if (shared_meta.learnings_md_chars != null) shared.learnings_md_chars = shared_meta.learnings_md_chars;
+      if (shared_meta.learnings_md_updated) shared.learnings_md_updated = shared_meta.learnings_md_updated;
+    }
+    shared.updated = now;
+  }
+
+  // An empty delta is just the client checking its base_rev
+  if (!added && !shared_meta) return res.json({ ok: true, rev, added });
+  tl._rev = rev + 1;
+  tl._updatedAt = now;
+  saveDB(db);
+  res.json({ ok: true, rev: tl._rev, added });
 });
 
 // Serve team.html